@@ -0,0 +1,60 @@
+import os
+import random
+import platform
+import subprocess
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+
+from tronpy.keys import to_base58check_address
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def percentile(samples: List[float], q: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(int(q * len(ordered)), len(ordered) - 1)]
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    """
+    Функция сводки задержек (мс): среднее и перцентили p50/p95/p99
+
+    :param samples: Задержки в миллисекундах
+    :return: Словарь сводки
+    """
+    if not samples:
+        return {'mean_ms': 0.0, 'p50_ms': 0.0, 'p95_ms': 0.0, 'p99_ms': 0.0}
+    return {'mean_ms': sum(samples) / len(samples),
+            'p50_ms': percentile(samples, 0.5),
+            'p95_ms': percentile(samples, 0.95),
+            'p99_ms': percentile(samples, 0.99),
+            }
+
+
+def make_addresses(count: int, seed: int = 42) -> List[str]:
+    """
+    Функция генерации воспроизводимого набора корректных адресов сети Трон
+
+    :param count: Количество адресов
+    :param seed: Начальное значение генератора
+    :return: Список base58-адресов
+    """
+    rng = random.Random(seed)
+    return [to_base58check_address(b"\x41" + rng.randbytes(20)) for _ in range(count)]
+
+
+def environment() -> Dict[str, Any]:
+    """
+    Функция описания окружения замера (коммит, Python, платформа) для сравнения результатов
+    """
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=ROOT, capture_output=True,
+                                text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        commit = None
+    return {'commit': commit,
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'started_at': datetime.now(timezone.utc).isoformat(),
+            }
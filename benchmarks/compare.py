@@ -0,0 +1,59 @@
+"""
+Сравнение двух файлов результатов нагрузочного прогона (например, двух коммитов)
+
+Запуск: python -m benchmarks.compare base.json new.json --threshold 10
+"""
+import sys
+import json
+import argparse
+from typing import Any, Dict, List, Tuple
+
+COMPARED_METRICS = (('rps', 1), ('p50_ms', -1), ('p95_ms', -1), ('p99_ms', -1))
+
+
+def load(path: str) -> Dict[Tuple[str, int], Dict[str, Any]]:
+    with open(path) as f:
+        data = json.load(f)
+    return {(result['scenario'], result['concurrency']): result for result in data['results']}
+
+
+def compare(base: Dict, new: Dict, threshold: float) -> Tuple[List[str], List[str]]:
+    """
+    Функция сравнения результатов по сценариям
+
+    :param base: Базовые результаты
+    :param new: Новые результаты
+    :param threshold: Допустимое ухудшение (%)
+    :return: Строки таблицы и список регрессий
+    """
+    lines = [f"{'scenario':<22}{'conc':>6}" + "".join(f"{name:>22}" for name, _ in COMPARED_METRICS)]
+    regressions = []
+    for key in sorted(base.keys() & new.keys()):
+        cells = []
+        for name, direction in COMPARED_METRICS:
+            old_value, new_value = base[key][name], new[key][name]
+            change = (new_value - old_value) / old_value * 100 if old_value else 0.0
+            cells.append(f"{old_value:>9.1f} -> {new_value:>7.1f}{change:>+5.0f}%")
+            # direction: 1 - больше лучше (rps), -1 - меньше лучше (задержки)
+            if -direction * change > threshold:
+                regressions.append(f"{key[0]} x{key[1]}: {name} {change:+.1f}%")
+        lines.append(f"{key[0]:<22}{key[1]:>6}" + "".join(f"{cell:>22}" for cell in cells))
+    return lines, regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0, help="Допустимое ухудшение (%%)")
+    args = parser.parse_args()
+
+    lines, regressions = compare(load(args.base), load(args.new), args.threshold)
+    print("\n".join(lines))
+    if regressions:
+        print("\nRegressions:\n" + "\n".join(regressions))
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,71 @@
+"""
+Генератор нагрузки: выполнение сценария запросов к сервису с фиксированным числом одновременных клиентов
+"""
+import time
+import asyncio
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import httpx
+
+from benchmarks.common import summarize
+
+# запрос сценария по номеру итерации: (метод, путь, JSON-тело)
+RequestFactory = Callable[[int], Tuple[str, str, Optional[Dict[str, Any]]]]
+
+
+@dataclass
+class Scenario:
+    name: str
+    make_request: RequestFactory
+
+
+async def run_scenario(client: httpx.AsyncClient,
+                       scenario: Scenario,
+                       concurrency: int,
+                       requests: int,
+                       duration: Optional[float] = None,
+                       ) -> Dict[str, Any]:
+    """
+    Функция выполнения сценария: concurrency клиентов выполняют запросы, пока не выполнено requests
+    запросов (или не истекло duration секунд)
+
+    :param client: HTTP-клиент сервиса
+    :param scenario: Сценарий
+    :param concurrency: Количество одновременных клиентов
+    :param requests: Количество запросов
+    :param duration: Ограничение длительности (сек.)
+    :return: Словарь результатов: пропускная способность, ошибки, p50/p95/p99
+    """
+    latencies: List[float] = []
+    errors: Dict[str, int] = {}
+    counter = iter(range(requests))
+    deadline = time.perf_counter() + duration if duration else None
+
+    async def worker() -> None:
+        for i in counter:
+            if deadline is not None and time.perf_counter() > deadline:
+                return
+            method, path, body = scenario.make_request(i)
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, json=body)
+                status = response.status_code
+            except httpx.HTTPError as e:
+                status = type(e).__name__
+            latencies.append((time.perf_counter() - started) * 1000)
+            if not isinstance(status, int) or status >= 400:
+                errors[str(status)] = errors.get(str(status), 0) + 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - started
+    return {'scenario': scenario.name,
+            'concurrency': concurrency,
+            'requests': len(latencies),
+            'errors': sum(errors.values()),
+            'errors_by_status': errors,
+            'duration_s': elapsed,
+            'rps': len(latencies) / elapsed if elapsed else 0.0,
+            **summarize(latencies),
+            }
@@ -0,0 +1,175 @@
+"""
+Нагрузочный прогон сервиса: заполнение истории, локальный узел-заглушка сети Трон,
+сценарии POST "/address/" и GET "/logs/" (включая глубокие страницы) при заданных уровнях параллельности
+
+Запуск: python -m benchmarks.run --rows 1000000 --concurrency 1,10,50 --output results.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.common import ROOT, environment, make_addresses
+from benchmarks.loadgen import Scenario, run_scenario
+from benchmarks.seed import seed
+from benchmarks.stub_node import StubTronNode
+
+SCENARIOS = ("post_address", "logs_first_page", "logs_deep_offset", "logs_deep_cursor", "address_history")
+
+
+async def deep_cursor(rows: int) -> Optional[str]:
+    """
+    Функция построения курсора на середину таблицы истории (страница "глубины" rows / 2)
+    """
+    from sqlalchemy import select
+    from src.database import async_session
+    from src.repositories.history import HistoryRepo
+    from src.utils.pagination import encode_cursor
+
+    model = HistoryRepo.model
+    async with async_session() as session:
+        query = (select(model.timestamp, model.id).
+                 order_by(model.timestamp.desc(), model.id.desc()).
+                 offset(rows // 2).limit(1))
+        row = (await session.execute(query)).first()
+    return encode_cursor((row.timestamp, row.id)) if row else None
+
+
+def make_scenarios(addresses: List[str], cursor: Optional[str]) -> Dict[str, Scenario]:
+    history_addresses = addresses[:100]
+    return {
+        'post_address': Scenario("post_address",
+                                 lambda i: ("POST", "/address/", {'address': addresses[i % len(addresses)]})),
+        'logs_first_page': Scenario("logs_first_page", lambda i: ("GET", "/logs/?per_page=10", None)),
+        # максимально допустимое смещение: page=100, per_page=100
+        'logs_deep_offset': Scenario("logs_deep_offset", lambda i: ("GET", "/logs/?page=100&per_page=100", None)),
+        'logs_deep_cursor': Scenario("logs_deep_cursor",
+                                     lambda i: ("GET", f"/logs/?per_page=100&cursor={cursor or ''}", None)),
+        'address_history': Scenario("address_history",
+                                    lambda i: ("GET", f"/address/{history_addresses[i % 100]}/history/?per_page=20",
+                                               None)),
+    }
+
+
+def start_server(port: int, env: Dict[str, str], workers: int = 1) -> subprocess.Popen:
+    return subprocess.Popen([sys.executable, "-m", "uvicorn", "src.main:app",
+                             "--host", "127.0.0.1", "--port", str(port), "--log-level", "warning",
+                             "--workers", str(workers)],
+                            cwd=ROOT, env=env)
+
+
+async def wait_ready(base_url: str, timeout: float = 30.0) -> None:
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get("/stats/cache/")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.2)
+    raise RuntimeError(f"Service at {base_url} did not start in {timeout}s")
+
+
+async def run_all(args: argparse.Namespace, base_url: str, scenarios: Dict[str, Scenario]) -> List[Dict[str, Any]]:
+    await wait_ready(base_url)
+    results = []
+    limits = httpx.Limits(max_connections=max(args.concurrency), max_keepalive_connections=max(args.concurrency))
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=args.timeout) as client:
+        for name in args.scenarios:
+            for concurrency in args.concurrency:
+                # прогрев соединений и кэшей перед замером
+                await run_scenario(client, scenarios[name], concurrency, min(args.requests, 10 * concurrency))
+                result = await run_scenario(client, scenarios[name], concurrency, args.requests, args.duration)
+                results.append(result)
+                print(f"{name:<20} x{concurrency:<4} rps={result['rps']:>8.1f} "
+                      f"p50={result['p50_ms']:>7.1f}ms p95={result['p95_ms']:>7.1f}ms "
+                      f"p99={result['p99_ms']:>7.1f}ms errors={result['errors']}")
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=100000, help="Строк истории перед прогоном")
+    parser.add_argument("--addresses", type=int, default=10000, help="Различных адресов в запросах")
+    parser.add_argument("--concurrency", type=lambda v: [int(x) for x in v.split(",")], default=[1, 10, 50])
+    parser.add_argument("--requests", type=int, default=1000, help="Запросов на сценарий и уровень")
+    parser.add_argument("--duration", type=float, default=None, help="Ограничение сценария по времени (сек.)")
+    parser.add_argument("--scenarios", type=lambda v: v.split(","), default=list(SCENARIOS))
+    parser.add_argument("--latency", type=float, default=0.02, help="Задержка узла-заглушки (сек.)")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Доля ошибок узла-заглушки")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--workers", type=int, default=1, help="Процессов uvicorn")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--database-url", default=None, help="БД сервиса (по умолчанию - временный SQLite)")
+    parser.add_argument("--output", default="benchmark_results.json")
+    args = parser.parse_args()
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(sorted(unknown))}")
+
+    database_url = args.database_url or f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/benchmark.db"
+    os.environ['DATABASE_URL'] = database_url
+    addresses = make_addresses(args.addresses)
+
+    async def prepare() -> Optional[str]:
+        from src.database import engine
+        from src.migrations.compact_history import migrate
+        from src.migrations.history_rollup import rebuild
+        from src.repositories.history import HISTORY_STORAGE
+        seconds = await seed(args.rows, addresses)
+        print(f"seeded {args.rows} rows in {seconds:.1f}s")
+        if HISTORY_STORAGE == "compact":
+            print(f"migrated {(await migrate())['migrated']} rows to compact storage")
+        # строки заполнения вставлены в обход репозитория - сводки пересчитываются целиком
+        print(f"rolled up {(await rebuild())['buckets']} address-hour buckets")
+        cursor = await deep_cursor(args.rows)
+        await engine.dispose()
+        return cursor
+
+    cursor = asyncio.run(prepare())
+
+    with StubTronNode(latency=args.latency, error_rate=args.error_rate) as node:
+        env = {**os.environ,
+               'DATABASE_URL': database_url,
+               'TRON_PROVIDER_URIS': node.uri,
+               'DEBUG': "False",
+               }
+        server = start_server(args.port, env, args.workers)
+        try:
+            results = asyncio.run(run_all(args, f"http://127.0.0.1:{args.port}", make_scenarios(addresses, cursor)))
+        finally:
+            server.terminate()
+            server.wait(timeout=10)
+        upstream = dict(node.requests_by_path)
+    print(f"upstream requests: {upstream}")
+
+    report = {'environment': environment(),
+              'parameters': {'rows': args.rows,
+                             'addresses': args.addresses,
+                             'requests': args.requests,
+                             'duration': args.duration,
+                             'stub_latency': args.latency,
+                             'stub_error_rate': args.error_rate,
+                             'database': database_url.split("://")[0],
+                             'history_storage': os.getenv('HISTORY_STORAGE', "legacy"),
+                             'cache_backend': os.getenv('CACHE_BACKEND', "memory"),
+                             'workers': args.workers,
+                             },
+              'results': results,
+              'upstream_requests': upstream,
+              }
+    with open(args.output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
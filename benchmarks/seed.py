@@ -0,0 +1,66 @@
+"""
+Заполнение таблицы истории синтетическими строками (миллионы строк пакетными вставками)
+
+Запуск: DATABASE_URL=... python -m benchmarks.seed --rows 1000000
+"""
+import time
+import random
+import asyncio
+import argparse
+from datetime import datetime, timedelta
+from typing import List
+
+from benchmarks.common import make_addresses
+
+SEED_CHUNK_SIZE = 10000
+
+
+async def seed(rows: int, addresses: List[str], days: float = 30.0,
+               chunk_size: int = SEED_CHUNK_SIZE, seed_value: int = 42) -> float:
+    """
+    Функция заполнения истории строками с метками времени, равномерно распределенными за период
+
+    :param rows: Количество строк
+    :param addresses: Адреса кошельков для строк
+    :param days: Период истории (дней до текущего момента)
+    :param chunk_size: Строк в одной транзакции
+    :param seed_value: Начальное значение генератора
+    :return: Длительность заполнения (сек.)
+    """
+    from sqlalchemy import insert
+    from src.database import engine, init_db
+    from src.models.history import HistoryModel
+
+    await init_db()
+    rng = random.Random(seed_value)
+    start = datetime.utcnow() - timedelta(days=days)
+    step = timedelta(days=days) / max(rows, 1)
+    stmt = insert(HistoryModel.__table__)
+
+    started = time.perf_counter()
+    for offset in range(0, rows, chunk_size):
+        chunk = [{'address': rng.choice(addresses),
+                  'balance': round(rng.uniform(0, 100000), 6),
+                  'bandwidth': float(rng.randint(0, 5000)),
+                  'energy': float(rng.randint(0, 100000)),
+                  'timestamp': start + step * i,
+                  } for i in range(offset, min(offset + chunk_size, rows))]
+        async with engine.begin() as conn:
+            await conn.execute(stmt, chunk)
+    return time.perf_counter() - started
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--addresses", type=int, default=10000, help="Количество различных адресов")
+    parser.add_argument("--days", type=float, default=30.0)
+    parser.add_argument("--chunk-size", type=int, default=SEED_CHUNK_SIZE)
+    args = parser.parse_args()
+
+    elapsed = asyncio.run(seed(args.rows, make_addresses(args.addresses), args.days, args.chunk_size))
+    print(f"seeded {args.rows} rows in {elapsed:.1f}s ({args.rows / elapsed:.0f} rows/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,93 @@
+"""
+Сравнение размера и скорости выборки истории: прежняя таблица history против компактного хранилища
+
+Запуск: python -m benchmarks.storage --rows 1000000
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from typing import Any, Dict, List
+
+from benchmarks.common import environment, make_addresses, summarize
+from benchmarks.seed import seed
+
+LEGACY_OBJECTS = ('history', 'ix_history_timestamp_id', 'ix_history_address_timestamp_id')
+COMPACT_OBJECTS = ('history_compact', 'ix_history_compact_timestamp_id',
+                   'ix_history_compact_address_timestamp_id', 'address', 'sqlite_autoindex_address_1')
+
+
+async def table_sizes() -> Dict[str, int]:
+    from sqlalchemy import text
+    from src.database import engine
+
+    async with engine.connect() as conn:
+        rows = (await conn.execute(text("SELECT name, SUM(pgsize) FROM dbstat GROUP BY name"))).all()
+    return {name: size for name, size in rows}
+
+
+async def query_latency(repository, addresses: List[str], queries: int, per_page: int) -> Dict[str, float]:
+    rng = random.Random(7)
+    samples = []
+    for _ in range(queries):
+        address = rng.choice(addresses)
+        started = time.perf_counter()
+        await repository.get_by_address(address, per_page)
+        samples.append((time.perf_counter() - started) * 1000)
+    return summarize(samples)
+
+
+async def run(rows: int, address_count: int, queries: int, per_page: int) -> Dict[str, Any]:
+    from src.migrations.compact_history import migrate
+    from src.repositories.history import CompactHistoryRepo, LegacyHistoryRepo
+
+    addresses = make_addresses(address_count)
+    await seed(rows, addresses)
+    await migrate()
+    sizes = await table_sizes()
+
+    legacy_bytes = sum(sizes.get(name, 0) for name in LEGACY_OBJECTS)
+    compact_bytes = sum(sizes.get(name, 0) for name in COMPACT_OBJECTS)
+    # прогрев кэша id адресов и страниц БД
+    await query_latency(CompactHistoryRepo(), addresses, min(queries, 100), per_page)
+    await query_latency(LegacyHistoryRepo(), addresses, min(queries, 100), per_page)
+    return {'rows': rows,
+            'addresses': address_count,
+            'sizes': sizes,
+            'legacy_bytes': legacy_bytes,
+            'compact_bytes': compact_bytes,
+            'size_ratio': legacy_bytes / compact_bytes if compact_bytes else None,
+            'legacy_by_address': await query_latency(LegacyHistoryRepo(), addresses, queries, per_page),
+            'compact_by_address': await query_latency(CompactHistoryRepo(), addresses, queries, per_page),
+            }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--addresses", type=int, default=10000)
+    parser.add_argument("--queries", type=int, default=2000)
+    parser.add_argument("--per-page", type=int, default=20)
+    parser.add_argument("--output", help="Файл результатов в формате JSON")
+    args = parser.parse_args()
+
+    # замер размера по dbstat возможен только для SQLite - всегда отдельная временная БД
+    os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/benchmark_storage.db"
+    result = asyncio.run(run(args.rows, args.addresses, args.queries, args.per_page))
+    print(f"legacy:  {result['legacy_bytes'] / args.rows:.1f} bytes/row, "
+          f"by address p50={result['legacy_by_address']['p50_ms']:.3f}ms "
+          f"p95={result['legacy_by_address']['p95_ms']:.3f}ms")
+    print(f"compact: {result['compact_bytes'] / args.rows:.1f} bytes/row, "
+          f"by address p50={result['compact_by_address']['p50_ms']:.3f}ms "
+          f"p95={result['compact_by_address']['p95_ms']:.3f}ms")
+    print(f"size ratio: {result['size_ratio']:.2f}x")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({'environment': environment(), 'result': result}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import json
+import random
+import threading
+import time
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+
+class _StubServer(ThreadingHTTPServer):
+    # запас очереди соединений для нагрузочных тестов
+    request_queue_size = 256
+    daemon_threads = True
+
+
+class StubTronNode:
+    """
+    Локальный HTTP-узел, имитирующий API full-node сети Трон, с настраиваемой задержкой и долей ошибок
+    """
+
+    def __init__(self,
+                 latency: float = 0.0,
+                 error_rate: float = 0.0,
+                 accounts: Optional[Dict[str, Dict[str, Any]]] = None,
+                 block_number: int = 1,
+                 host: str = "127.0.0.1",
+                 port: int = 0,
+                 ):
+        self.latency: float = latency
+        self.error_rate: float = error_rate
+        self.accounts: Optional[Dict[str, Dict[str, Any]]] = accounts
+        self.block_number: int = block_number
+        self.host: str = host
+        self.port: int = port
+        self.requests: int = 0
+        self.requests_by_path: Counter = Counter()
+        self._server: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def uri(self) -> str:
+        host, port = self._server.server_address[:2]
+        return f"http://{host}:{port}/"
+
+    def account(self, address: str) -> Dict[str, Any]:
+        if self.accounts is None:
+            return {"address": address, "balance": 1_000_000}
+        return self.accounts.get(address, {})
+
+    def respond(self, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+        address = params.get("address", "")
+        if path == "/wallet/getaccount":
+            return self.account(address)
+        if path == "/wallet/getaccountresource":
+            return {"freeNetLimit": 600, "freeNetUsed": 100, "NetLimit": 0, "NetUsed": 0,
+                    "EnergyLimit": 1000, "EnergyUsed": 250} if self.account(address) else {}
+        if path == "/wallet/getaccountnet":
+            return {"freeNetLimit": 600, "freeNetUsed": 100} if self.account(address) else {}
+        if path == "/wallet/getnodeinfo":
+            return {"block": f"Num:{self.block_number},ID:{self.block_number:064x}"}
+        return {}
+
+    def _handler(self):
+        node = self
+
+        class Handler(BaseHTTPRequestHandler):
+            # keep-alive: клиент переиспользует соединения, как с настоящим узлом
+            protocol_version = "HTTP/1.1"
+
+            def do_POST(self):
+                node.requests += 1
+                node.requests_by_path[self.path] += 1
+                length = int(self.headers.get("Content-Length", 0))
+                params = json.loads(self.rfile.read(length) or b"{}")
+                if node.latency:
+                    time.sleep(node.latency)
+                if random.random() < node.error_rate:
+                    self.send_response(500)
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                    return
+                body = json.dumps(node.respond(self.path, params)).encode()
+                try:
+                    self.send_response(200)
+                    self.send_header("Content-Type", "application/json")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    # клиент закрыл соединение (например, отмененный хеджированный запрос)
+                    pass
+
+            def log_message(self, *args):
+                pass
+
+        return Handler
+
+    def start(self) -> "StubTronNode":
+        self._server = _StubServer((self.host, self.port), self._handler())
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self) -> "StubTronNode":
+        return self.start()
+
+    def __exit__(self, *args) -> None:
+        self.stop()
@@ -0,0 +1,78 @@
+"""
+Сравнение задержки пути записи POST "/address/": вставка + повторное чтение строки
+против вставки с RETURNING и сериализации без повторной валидации
+
+Запуск: python -m benchmarks.write_path --requests 2000
+"""
+import os
+import json
+import time
+import asyncio
+import argparse
+import tempfile
+from typing import Awaitable, Callable, Dict, List
+
+from benchmarks.common import summarize
+
+
+async def measure(name: str, step: Callable[[int], Awaitable[None]], requests: int, warmup: int) -> Dict[str, float]:
+    for i in range(warmup):
+        await step(i)
+    samples = []
+    for i in range(requests):
+        started = time.perf_counter()
+        await step(i)
+        samples.append((time.perf_counter() - started) * 1000)
+    return {'name': name, 'requests': requests, **summarize(samples)}
+
+
+async def run(requests: int, warmup: int) -> List[Dict[str, float]]:
+    from src.database import init_db
+    from src.repositories.history import HistoryRepo
+    from src.schemas.address import AddressResponseSchema
+    from src.services.history import HistoryService
+    from src.utils.responses import trusted_response
+
+    await init_db()
+    account = {'address': "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL",
+               'balance': 1000.0,
+               'bandwidth': {'available': 600},
+               'energy': {'available': 0},
+               }
+
+    async def read_back(_: int) -> None:
+        # прежний путь: два сервиса, две сессии, вставка и чтение строки, валидация ответа
+        history_id = await HistoryService(HistoryRepo).add_history(account, sync=True)
+        history = await HistoryService(HistoryRepo).get_history_one(history_id)
+        AddressResponseSchema.model_validate(history, from_attributes=True).model_dump_json()
+
+    async def returning(_: int) -> None:
+        history_dict = await HistoryService(HistoryRepo).add_history_returning(account)
+        trusted_response(AddressResponseSchema, history_dict)
+
+    return [await measure("read_back", read_back, requests, warmup),
+            await measure("returning", returning, requests, warmup)]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--warmup", type=int, default=100)
+    parser.add_argument("--output", help="Файл результатов в формате JSON")
+    args = parser.parse_args()
+
+    if 'DATABASE_URL' not in os.environ:
+        # отдельная временная БД, чтобы не засорять рабочую
+        os.environ['DATABASE_URL'] = f"sqlite+aiosqlite:///{tempfile.mkdtemp()}/bench_write_path.db"
+
+    results = asyncio.run(run(args.requests, args.warmup))
+    for result in results:
+        print(f"{result['name']:<10} mean={result['mean_ms']:.3f}ms p50={result['p50_ms']:.3f}ms "
+              f"p95={result['p95_ms']:.3f}ms p99={result['p99_ms']:.3f}ms")
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,7 +1,9 @@
 from fastapi import APIRouter
 
 from src.app.routers import router
+from src.app.watchlist import router as watchlist_router
 
 main_router = APIRouter()
 
 main_router.include_router(router)
+main_router.include_router(watchlist_router)
@@ -1,15 +1,55 @@
-from typing import Annotated
-from fastapi import Depends
+from datetime import datetime
+from typing import Annotated, Literal, Optional
+from fastapi import Depends, Request
 from pydantic import Field, BaseModel
 
 from sqlalchemy.ext.asyncio import AsyncSession
 from src.database import get_db_session
+from src.tron.nodes import TronNodePool, get_tron_client
 
 
 class PaginationSchema(BaseModel):
     page: int = Field(1, ge=1, le=100, description="Номер страницы")
     per_page: int = Field(10, ge=1, le=100, description="Элементов на странице")
+    cursor: Optional[str] = Field(None, description="Курсор страницы (вместо номера страницы)")
+
+
+class CursorPaginationSchema(BaseModel):
+    per_page: int = Field(10, ge=1, le=100, description="Элементов на странице")
+    cursor: Optional[str] = Field(None, description="Курсор страницы")
+
+
+class ExportFilterSchema(BaseModel):
+    format: Literal["ndjson", "csv"] = Field("ndjson", description="Формат выгрузки")
+    address: Optional[str] = Field(None, description="Адрес кошелька")
+    since: Optional[datetime] = Field(None, description="Начало периода (включительно)")
+    until: Optional[datetime] = Field(None, description="Конец периода (не включительно)")
+    archive: bool = Field(True, description="Включить строки, перенесенные в архив")
+
+
+class StatsWindowSchema(BaseModel):
+    hours: int = Field(24, ge=1, le=720, description="Часов почасовой сводки")
+
+
+class SeriesFilterSchema(BaseModel):
+    since: Optional[datetime] = Field(None, description="Начало периода (по умолчанию - первый запрос адреса)")
+    until: Optional[datetime] = Field(None, description="Конец периода (не включительно, по умолчанию - сейчас)")
+    points: int = Field(200, ge=2, le=1000, description="Максимальное количество точек")
+    method: Literal["buckets", "lttb"] = Field("buckets", description="Способ прореживания")
+
+
+def get_client_key(request: Request) -> str:
+    """
+    Функция-зависимость получения ключа клиента (IP-адреса) для справедливой очереди запросов
+    """
+    return request.client.host if request.client else ""
 
 
 PaginationDep = Annotated[PaginationSchema, Depends(PaginationSchema)]
+CursorPaginationDep = Annotated[CursorPaginationSchema, Depends(CursorPaginationSchema)]
+ExportFilterDep = Annotated[ExportFilterSchema, Depends(ExportFilterSchema)]
+StatsWindowDep = Annotated[StatsWindowSchema, Depends(StatsWindowSchema)]
+SeriesFilterDep = Annotated[SeriesFilterSchema, Depends(SeriesFilterSchema)]
 SessionDep = Annotated[AsyncSession, Depends(get_db_session)]
+TronDep = Annotated[TronNodePool, Depends(get_tron_client)]
+ClientKeyDep = Annotated[str, Depends(get_client_key)]
@@ -0,0 +1,38 @@
+import time
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.utils.metrics import http_request_duration, http_requests, http_requests_in_flight
+
+
+class MetricsMiddleware:
+    """
+    ASGI-middleware учета HTTP-запросов: количество по коду ответа, задержка и запросы в обработке
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app: ASGIApp = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        http_requests_in_flight.inc()
+        started = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            http_requests_in_flight.dec()
+            # шаблон пути маршрута, а не сам путь - чтобы адреса не порождали новые ряды метрик
+            route = scope.get("route")
+            path = getattr(route, "path", "unmatched")
+            http_request_duration.observe(time.perf_counter() - started, method=scope["method"], route=path)
+            http_requests.inc(method=scope["method"], route=path, status=str(status_code))
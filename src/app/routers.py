@@ -1,43 +1,32 @@
-import os
-from fastapi import APIRouter, HTTPException
-from tronpy import AsyncTron
-from typing import Dict, Any
-from dotenv import load_dotenv
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import PlainTextResponse, Response, StreamingResponse
+from typing import Dict, Any, List, Optional
 
-from src.app.dependencies import PaginationDep
-from src.repositories.history import HistoryRepo
-from src.schemas.address import AddressRequestSchema, AddressResponseSchema
-from src.schemas.history import HistoryResponseSchemas
-from src.services.history import HistoryService
-
-load_dotenv()
-TRON_NETWORK = os.getenv('TRON_NETWORK', "shasta")
+from src.app.dependencies import (ClientKeyDep, CursorPaginationDep, ExportFilterDep, PaginationDep,
+                                  SeriesFilterDep, StatsWindowDep, TronDep)
+from src.repositories.history import HistoryRepo, history_version
+from src.schemas.address import (AddressRequestSchema, AddressResponseSchema,
+                                 AddressBatchRequestSchema, AddressBatchResponseSchema)
+from src.schemas.cache import AdmissionStatsSchema, CacheStatsSchema, TronNodesStatsSchema
+from src.schemas.history import (AddressHistoryResponseSchema, AddressSeriesSchema, AddressStatsSchema,
+                                 HistoryArchiveStatsSchema, HistoryResponseSchemas, HistoryWriterStatsSchema)
+from src.services.archive import history_archive
+from src.services.history import HistoryService, EXPORT_MEDIA_TYPES
+from src.services.history_writer import history_writer
+from src.services.account import fetch_tron_account
+from src.tron.address import normalize_address
+from src.tron.admission import upstream_admission
+from src.tron.blocks import block_tracker
+from src.tron.cache import account_cache
+from src.tron.client import TRON_BATCH_CONCURRENCY
+from src.tron.nodes import tron_nodes
+from src.utils.metrics import registry, stage_duration
+from src.utils.responses import not_modified, trusted_response, validator_headers
 
 router = APIRouter()
 
-
-async def get_tron_account(network, address):
-    """
-    Функция получения ТРОН-аккаунта
-
-    :param network:
-    :param address:
-    :return:
-    """
-    async with AsyncTron(network=network) as client:
-        # проверка (валидация) адреса
-        if not client.is_address(address):
-            raise HTTPException(status_code=400, detail="Invalid address")
-
-        # попытка получить аккаунт
-        try:
-            account: Dict[str, Any] = await client.get_account(address)
-        except Exception as e:
-            raise HTTPException(status_code=500, detail=str(e))
-        if not account:
-            raise HTTPException(status_code=404, detail="Account not found")
-
-        return account
+ERROR_TYPES = {400: "invalid", 404: "not_found", 429: "overloaded", 503: "overloaded"}
 
 
 @router.post(path="/address/",
@@ -45,7 +34,7 @@ async def get_tron_account(network, address):
              tags=["Получение данных TRON-кошельков"],
              summary="Запрос данных кошелька",
              )
-async def get_address_info(request: AddressRequestSchema) -> Dict[str, Any]:
+async def get_address_info(request: AddressRequestSchema, client: TronDep, client_key: ClientKeyDep) -> Response:
     """
     Функция - эндпоинт "/address/" запроса информации по адресу в сети "Трон"
 
@@ -54,10 +43,55 @@ async def get_address_info(request: AddressRequestSchema) -> Dict[str, Any]:
     """
 
     address: str = request.address.strip()
-    account = await get_tron_account(TRON_NETWORK, address)
-    history_id = await HistoryService(HistoryRepo).add_history(account)
-    history_dict = await HistoryService(HistoryRepo).get_history_one(history_id)
-    return history_dict
+    account = await fetch_tron_account(client, address, client_key)
+    # строка истории возвращается запросом вставки - без повторного чтения
+    history_dict = await HistoryService(HistoryRepo).add_history_returning(account)
+    if 'tokens' in account:
+        history_dict['tokens'] = account['tokens']
+    with stage_duration.time(stage="serialize"):
+        return trusted_response(AddressResponseSchema, history_dict)
+
+
+@router.post(path="/address/batch/",
+             response_model=AddressBatchResponseSchema,
+             tags=["Получение данных TRON-кошельков"],
+             summary="Пакетный запрос данных кошельков",
+             )
+async def get_address_batch_info(request: AddressBatchRequestSchema,
+                                 client: TronDep,
+                                 client_key: ClientKeyDep) -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/address/batch/" пакетного запроса информации по адресам в сети "Трон"
+
+    :параметр - addresses: Список адресов кошельков \n
+    :возврат: Словарь данных о кошельках и ошибок по каждому адресу
+    """
+    semaphore = asyncio.Semaphore(TRON_BATCH_CONCURRENCY)
+
+    async def fetch(address: str) -> Dict[str, Any]:
+        async with semaphore:
+            try:
+                return {'account': await fetch_tron_account(client, address, client_key)}
+            except HTTPException as e:
+                return {'error': {'type': ERROR_TYPES.get(e.status_code, "upstream"), 'detail': str(e.detail)}}
+
+    addresses: List[str] = [address.strip() for address in request.addresses]
+    fetched = await asyncio.gather(*[fetch(address) for address in addresses])
+
+    accounts = [item['account'] for item in fetched if 'account' in item]
+    await HistoryService(HistoryRepo).add_history_many(accounts)
+
+    items = []
+    for address, item in zip(addresses, fetched):
+        if 'account' in item:
+            account = item['account']
+            result = HistoryService.to_history_dict(account)
+            if 'tokens' in account:
+                result['tokens'] = account['tokens']
+            items.append({'address': address, 'result': result})
+        else:
+            items.append({'address': address, 'error': item['error']})
+    return {'items': items}
 
 
 @router.get(path="/logs/",
@@ -65,15 +99,218 @@ async def get_address_info(request: AddressRequestSchema) -> Dict[str, Any]:
             tags=["Получение данных TRON-кошельков"],
             summary="История запросов",
             )
-async def get_logs(pagination: PaginationDep) -> Dict[str, Any]:
+async def get_logs(pagination: PaginationDep, request: Request) -> Response:
     """
-    Функция - эндпоинт "/logs/" запроса информации по истории полученных данных из сети "Трон"
+    Функция - эндпоинт "/logs/" запроса информации по истории полученных данных из сети "Трон".
+    Ответ несет ETag версии истории; на повторный запрос с If-None-Match при неизменной истории
+    возвращается 304 без обращения к таблице истории
 
     :параметр - page: Номер страницы данных \n
     :параметр - per_page: Количество данных на одной странице \n
+    :параметр - cursor: Курсор страницы из поля "next_cursor" предыдущего ответа \n
     :возврат: Пагинированный словарь данных истории запросов
     """
-    schema = HistoryResponseSchemas()
-    schema.page, schema.per_page = pagination.page, pagination.per_page
-    history_dict = await HistoryService(HistoryRepo).get_history_paginated(schema)
+    generation = await history_version.current()
+    headers = validator_headers(str(generation))
+    if not_modified(request.headers, str(generation)):
+        return Response(status_code=304, headers=headers)
+    try:
+        body = await HistoryService(HistoryRepo).render_history_page(pagination.page, pagination.per_page,
+                                                                     pagination.cursor, generation)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@router.get(path="/address/{address}/history/",
+            response_model=AddressHistoryResponseSchema,
+            tags=["Получение данных TRON-кошельков"],
+            summary="История запросов по адресу",
+            )
+async def get_address_logs(address: str, pagination: CursorPaginationDep) -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/address/{address}/history/" истории запросов одного кошелька (сначала новые)
+
+    :параметр - address: Адрес кошелька \n
+    :параметр - per_page: Количество данных на одной странице \n
+    :параметр - cursor: Курсор страницы из поля "next_cursor" предыдущего ответа \n
+    :возврат: Пагинированный словарь данных истории запросов по адресу
+    """
+    normalized: Optional[str] = normalize_address(address)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail="Invalid address")
+    schema = AddressHistoryResponseSchema(address=normalized, per_page=pagination.per_page)
+    try:
+        history_dict = await HistoryService(HistoryRepo).get_address_history(schema, pagination.cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
     return history_dict
+
+
+@router.get(path="/address/{address}/stats/",
+            response_model=AddressStatsSchema,
+            tags=["Получение данных TRON-кошельков"],
+            summary="Сводка запросов по адресу",
+            )
+async def get_address_stats(address: str, window: StatsWindowDep) -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/address/{address}/stats/" сводки запросов кошелька из сводных таблиц:
+    количество запросов, минимальный, максимальный и последний баланс, почасовая разбивка
+
+    :параметр - address: Адрес кошелька \n
+    :параметр - hours: Количество последних часов почасовой сводки \n
+    :возврат: Словарь сводки по адресу
+    """
+    normalized: Optional[str] = normalize_address(address)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail="Invalid address")
+    stats = await HistoryService(HistoryRepo).get_address_stats(normalized, window.hours)
+    if stats is None:
+        raise HTTPException(status_code=404, detail="Address has no history")
+    return stats
+
+
+@router.get(path="/address/{address}/series/",
+            response_model=AddressSeriesSchema,
+            tags=["Получение данных TRON-кошельков"],
+            summary="Временной ряд баланса и ресурсов кошелька",
+            )
+async def get_address_series(address: str, series_filter: SeriesFilterDep) -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/address/{address}/series/" временного ряда баланса, bandwidth и energy кошелька,
+    агрегированного в БД до заданного количества точек (минимум, максимум и последнее значение в корзине)
+
+    :параметр - address: Адрес кошелька \n
+    :параметр - since: Начало периода \n
+    :параметр - until: Конец периода \n
+    :параметр - points: Максимальное количество точек \n
+    :параметр - method: Способ прореживания (buckets - равные корзины, lttb - точки формы графика) \n
+    :возврат: Словарь временного ряда
+    """
+    normalized: Optional[str] = normalize_address(address)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail="Invalid address")
+    try:
+        series = await HistoryService(HistoryRepo).get_address_series(normalized,
+                                                                     series_filter.since,
+                                                                     series_filter.until,
+                                                                     series_filter.points,
+                                                                     series_filter.method)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    if series is None:
+        raise HTTPException(status_code=404, detail="Address has no history")
+    return series
+
+
+@router.get(path="/logs/export/",
+            response_class=StreamingResponse,
+            tags=["Получение данных TRON-кошельков"],
+            summary="Потоковая выгрузка истории запросов",
+            )
+async def export_logs(filters: ExportFilterDep) -> StreamingResponse:
+    """
+    Функция - эндпоинт "/logs/export/" потоковой выгрузки истории запросов в NDJSON или CSV
+
+    :параметр - format: Формат выгрузки (ndjson, csv) \n
+    :параметр - address: Адрес кошелька \n
+    :параметр - since: Начало периода \n
+    :параметр - until: Конец периода \n
+    :параметр - archive: Включить строки, перенесенные в архив (выгружаются первыми) \n
+    :возврат: Потоковый ответ с записями истории
+    """
+    address: Optional[str] = None
+    if filters.address is not None:
+        address = normalize_address(filters.address)
+        if address is None:
+            raise HTTPException(status_code=400, detail="Invalid address")
+    rows = HistoryService(HistoryRepo).export_history(filters.format, address, filters.since, filters.until,
+                                                      filters.archive)
+    return StreamingResponse(rows,
+                             media_type=EXPORT_MEDIA_TYPES[filters.format],
+                             headers={"Content-Disposition": f'attachment; filename="history.{filters.format}"'})
+
+
+@router.get(path="/stats/cache/",
+            response_model=CacheStatsSchema,
+            tags=["Служебные"],
+            summary="Статистика кэша аккаунтов",
+            )
+async def get_cache_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/stats/cache/" получения счетчиков кэша аккаунтов
+
+    :возврат: Словарь счетчиков кэша
+    """
+    return {**(await account_cache.stats()), 'block': block_tracker.current()}
+
+
+@router.get(path="/stats/history-writer/",
+            response_model=HistoryWriterStatsSchema,
+            tags=["Служебные"],
+            summary="Статистика буфера записи истории",
+            )
+async def get_history_writer_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/stats/history-writer/" получения счетчиков буфера отложенной записи истории
+
+    :возврат: Словарь счетчиков буфера
+    """
+    return history_writer.stats()
+
+
+@router.get(path="/stats/history-archive/",
+            response_model=HistoryArchiveStatsSchema,
+            tags=["Служебные"],
+            summary="Статистика архива истории",
+            )
+async def get_history_archive_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/stats/history-archive/" получения счетчиков переноса строк истории в архив
+    и размера архива по сегментам
+
+    :возврат: Словарь счетчиков архива
+    """
+    return await asyncio.to_thread(history_archive.stats)
+
+
+@router.get(path="/stats/tron-nodes/",
+            response_model=TronNodesStatsSchema,
+            tags=["Служебные"],
+            summary="Статистика узлов сети Трон",
+            )
+async def get_tron_nodes_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/stats/tron-nodes/" получения состояния и задержек узлов сети Трон
+
+    :возврат: Словарь статистики по каждому узлу
+    """
+    return tron_nodes.stats()
+
+
+@router.get(path="/stats/admission/",
+            response_model=AdmissionStatsSchema,
+            tags=["Служебные"],
+            summary="Статистика контроля допуска запросов к сети Трон",
+            )
+async def get_admission_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/stats/admission/" получения счетчиков ограничителя запросов к сети Трон
+
+    :возврат: Словарь счетчиков
+    """
+    return upstream_admission.stats()
+
+
+@router.get(path="/metrics",
+            response_class=PlainTextResponse,
+            tags=["Служебные"],
+            summary="Метрики в формате Prometheus",
+            )
+async def get_metrics() -> PlainTextResponse:
+    """
+    Функция - эндпоинт "/metrics" получения метрик сервиса в текстовом формате Prometheus
+
+    :возврат: Текст метрик (задержки по этапам, ошибки сети Трон, пул БД, запросы в обработке)
+    """
+    return PlainTextResponse(registry.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
@@ -0,0 +1,109 @@
+import json
+import asyncio
+from fastapi import APIRouter, HTTPException, Request
+from fastapi.responses import StreamingResponse
+from typing import Any, AsyncGenerator, Dict, List, Optional
+
+from src.schemas.watchlist import WatchlistRequestSchema, WatchlistResponseSchema, WatchlistStatsSchema
+from src.services.watchlist import watchlist, WatchlistFull
+from src.tron.address import normalize_address
+
+router = APIRouter(prefix="/watchlist", tags=["Отслеживание TRON-кошельков"])
+
+SSE_KEEPALIVE_INTERVAL = 15.0
+
+
+@router.get(path="/",
+            response_model=WatchlistResponseSchema,
+            summary="Список отслеживаемых кошельков",
+            )
+async def get_watchlist() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/watchlist/" получения списка отслеживаемых кошельков
+
+    :возврат: Словарь со списком адресов
+    """
+    return {'addresses': watchlist.addresses}
+
+
+@router.post(path="/",
+             response_model=WatchlistResponseSchema,
+             summary="Добавление кошельков в отслеживание",
+             )
+async def add_to_watchlist(request: WatchlistRequestSchema) -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/watchlist/" добавления кошельков в список отслеживания
+
+    :параметр - addresses: Список адресов кошельков \n
+    :возврат: Словарь добавленных и неверных адресов
+    """
+    added: List[str] = []
+    invalid: List[str] = []
+    for address in request.addresses:
+        normalized: Optional[str] = normalize_address(address)
+        if normalized is None:
+            invalid.append(address)
+            continue
+        try:
+            watchlist.add(normalized)
+        except WatchlistFull as e:
+            raise HTTPException(status_code=409, detail=str(e))
+        added.append(normalized)
+    return {'addresses': added, 'invalid': invalid}
+
+
+@router.delete(path="/{address}/",
+               status_code=204,
+               summary="Удаление кошелька из отслеживания",
+               )
+async def remove_from_watchlist(address: str) -> None:
+    """
+    Функция - эндпоинт "/watchlist/{address}/" удаления кошелька из списка отслеживания
+
+    :параметр - address: Адрес кошелька
+    """
+    normalized: Optional[str] = normalize_address(address)
+    if normalized is None or not watchlist.remove(normalized):
+        raise HTTPException(status_code=404, detail="Address is not watched")
+
+
+@router.get(path="/stream/",
+            response_class=StreamingResponse,
+            summary="Поток изменений отслеживаемых кошельков (SSE)",
+            )
+async def stream_watchlist(request: Request) -> StreamingResponse:
+    """
+    Функция - эндпоинт "/watchlist/stream/" подписки на изменения баланса, bandwidth и energy (Server-Sent Events)
+
+    :возврат: Поток событий "update"
+    """
+    queue: asyncio.Queue = watchlist.subscribe()
+
+    async def events() -> AsyncGenerator[str, None]:
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), SSE_KEEPALIVE_INTERVAL)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: update\ndata: {json.dumps(event, default=str)}\n\n"
+        finally:
+            watchlist.unsubscribe(queue)
+
+    return StreamingResponse(events(),
+                             media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+
+@router.get(path="/stats/",
+            response_model=WatchlistStatsSchema,
+            summary="Статистика отслеживания кошельков",
+            )
+async def get_watchlist_stats() -> Dict[str, Any]:
+    """
+    Функция - эндпоинт "/watchlist/stats/" получения счетчиков обновления отслеживаемых кошельков
+
+    :возврат: Словарь счетчиков
+    """
+    return watchlist.stats()
@@ -1,10 +1,13 @@
 import os
+from sqlalchemy import event, make_url
 from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine, async_sessionmaker
-from sqlalchemy.orm import DeclarativeBase
-from sqlalchemy.pool import NullPool
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.pool import StaticPool
 from dotenv import load_dotenv
 from typing import AsyncGenerator
 
+from src.utils.metrics import registry
+
 
 class Base(DeclarativeBase):
     pass
@@ -12,15 +15,83 @@ class Base(DeclarativeBase):
 
 load_dotenv()
 DB_NAME = os.getenv('DB_NAME', "tron")
-DATABASE_URL = f"sqlite+aiosqlite:///./{DB_NAME}.db"
+DATABASE_URL = os.getenv('DATABASE_URL', f"sqlite+aiosqlite:///./{DB_NAME}.db")
 DEBUG = os.getenv('DEBUG', 'False')
 
+# Connection Pool Settings
+DB_POOL_SIZE = int(os.getenv('DB_POOL_SIZE', 5))
+DB_MAX_OVERFLOW = int(os.getenv('DB_MAX_OVERFLOW', 10))
+DB_POOL_TIMEOUT = float(os.getenv('DB_POOL_TIMEOUT', 30.0))
+DB_POOL_RECYCLE = int(os.getenv('DB_POOL_RECYCLE', 1800))
+
+# SQLite Settings
+SQLITE_JOURNAL_MODE = os.getenv('SQLITE_JOURNAL_MODE', "WAL")
+SQLITE_SYNCHRONOUS = os.getenv('SQLITE_SYNCHRONOUS', "NORMAL")
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv('SQLITE_BUSY_TIMEOUT_MS', 5000))
+SQLITE_MMAP_SIZE = int(os.getenv('SQLITE_MMAP_SIZE', 268435456))
+# INCREMENTAL - освобожденные удалением страницы возвращаются файлу БД (только для новой БД или после VACUUM)
+SQLITE_AUTO_VACUUM = os.getenv('SQLITE_AUTO_VACUUM', "INCREMENTAL")
+
+url = make_url(DATABASE_URL)
+IS_SQLITE = url.get_backend_name() == "sqlite"
+
+if IS_SQLITE and url.database in (None, "", ":memory:"):
+    # БД в памяти существует только в рамках одного соединения
+    pool_kwargs = {'poolclass': StaticPool}
+else:
+    pool_kwargs = {'pool_size': DB_POOL_SIZE,
+                   'max_overflow': DB_MAX_OVERFLOW,
+                   'pool_timeout': DB_POOL_TIMEOUT,
+                   'pool_recycle': DB_POOL_RECYCLE,
+                   'pool_pre_ping': not IS_SQLITE,
+                   }
+
 engine: AsyncEngine = create_async_engine(
-    DATABASE_URL,
-    poolclass=NullPool,
-    echo=eval(DEBUG)
+    url,
+    echo=eval(DEBUG),
+    **pool_kwargs
 )
 
+
+if IS_SQLITE:
+    @event.listens_for(engine.sync_engine, "connect")
+    def set_sqlite_pragma(dbapi_connection, connection_record) -> None:
+        """
+        Функция настройки SQLite-соединения при подключении
+        """
+        cursor = dbapi_connection.cursor()
+        cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+        # auto_vacuum действует только в новом файле (до создания таблиц и перехода в WAL) и требует
+        # блокировки записи - в существующей БД не выполняется, чтобы подключение не ждало пишущие транзакции
+        cursor.execute("SELECT 1 FROM sqlite_master LIMIT 1")
+        if not cursor.fetchone():
+            cursor.execute(f"PRAGMA auto_vacuum={SQLITE_AUTO_VACUUM}")
+        cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_SIZE}")
+        cursor.close()
+
+
+# состояние пула соединений (у StaticPool/NullPool этих счетчиков нет)
+if hasattr(engine.pool, "checkedout"):
+    registry.gauge("db_pool_size", "DB connection pool size", function=engine.pool.size)
+    registry.gauge("db_pool_checked_out", "DB connections in use", function=engine.pool.checkedout)
+    registry.gauge("db_pool_checked_in", "Idle DB connections in pool", function=engine.pool.checkedin)
+    registry.gauge("db_pool_overflow", "DB connections over pool size", function=engine.pool.overflow)
+db_transactions = registry.counter("db_session_transactions_total", "DB session transactions started")
+db_commits = registry.counter("db_session_commits_total", "DB session transactions committed")
+
+
+@event.listens_for(Session, "after_begin")
+def count_transaction(session: Session, transaction, connection) -> None:
+    db_transactions.inc()
+
+
+@event.listens_for(Session, "after_commit")
+def count_commit(session: Session) -> None:
+    db_commits.inc()
+
+
 async_session = async_sessionmaker(
     bind=engine,
     autocommit=False,
@@ -51,6 +122,31 @@ async def init_db() -> None:
     """
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(create_indexes)
+
+
+def create_indexes(conn) -> None:
+    """
+    Функция создания индексов, отсутствующих в уже существующих таблицах
+    """
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(conn, checkfirst=True)
+
+
+async def vacuum_db(full: bool = False) -> None:
+    """
+    Функция возврата свободных страниц SQLite-файла после удаления строк
+    (full - полная перестройка файла, включает auto_vacuum в существующей БД; блокирует запись на время работы)
+
+    :param full: Полный VACUUM вместо incremental_vacuum
+    """
+    if not IS_SQLITE:
+        return
+    async with engine.connect() as conn:
+        raw = await conn.get_raw_connection()
+        # executescript выполняет PRAGMA до конца (обычный execute освобождает одну страницу)
+        await raw.driver_connection.executescript("VACUUM" if full else "PRAGMA incremental_vacuum")
 
 
 async def drop_db() -> None:
@@ -0,0 +1,262 @@
+"""
+Пакетная загрузка снимков кошельков в историю из файла или stdin (один адрес в строке)
+
+Запуск: python -m src.ingest addresses.txt --concurrency 20 --batch-size 500
+        cat addresses.txt | python -m src.ingest - --checkpoint addresses.checkpoint
+Адреса проверяются без обращения к сети, запрашиваются через кэш аккаунтов (как POST "/address/")
+с ограниченной параллельностью и записываются в историю пакетами. После каждого пакета в файл
+контрольной точки сохраняется номер строки, до которой вход обработан целиком; повторный запуск
+продолжает с нее (адреса после контрольной точки, записанные до сбоя, будут записаны повторно).
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import itertools
+import logging
+from collections import Counter
+from contextlib import nullcontext
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+from dotenv import load_dotenv
+from fastapi import HTTPException
+
+from src.database import init_db
+from src.repositories.history import HistoryRepo
+from src.services.account import fetch_tron_account
+from src.services.history import HistoryService
+from src.tron.address import normalize_address
+from src.tron.nodes import tron_nodes, TronNodePool
+
+load_dotenv()
+INGEST_CONCURRENCY = int(os.getenv('INGEST_CONCURRENCY', 20))
+INGEST_BATCH_SIZE = int(os.getenv('INGEST_BATCH_SIZE', 500))
+INGEST_RETRIES = int(os.getenv('INGEST_RETRIES', 3))
+INGEST_RETRY_BACKOFF = float(os.getenv('INGEST_RETRY_BACKOFF', 0.5))
+INGEST_PROGRESS_INTERVAL = float(os.getenv('INGEST_PROGRESS_INTERVAL', 5.0))
+
+# ключ клиента загрузки для контроля допуска к узлам сети Трон
+INGEST_CLIENT_KEY = "ingest"
+# ошибки, после которых запрос адреса повторяется: перегрузка и сбой узла
+RETRY_STATUS_CODES = (429, 500, 503)
+# строк входа, читаемых в отдельном потоке за раз
+READ_CHUNK_SIZE = 1000
+
+
+def read_checkpoint(path: Optional[str], source: str) -> Dict[str, Any]:
+    """
+    Функция чтения контрольной точки загрузки
+
+    :param path: Путь к файлу контрольной точки (None - без контрольной точки)
+    :param source: Источник адресов (путь к файлу или "-" для stdin)
+    :return: Словарь контрольной точки: источник, обработанная строка и накопленные счетчики
+    """
+    state = {'source': source, 'line': 0, 'written': 0, 'failed': 0, 'invalid': 0}
+    if path is None or not os.path.exists(path):
+        return state
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved.get('source') != source:
+        raise ValueError(f"Checkpoint {path} belongs to {saved.get('source')!r}, not {source!r}")
+    return {**state, **saved}
+
+
+def write_checkpoint(path: Optional[str], state: Dict[str, Any]) -> None:
+    """
+    Функция атомарной записи контрольной точки (через временный файл)
+
+    :param path: Путь к файлу контрольной точки (None - без контрольной точки)
+    :param state: Словарь контрольной точки
+    """
+    if path is None:
+        return
+    with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+        json.dump(state, f)
+    os.replace(f"{path}.tmp", path)
+
+
+async def fetch_account(client: TronNodePool, address: str,
+                        retries: int = INGEST_RETRIES,
+                        retry_backoff: float = INGEST_RETRY_BACKOFF) -> Tuple[Optional[dict], Optional[int]]:
+    """
+    Функция запроса аккаунта с повтором при перегрузке и сбоях узла
+
+    :param client: Общий набор узлов сети Трон
+    :param address: Проверенный адрес кошелька
+    :param retries: Количество повторов
+    :param retry_backoff: Начальная пауза перед повтором (сек.), удваивается с каждой попыткой
+    :return: Кортеж (словарь аккаунта, None) или (None, HTTP-код ошибки)
+    """
+    for attempt in range(retries + 1):
+        try:
+            return await fetch_tron_account(client, address, INGEST_CLIENT_KEY), None
+        except HTTPException as e:
+            if e.status_code not in RETRY_STATUS_CODES or attempt == retries:
+                return None, e.status_code
+            retry_after = float((e.headers or {}).get("Retry-After", 0))
+            await asyncio.sleep(max(retry_after, retry_backoff * 2 ** attempt))
+
+
+async def ingest(lines: Iterable[str], client: TronNodePool,
+                 source: str = "-",
+                 concurrency: int = INGEST_CONCURRENCY,
+                 batch_size: int = INGEST_BATCH_SIZE,
+                 checkpoint: Optional[str] = None,
+                 retries: int = INGEST_RETRIES,
+                 retry_backoff: float = INGEST_RETRY_BACKOFF,
+                 progress_interval: float = INGEST_PROGRESS_INTERVAL) -> Dict[str, Any]:
+    """
+    Функция загрузки адресов в историю: чтение входа порциями, офлайн-проверка, запрос аккаунтов
+    concurrency задачами и пакетная запись с сохранением контрольной точки после каждого пакета
+
+    :param lines: Строки входа (один адрес в строке; пустые строки и строки с "#" пропускаются)
+    :param client: Общий набор узлов сети Трон
+    :param source: Источник адресов для контрольной точки
+    :param concurrency: Одновременных запросов аккаунтов
+    :param batch_size: Строк входа в одном пакете записи
+    :param checkpoint: Путь к файлу контрольной точки (None - без контрольной точки)
+    :param retries: Повторов запроса аккаунта при перегрузке и сбоях узла
+    :param retry_backoff: Начальная пауза перед повтором (сек.)
+    :param progress_interval: Интервал вывода прогресса (сек.)
+    :return: Словарь итогов запуска: строки, записано, ошибки по HTTP-кодам, время и скорость
+    """
+    state = read_checkpoint(checkpoint, source)
+    start_line: int = state['line']
+    service = HistoryService(HistoryRepo)
+    counters = Counter()
+    errors = Counter()
+    jobs: asyncio.Queue = asyncio.Queue(maxsize=concurrency * 2)
+    results: asyncio.Queue = asyncio.Queue(maxsize=batch_size)
+    started = time.monotonic()
+
+    async def read() -> None:
+        iterator = iter(lines)
+        number = 0
+        while chunk := await asyncio.to_thread(list, itertools.islice(iterator, READ_CHUNK_SIZE)):
+            for line in chunk:
+                number += 1
+                address = line.strip()
+                if number <= start_line:
+                    continue
+                if not address or address.startswith("#"):
+                    await results.put((number, None, None))
+                    continue
+                counters['read'] += 1
+                normalized = normalize_address(address)
+                if normalized is None:
+                    await results.put((number, None, 400))
+                else:
+                    await jobs.put((number, normalized))
+        for _ in range(concurrency):
+            await jobs.put(None)
+
+    async def fetch() -> None:
+        while (job := await jobs.get()) is not None:
+            number, address = job
+            account, error = await fetch_account(client, address, retries, retry_backoff)
+            await results.put((number, account, error))
+
+    async def feed() -> None:
+        await asyncio.gather(read(), *[fetch() for _ in range(concurrency)])
+        await results.put(None)
+
+    async def write() -> None:
+        # строки завершаются не по порядку - контрольная точка сдвигается до первой незавершенной строки
+        done: Set[int] = set()
+        batch: List[Tuple[int, Optional[dict], Optional[int]]] = []
+        stopping = False
+        while not stopping:
+            item = await results.get()
+            if item is None:
+                stopping = True
+            else:
+                batch.append(item)
+            if batch and (stopping or len(batch) >= batch_size):
+                accounts = [account for _, account, _ in batch if account is not None]
+                if accounts:
+                    await service.add_history_many(accounts)
+                counters['written'] += len(accounts)
+                for number, account, error in batch:
+                    if error == 400:
+                        counters['invalid'] += 1
+                    elif error is not None:
+                        counters['failed'] += 1
+                        errors[error] += 1
+                    done.add(number)
+                batch = []
+                while state['line'] + 1 in done:
+                    state['line'] += 1
+                    done.remove(state['line'])
+                write_checkpoint(checkpoint, {**state, **{key: state[key] + counters[key]
+                                                          for key in ('written', 'failed', 'invalid')}})
+
+    async def report() -> None:
+        while True:
+            await asyncio.sleep(progress_interval)
+            elapsed = time.monotonic() - started
+            logging.info(f"Ingest: {counters['read']} read, {counters['written']} written, "
+                         f"{counters['failed']} failed, {counters['invalid']} invalid, "
+                         f"{counters['written'] / elapsed:.1f} addresses/s")
+
+    tasks = [asyncio.create_task(coro) for coro in (feed(), write(), report())]
+    try:
+        await asyncio.gather(*tasks[:2])
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    elapsed = time.monotonic() - started
+    return {'resumed_from': start_line,
+            'read': counters['read'],
+            'written': counters['written'],
+            'failed': counters['failed'],
+            'invalid': counters['invalid'],
+            'errors': {str(code): count for code, count in sorted(errors.items())},
+            'seconds': round(elapsed, 3),
+            'rate': round(counters['written'] / elapsed, 1) if elapsed else 0.0,
+            }
+
+
+async def run(args: argparse.Namespace) -> Dict[str, Any]:
+    await init_db()
+    await tron_nodes.open()
+    try:
+        with nullcontext(sys.stdin) if args.input == "-" else open(args.input, encoding="utf-8") as lines:
+            return await ingest(lines, tron_nodes,
+                                source=args.input,
+                                concurrency=args.concurrency,
+                                batch_size=args.batch_size,
+                                checkpoint=args.checkpoint,
+                                retries=args.retries,
+                                progress_interval=args.progress_interval)
+    finally:
+        await tron_nodes.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("input", help="Файл адресов или - для чтения из stdin")
+    parser.add_argument("--concurrency", type=int, default=INGEST_CONCURRENCY)
+    parser.add_argument("--batch-size", type=int, default=INGEST_BATCH_SIZE)
+    parser.add_argument("--checkpoint", default=None,
+                        help="Файл контрольной точки (по умолчанию <input>.checkpoint, для stdin - не ведется)")
+    parser.add_argument("--restart", action="store_true", help="Начать заново, удалив контрольную точку")
+    parser.add_argument("--retries", type=int, default=INGEST_RETRIES)
+    parser.add_argument("--progress-interval", type=float, default=INGEST_PROGRESS_INTERVAL)
+    args = parser.parse_args()
+    if args.checkpoint is None and args.input != "-":
+        args.checkpoint = f"{args.input}.checkpoint"
+    if args.restart and args.checkpoint and os.path.exists(args.checkpoint):
+        os.remove(args.checkpoint)
+    logging.basicConfig(level=logging.INFO)
+    # журнал каждого запроса к узлу заглушает вывод прогресса
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+    result = asyncio.run(run(args))
+    print(f"read={result['read']} written={result['written']} failed={result['failed']} "
+          f"invalid={result['invalid']} errors={result['errors']} resumed_from={result['resumed_from']} "
+          f"seconds={result['seconds']} rate={result['rate']}/s")
+
+
+if __name__ == "__main__":
+    main()
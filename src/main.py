@@ -6,22 +6,44 @@ from typing import AsyncGenerator, Any
 
 from src.database import init_db
 from src.app import main_router
+from src.app.middleware import MetricsMiddleware
+from src.services.account import fetch_tron_account
+from src.services.archive import history_archive, HISTORY_ARCHIVE_ENABLED
+from src.services.history_writer import history_writer, HISTORY_WRITE_BEHIND
+from src.services.watchlist import watchlist
+from src.tron.blocks import block_tracker, TRON_BLOCK_POLL_ENABLED
+from src.tron.nodes import tron_nodes
 
 
 @asynccontextmanager
 async def lifespan(app: FastAPI) -> AsyncGenerator[None, Any]:
     """
-    Функция асинхронного контекстного менеджера с инициализацией БД при старте
+    Функция асинхронного контекстного менеджера с инициализацией БД, ТРОН-клиента и фоновых задач при старте
     """
     try:
         await init_db()
+        await tron_nodes.open()
+        if HISTORY_WRITE_BEHIND:
+            await history_writer.start()
+        if HISTORY_ARCHIVE_ENABLED:
+            await history_archive.start()
+        if TRON_BLOCK_POLL_ENABLED:
+            await block_tracker.start(tron_nodes)
+        await watchlist.start(lambda address: fetch_tron_account(tron_nodes, address, "watchlist"))
         yield
     except Exception as e:
         logging.error(f"Failed to initialize DB: {e}")
         raise
+    finally:
+        await watchlist.stop()
+        await block_tracker.stop()
+        await history_archive.stop()
+        await history_writer.stop()
+        await tron_nodes.close()
 
 
 app = FastAPI(lifespan=lifespan)
+app.add_middleware(MetricsMiddleware)
 app.include_router(main_router)
 
 if __name__ == "__main__":
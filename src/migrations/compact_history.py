@@ -0,0 +1,79 @@
+"""
+Перенос строк истории из таблицы history в компактное хранилище (history_compact + словарь address)
+
+Запуск: python -m src.migrations.compact_history --batch-size 10000
+Перенос возобновляется с последнего перенесенного id; id строк сохраняются.
+"""
+import asyncio
+import argparse
+import logging
+from typing import Dict
+
+from sqlalchemy import func, insert, select, text
+
+from src.database import async_session, engine, init_db, IS_SQLITE
+from src.models.history import CompactHistoryModel, HistoryModel
+from src.repositories.history import CompactHistoryRepo
+from src.tron.address import normalize_address
+from src.tron.units import SUN_PER_TRX
+
+MIGRATION_BATCH_SIZE = 10000
+
+
+async def migrate(batch_size: int = MIGRATION_BATCH_SIZE) -> Dict[str, int]:
+    """
+    Функция переноса истории пакетами по возрастанию id (строки с некорректным адресом пропускаются)
+
+    :param batch_size: Строк в одной транзакции
+    :return: Словарь счетчиков: перенесено, пропущено, последний id
+    """
+    await init_db()
+    repository = CompactHistoryRepo()
+    async with async_session() as session:
+        last_id: int = (await session.execute(select(func.max(CompactHistoryModel.id)))).scalar() or 0
+
+    migrated = skipped = 0
+    while True:
+        async with async_session() as session:
+            query = select(HistoryModel).where(HistoryModel.id > last_id).order_by(HistoryModel.id).limit(batch_size)
+            legacy = (await session.execute(query)).scalars().all()
+        if not legacy:
+            break
+        last_id = legacy[-1].id
+
+        valid = [(row, normalize_address(row.address)) for row in legacy]
+        valid = [(row, address) for row, address in valid if address is not None]
+        skipped += len(legacy) - len(valid)
+        ids = await repository.address_ids(address for _, address in valid)
+        rows = [{'id': row.id,
+                 'address_id': ids[address],
+                 'balance_sun': None if row.balance is None else round(row.balance * SUN_PER_TRX),
+                 'bandwidth': None if row.bandwidth is None else int(row.bandwidth),
+                 'energy': None if row.energy is None else int(row.energy),
+                 'timestamp': row.timestamp,
+                 } for row, address in valid]
+        if rows:
+            async with engine.begin() as conn:
+                await conn.execute(insert(CompactHistoryModel.__table__), rows)
+        migrated += len(rows)
+        logging.info(f"Migrated history up to id {last_id}: {migrated} rows, {skipped} skipped")
+
+    if not IS_SQLITE and migrated:
+        # после вставки явных id счетчик последовательности нужно сдвинуть
+        async with engine.begin() as conn:
+            await conn.execute(text("SELECT setval(pg_get_serial_sequence('history_compact', 'id'), "
+                                    "(SELECT MAX(id) FROM history_compact))"))
+    return {'migrated': migrated, 'skipped': skipped, 'last_id': last_id}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--batch-size", type=int, default=MIGRATION_BATCH_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(migrate(args.batch_size))
+    print(f"migrated={result['migrated']} skipped={result['skipped']} last_id={result['last_id']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,42 @@
+"""
+Перенос строк истории старше срока хранения в сжатые сегменты архива (HISTORY_ARCHIVE_DIR)
+
+Запуск: python -m src.migrations.history_archive --retention-days 90
+Можно запускать при работающем сервисе: перенос выполняет один процесс, остальные пропускают запуск.
+--full-vacuum после переноса перестраивает SQLite-файл (включает auto_vacuum в БД, созданной до его появления;
+блокирует запись на время работы).
+"""
+import asyncio
+import argparse
+import logging
+from typing import Dict
+
+from src.database import init_db, vacuum_db
+from src.services.archive import HISTORY_ARCHIVE_BATCH_SIZE, HISTORY_RETENTION_DAYS, history_archive
+
+
+async def run(retention_days: float, batch_size: int, full_vacuum: bool) -> Dict[str, int]:
+    await init_db()
+    history_archive.retention_days = retention_days
+    history_archive.batch_size = batch_size
+    result = await history_archive.archive(vacuum=not full_vacuum)
+    if full_vacuum:
+        await vacuum_db(full=True)
+    return result
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--retention-days", type=float, default=HISTORY_RETENTION_DAYS)
+    parser.add_argument("--batch-size", type=int, default=HISTORY_ARCHIVE_BATCH_SIZE)
+    parser.add_argument("--full-vacuum", action="store_true")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(run(args.retention_days, args.batch_size, args.full_vacuum))
+    stats = history_archive.stats()
+    print(f"archived={result['archived']} segments={result['segments']} "
+          f"archive_rows={stats['rows']} archive_bytes={stats['bytes']}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,72 @@
+"""
+Пересчет сводных таблиц истории (итоги по адресу, по адресу и часу, количество строк) по текущему хранилищу
+и архиву (строки архива входят в итоги по адресу, но не в количество строк таблицы истории)
+
+Запуск: python -m src.migrations.history_rollup
+Нужен один раз для истории, записанной до появления сводных таблиц; запускать при остановленном сервисе.
+"""
+import asyncio
+import argparse
+import logging
+from typing import AsyncGenerator, Dict
+
+from sqlalchemy import delete, func, select
+
+from src.database import async_session, init_db
+from src.models.history import HistoryAddressStatsModel, HistoryCounterModel, HistoryHourlyRollupModel
+from src.repositories.history import HISTORY_COUNTER, counter_rows, HistoryRepo, HistoryRollupBatch, HistoryRollupRepo
+from src.services.archive import history_archive
+
+ROLLUP_CHUNK_SIZE = 10000
+
+
+async def _aggregate(session, source: AsyncGenerator, counted: bool) -> int:
+    # строки идут по времени: сводка месяца записывается (сливается с накопленной) при переходе к следующему
+    rollups = HistoryRollupRepo()
+    batch, period, rows = HistoryRollupBatch(), None, 0
+    async for chunk in source:
+        for address, balance, timestamp in chunk:
+            if (timestamp.year, timestamp.month) != period:
+                await rollups.apply(session, batch)
+                batch, period = HistoryRollupBatch(), (timestamp.year, timestamp.month)
+            batch.add(address, balance, timestamp, counted=counted)
+            rows += 1
+        logging.info(f"Rollups: {rows} {'history' if counted else 'archive'} rows read")
+    await rollups.apply(session, batch)
+    return rows
+
+
+async def rebuild(chunk_size: int = ROLLUP_CHUNK_SIZE) -> Dict[str, int]:
+    """
+    Функция пересчета сводных таблиц одним проходом по архиву и истории: сводки заменяются в одной транзакции,
+    в памяти - сводка одного месяца
+
+    :param chunk_size: Строк истории в одной порции чтения
+    :return: Словарь счетчиков: строк истории, адресов, часовых корзин
+    """
+    await init_db()
+    columns = ("address", "balance", "timestamp")
+    async with async_session() as session:
+        for model in (HistoryAddressStatsModel, HistoryHourlyRollupModel):
+            await session.execute(delete(model))
+        # счетчик поколений не обнуляется - пересчет только увеличивает его
+        await session.execute(delete(HistoryCounterModel).where(counter_rows(HISTORY_COUNTER)))
+        await _aggregate(session, history_archive.stream(columns, chunk_size=chunk_size), counted=False)
+        rows = await _aggregate(session, HistoryRepo().stream_all(columns, chunk_size=chunk_size), counted=True)
+        addresses = (await session.execute(select(func.count()).select_from(HistoryAddressStatsModel))).scalar()
+        buckets = (await session.execute(select(func.count()).select_from(HistoryHourlyRollupModel))).scalar()
+        await session.commit()
+    return {'rows': rows, 'addresses': addresses, 'buckets': buckets}
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--chunk-size", type=int, default=ROLLUP_CHUNK_SIZE)
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    result = asyncio.run(rebuild(args.chunk_size))
+    print(f"rows={result['rows']} addresses={result['addresses']} buckets={result['buckets']}")
+
+
+if __name__ == "__main__":
+    main()
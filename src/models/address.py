@@ -0,0 +1,18 @@
+from sqlalchemy import LargeBinary
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.database import Base
+from src.tron.address import ADDRESS_LENGTH
+
+
+class AddressModel(Base):
+    """
+    Словарь адресов: целочисленный id для 21-байтового представления адреса
+    """
+    __tablename__ = 'address'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    raw: Mapped[bytes] = mapped_column(LargeBinary(ADDRESS_LENGTH), nullable=False, unique=True)
+
+    def __repr__(self) -> str:
+        return f"<Address(id={self.id})>"
@@ -1,25 +1,61 @@
-from sqlalchemy import String, TIMESTAMP, func
-from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column
+import calendar
+from sqlalchemy import BigInteger, ForeignKey, Index, Integer, String, TIMESTAMP, TypeDecorator, func, text
+from sqlalchemy.dialects import sqlite
+from sqlalchemy.orm import DeclarativeBase, Mapped, mapped_column, relationship
 from typing import Optional
 from datetime import datetime
 
+from src.schemas.address import TokenBalanceSchema
 from src.schemas.history import HistoryResponseSchema
-from src.database import Base
+from src.tron.address import from_raw_address
+from src.tron.units import SUN_PER_TRX, to_token_amount
+from src.database import Base, IS_SQLITE
+from src.models.address import AddressModel
+
+# в SQLite метка времени хранится строкой: формат совпадает с CURRENT_TIMESTAMP,
+# чтобы сравнения по курсору пагинации были корректны
+TimestampType = TIMESTAMP().with_variant(
+    sqlite.DATETIME(storage_format="%(year)04d-%(month)02d-%(day)02d "
+                                   "%(hour)02d:%(minute)02d:%(second)02d"),
+    "sqlite",
+)
+
+
+class EpochSeconds(TypeDecorator):
+    """
+    Метка времени (UTC) как целое число секунд - компактнее строки в SQLite
+    """
+    impl = BigInteger
+    cache_ok = True
+
+    def process_bind_param(self, value: Optional[datetime], dialect) -> Optional[int]:
+        return None if value is None else calendar.timegm(value.timetuple())
+
+    def process_result_value(self, value: Optional[int], dialect) -> Optional[datetime]:
+        return None if value is None else datetime.utcfromtimestamp(value)
+
+
+CompactTimestampType = TIMESTAMP().with_variant(EpochSeconds(), "sqlite")
+CompactTimestampDefault = text("(CAST(strftime('%s', 'now') AS INTEGER))") if IS_SQLITE else func.now()
 
 
 class HistoryModel(Base):
     __tablename__ = 'history'
+    __table_args__ = (
+        Index('ix_history_timestamp_id', 'timestamp', 'id'),
+        Index('ix_history_address_timestamp_id', 'address', 'timestamp', 'id'),
+    )
 
     id: Mapped[int] = mapped_column(primary_key=True)
     address: Mapped[str] = mapped_column(String(42), nullable=False)
     bandwidth: Mapped[Optional[float]]
     energy: Mapped[Optional[float]]
     balance: Mapped[Optional[float]]
-    timestamp: Mapped[datetime] = mapped_column(TIMESTAMP, server_default=func.now())
+    timestamp: Mapped[datetime] = mapped_column(TimestampType, server_default=func.now())
 
     def to_read_model(self):
-        return HistoryResponseSchema(
-            id=self.id,
+        # данные из БД уже соответствуют схеме - создание без повторной валидации
+        return HistoryResponseSchema.model_construct(
             address=self.address,
             bandwidth=self.bandwidth,
             energy=self.energy,
@@ -29,3 +65,105 @@ class HistoryModel(Base):
 
     def __repr__(self) -> str:
         return f"<History(id={self.id}, address={self.address})>"
+
+
+class CompactHistoryModel(Base):
+    """
+    Компактная история: id адреса из словаря вместо строки, целые суммы в sun и единицах ресурсов
+    """
+    __tablename__ = 'history_compact'
+    __table_args__ = (
+        Index('ix_history_compact_timestamp_id', 'timestamp', 'id'),
+        Index('ix_history_compact_address_timestamp_id', 'address_id', 'timestamp', 'id'),
+    )
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    address_id: Mapped[int] = mapped_column(ForeignKey('address.id'), nullable=False)
+    balance_sun: Mapped[Optional[int]] = mapped_column(BigInteger)
+    bandwidth: Mapped[Optional[int]] = mapped_column(Integer)
+    energy: Mapped[Optional[int]] = mapped_column(BigInteger)
+    timestamp: Mapped[datetime] = mapped_column(CompactTimestampType, server_default=CompactTimestampDefault)
+
+    address_ref: Mapped[AddressModel] = relationship(lazy="joined", innerjoin=True)
+
+    def to_read_model(self, address: Optional[str] = None):
+        # перевод в прежний формат ответа: base58-адрес, баланс в TRX
+        return HistoryResponseSchema.model_construct(
+            address=address or from_raw_address(self.address_ref.raw),
+            bandwidth=None if self.bandwidth is None else float(self.bandwidth),
+            energy=None if self.energy is None else float(self.energy),
+            balance=None if self.balance_sun is None else self.balance_sun / SUN_PER_TRX,
+            timestamp=self.timestamp,
+        )
+
+    def __repr__(self) -> str:
+        return f"<CompactHistory(id={self.id}, address_id={self.address_id})>"
+
+
+class HistoryTokenBalanceModel(Base):
+    __tablename__ = 'history_token_balance'
+
+    id: Mapped[int] = mapped_column(primary_key=True)
+    # id строки history или history_compact - в зависимости от HISTORY_STORAGE
+    history_id: Mapped[int] = mapped_column(index=True)
+    contract: Mapped[str] = mapped_column(String(42), nullable=False)
+    symbol: Mapped[Optional[str]] = mapped_column(String(32))
+    decimals: Mapped[Optional[int]]
+    # uint256 не помещается в BIGINT - хранится десятичной строкой
+    balance_raw: Mapped[Optional[str]] = mapped_column(String(78))
+
+    def to_read_model(self):
+        balance = None
+        if self.balance_raw is not None and self.decimals is not None:
+            balance = to_token_amount(int(self.balance_raw), self.decimals)
+        return TokenBalanceSchema(
+            contract=self.contract,
+            symbol=self.symbol,
+            decimals=self.decimals,
+            balance=balance,
+        )
+
+    def __repr__(self) -> str:
+        return f"<HistoryTokenBalance(history_id={self.history_id}, contract={self.contract})>"
+
+
+class HistoryRollupMixin:
+    """
+    Сводные значения строк истории: количество запросов, минимальный, максимальный и последний баланс
+    """
+    lookups: Mapped[int] = mapped_column(BigInteger, nullable=False)
+    balance_min: Mapped[Optional[float]]
+    balance_max: Mapped[Optional[float]]
+    balance_last: Mapped[Optional[float]]
+    first_seen: Mapped[datetime] = mapped_column(TimestampType, nullable=False)
+    last_seen: Mapped[datetime] = mapped_column(TimestampType, nullable=False)
+
+
+class HistoryAddressStatsModel(HistoryRollupMixin, Base):
+    __tablename__ = 'history_address_stats'
+
+    address: Mapped[str] = mapped_column(String(42), primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<HistoryAddressStats(address={self.address}, lookups={self.lookups})>"
+
+
+class HistoryHourlyRollupModel(HistoryRollupMixin, Base):
+    __tablename__ = 'history_rollup_hourly'
+
+    address: Mapped[str] = mapped_column(String(42), primary_key=True)
+    # начало часа (UTC)
+    bucket: Mapped[datetime] = mapped_column(TimestampType, primary_key=True)
+
+    def __repr__(self) -> str:
+        return f"<HistoryHourlyRollup(address={self.address}, bucket={self.bucket})>"
+
+
+class HistoryCounterModel(Base):
+    __tablename__ = 'history_counter'
+
+    name: Mapped[str] = mapped_column(String(32), primary_key=True)
+    value: Mapped[int] = mapped_column(BigInteger, nullable=False)
+
+    def __repr__(self) -> str:
+        return f"<HistoryCounter(name={self.name}, value={self.value})>"
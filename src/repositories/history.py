@@ -1,6 +1,463 @@
-from src.utils.repository import SQLAlchemyRepository
-from src.models.history import HistoryModel
+import os
+import math
+import time
+import random
+from datetime import datetime
+from dotenv import load_dotenv
+from sqlalchemy import BigInteger, bindparam, delete, func, insert, or_, select, text, TextClause, type_coerce
+from sqlalchemy.dialects.postgresql import insert as postgresql_insert
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import noload
+from typing import AsyncGenerator, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from src.database import async_session, IS_SQLITE
+from src.models.address import AddressModel
+from src.models.history import (CompactHistoryModel, HistoryAddressStatsModel, HistoryCounterModel,
+                                HistoryHourlyRollupModel, HistoryModel, HistoryTokenBalanceModel)
+from src.tron.address import from_raw_address, to_raw_address
+from src.tron.units import SUN_PER_TRX
+from src.utils.cache import TTLCache
+from src.utils.pagination import CursorKey
+from src.utils.repository import IN_CHUNK_SIZE, SQLAlchemyRepository
 
-class HistoryRepo(SQLAlchemyRepository):
+load_dotenv()
+HISTORY_STORAGE = os.getenv('HISTORY_STORAGE', "legacy")
+ADDRESS_ID_CACHE_SIZE = int(os.getenv('ADDRESS_ID_CACHE_SIZE', 100000))
+HISTORY_VERSION_TTL = float(os.getenv('HISTORY_VERSION_TTL', 1.0))
+# строк на счетчик: транзакция вставки обновляет строку случайного номера, значение - сумма строк
+HISTORY_COUNTER_SHARDS = int(os.getenv('HISTORY_COUNTER_SHARDS', 16))
+
+HISTORY_COUNTER = "history"
+# только растет (в т.ч. при удалении строк) - версия истории для условных HTTP-запросов
+HISTORY_GENERATION = "history_generation"
+
+# id адресов не меняются - кэш без срока жизни (только подтвержденные в БД)
+address_ids = TTLCache(maxsize=ADDRESS_ID_CACHE_SIZE, ttl=math.inf)
+
+dialect_insert = sqlite_insert if IS_SQLITE else postgresql_insert
+# в SQLite min/max от двух аргументов - скалярные функции
+LEAST, GREATEST = ("min", "max") if IS_SQLITE else ("least", "greatest")
+
+
+def _to_int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def to_hour(timestamp: datetime) -> datetime:
+    return timestamp.replace(minute=0, second=0, microsecond=0)
+
+
+class HistoryRollupBatch:
+    """
+    Сводка строк истории по адресам и по часам, накопленная до записи в сводные таблицы
+    """
+
+    def __init__(self):
+        self.rows: int = 0
+        self.addresses: Dict[str, dict] = {}
+        self.hourly: Dict[Tuple[str, datetime], dict] = {}
+
+    @staticmethod
+    def _merge(rollups: dict, key, balance: Optional[float], timestamp: datetime) -> None:
+        item = rollups.get(key)
+        if item is None:
+            rollups[key] = {'lookups': 1, 'balance_min': balance, 'balance_max': balance, 'balance_last': balance,
+                            'first_seen': timestamp, 'last_seen': timestamp}
+            return
+        item['lookups'] += 1
+        if balance is not None:
+            item['balance_min'] = balance if item['balance_min'] is None else min(item['balance_min'], balance)
+            item['balance_max'] = balance if item['balance_max'] is None else max(item['balance_max'], balance)
+        if timestamp >= item['last_seen']:
+            item['balance_last'] = balance
+            item['last_seen'] = timestamp
+        item['first_seen'] = min(item['first_seen'], timestamp)
+
+    def add(self, address: str, balance: Optional[float], timestamp: datetime, counted: bool = True) -> None:
+        # строки архива входят в сводки по адресу, но не в количество строк таблицы истории
+        if counted:
+            self.rows += 1
+        self._merge(self.addresses, address, balance, timestamp)
+        self._merge(self.hourly, (address, to_hour(timestamp)), balance, timestamp)
+
+
+def _upsert(model, keys: Sequence[str], updates: Dict[str, str]) -> TextClause:
+    # INSERT ... ON CONFLICT диалектов SQLAlchemy не кэшируется и компилируется при каждом выполнении -
+    # запрос сводки собирается один раз как текст (одинаков для SQLite и PostgreSQL)
+    table = model.__tablename__
+    columns = [*keys, *updates]
+    sql = (f"INSERT INTO {table} ({', '.join(columns)}) VALUES ({', '.join(':' + column for column in columns)}) "
+           f"ON CONFLICT ({', '.join(keys)}) DO UPDATE SET "
+           + ", ".join(f"{column} = {expression.format(table=table, column=column)}"
+                       for column, expression in updates.items()))
+    return text(sql).bindparams(*[bindparam(column, type_=model.__table__.c[column].type) for column in columns])
+
+
+# правила слияния сводки пакета (excluded) с уже накопленной сводкой
+ROLLUP_UPDATES = {
+    'lookups': "{table}.{column} + excluded.{column}",
+    # NULL-баланс не участвует в минимуме и максимуме
+    'balance_min': LEAST + "(COALESCE({table}.{column}, excluded.{column}), "
+                           "COALESCE(excluded.{column}, {table}.{column}))",
+    'balance_max': GREATEST + "(COALESCE({table}.{column}, excluded.{column}), "
+                              "COALESCE(excluded.{column}, {table}.{column}))",
+    'balance_last': "CASE WHEN excluded.last_seen >= {table}.last_seen "
+                    "THEN excluded.{column} ELSE {table}.{column} END",
+    'first_seen': LEAST + "({table}.{column}, excluded.{column})",
+    'last_seen': GREATEST + "({table}.{column}, excluded.{column})",
+}
+ADDRESS_STATS_UPSERT = _upsert(HistoryAddressStatsModel, ['address'], ROLLUP_UPDATES)
+HOURLY_ROLLUP_UPSERT = _upsert(HistoryHourlyRollupModel, ['address', 'bucket'], ROLLUP_UPDATES)
+COUNTER_UPSERT = _upsert(HistoryCounterModel, ['name'], {'value': "{table}.{column} + excluded.{column}"})
+
+
+def counter_rows(name: str):
+    """
+    Функция условия выбора строк счетчика: строка без номера (записана до разбиения) и строки "имя:номер"
+    """
+    return or_(HistoryCounterModel.name == name, HistoryCounterModel.name.like(f"{name}:%"))
+
+
+async def add_counters(session, rows: int, generation: int) -> None:
+    # параллельные транзакции вставки обновляют (блокируют до фиксации) разные строки счетчиков
+    shard = random.randrange(HISTORY_COUNTER_SHARDS)
+    await session.execute(COUNTER_UPSERT, [{'name': f"{HISTORY_COUNTER}:{shard}", 'value': rows},
+                                           {'name': f"{HISTORY_GENERATION}:{shard}", 'value': generation}])
+
+
+class HistoryRollupRepo:
+    """
+    Сводные таблицы истории: итоги по адресу, по адресу и часу, общее количество строк.
+    Обновляются в транзакции вставки строк истории - чтение сводок не просматривает историю
+    """
+
+    async def apply(self, session, batch: HistoryRollupBatch) -> None:
+        """
+        Функция добавления сводки пакета к сводным таблицам (в переданной транзакции)
+
+        :param session: Сессия транзакции вставки строк истории
+        :param batch: Сводка пакета строк
+        """
+        # строки архива (пересчет сводок) обновляют сводки по адресу, но не количество строк
+        if not batch.addresses:
+            return
+        # строки сводок обновляются в порядке ключей - без взаимных блокировок параллельных транзакций
+        await session.execute(ADDRESS_STATS_UPSERT,
+                              [{'address': address, **item} for address, item in sorted(batch.addresses.items())])
+        await session.execute(HOURLY_ROLLUP_UPSERT,
+                              [{'address': address, 'bucket': bucket, **item}
+                               for (address, bucket), item in sorted(batch.hourly.items())])
+        if batch.rows:
+            await add_counters(session, batch.rows, batch.rows)
+
+    async def update(self, session, data: List[dict]) -> None:
+        """
+        Функция учета вставленных строк истории в сводных таблицах
+
+        :param session: Сессия транзакции вставки строк истории
+        :param data: Словари данных вставленных строк
+        """
+        batch = HistoryRollupBatch()
+        # строка без явной метки времени получает серверное "сейчас" (UTC) - для сводки берется текущее время
+        now = datetime.utcnow()
+        for row in data:
+            batch.add(row['address'], row.get('balance'), row.get('timestamp') or now)
+        await self.apply(session, batch)
+
+    async def remove(self, session, rows: int) -> None:
+        """
+        Функция учета удаленных (перенесенных в архив) строк истории: сводки по адресу и по часам сохраняются,
+        уменьшается количество строк и меняется поколение истории
+
+        :param session: Сессия транзакции удаления строк истории
+        :param rows: Количество удаленных строк
+        """
+        if rows:
+            await add_counters(session, -rows, rows)
+
+    @staticmethod
+    async def _counter(name: str) -> int:
+        async with async_session() as session:
+            query = select(func.sum(HistoryCounterModel.value)).where(counter_rows(name))
+            return (await session.execute(query)).scalar() or 0
+
+    async def total(self) -> int:
+        """
+        Функция получения общего количества строк истории из счетчика
+        """
+        return await self._counter(HISTORY_COUNTER)
+
+    async def generation(self) -> int:
+        """
+        Функция получения номера поколения истории (меняется при каждой записи любым процессом)
+        """
+        return await self._counter(HISTORY_GENERATION)
+
+    async def get_first_seen(self, address: str) -> Optional[datetime]:
+        """
+        Функция получения времени первого запроса адреса из сводки (None, если адрес не запрашивался)
+        """
+        async with async_session() as session:
+            query = select(HistoryAddressStatsModel.first_seen).filter_by(address=address)
+            return (await session.execute(query)).scalar()
+
+    async def get_address_stats(self, address: str, since: datetime) -> Optional[dict]:
+        """
+        Функция получения сводки по адресу за все время и по часам с начала периода
+
+        :param address: Адрес кошелька
+        :param since: Начало периода почасовой сводки
+        :return: Словарь сводки или None, если адрес не запрашивался
+        """
+        async with async_session() as session:
+            stats = await session.get(HistoryAddressStatsModel, address)
+            if stats is None:
+                return None
+            query = (select(HistoryHourlyRollupModel).
+                     where(HistoryHourlyRollupModel.address == address, HistoryHourlyRollupModel.bucket >= since).
+                     order_by(HistoryHourlyRollupModel.bucket))
+            hourly = (await session.execute(query)).scalars().all()
+        columns = ('lookups', 'balance_min', 'balance_max', 'balance_last')
+        return {'address': address,
+                **{column: getattr(stats, column) for column in columns},
+                'first_seen': stats.first_seen,
+                'last_seen': stats.last_seen,
+                'hourly': [{'bucket': row.bucket, **{column: getattr(row, column) for column in columns}}
+                           for row in hourly],
+                }
+
+
+class HistoryVersion:
+    """
+    Версия истории для условных запросов: поколение из счетчика в БД, перечитывается не чаще раза в ttl секунд
+    (записи других процессов видны с этой задержкой) и сразу после записи этим процессом
+    """
+
+    def __init__(self, ttl: float = HISTORY_VERSION_TTL):
+        self.ttl: float = ttl
+        self.generation: Optional[int] = None
+        self._checked_at: float = -math.inf
+
+    def invalidate(self) -> None:
+        self._checked_at = -math.inf
+
+    async def current(self) -> int:
+        """
+        Функция получения текущего поколения истории
+        """
+        if time.monotonic() - self._checked_at >= self.ttl:
+            # отметка проверки - до запроса: запись во время запроса снова сбросит ее
+            self._checked_at = time.monotonic()
+            self.generation = await HistoryRollupRepo().generation()
+        return self.generation
+
+
+history_version = HistoryVersion()
+
+
+async def delete_history_children(session, ids: Sequence[int]) -> None:
+    # балансы токенов удаляемых строк истории удаляются в той же транзакции
+    for start in range(0, len(ids), IN_CHUNK_SIZE):
+        await session.execute(delete(HistoryTokenBalanceModel).
+                              where(HistoryTokenBalanceModel.history_id.in_(ids[start:start + IN_CHUNK_SIZE])))
+    await HistoryRollupRepo().remove(session, len(ids))
+
+
+async def insert_history_children(session, data: List[dict], ids: Sequence[int]) -> None:
+    # балансы токенов (ключ tokens строки истории) и сводки записываются в транзакции вставки строк истории
+    token_rows = [{**token, 'history_id': history_id}
+                  for history_id, row in zip(ids, data) for token in row.get('tokens') or ()]
+    if token_rows:
+        await session.execute(insert(HistoryTokenBalanceModel), token_rows)
+    await HistoryRollupRepo().update(session, data)
+
+
+class LegacyHistoryRepo(SQLAlchemyRepository):
     model = HistoryModel
+
+    async def _after_insert(self, session, data: List[dict], ids: Sequence[int]) -> None:
+        await insert_history_children(session, data, ids)
+
+    def _after_commit(self, data: List[dict]) -> None:
+        history_version.invalidate()
+
+    async def _after_delete(self, session, ids: Sequence[int]) -> None:
+        await delete_history_children(session, ids)
+
+
+class CompactHistoryRepo(SQLAlchemyRepository):
+    """
+    Репозиторий компактной истории: адрес - id из словаря адресов, суммы - целые числа
+    """
+    model = CompactHistoryModel
+
+    # перевод столбцов выгрузки в столбцы компактной таблицы и обратно в прежний формат
+    EXPORT_COLUMNS = {'id': (CompactHistoryModel.id, None),
+                      'address': (AddressModel.raw, from_raw_address),
+                      'balance': (CompactHistoryModel.balance_sun, lambda value: value / SUN_PER_TRX),
+                      'bandwidth': (CompactHistoryModel.bandwidth, float),
+                      'energy': (CompactHistoryModel.energy, float),
+                      'timestamp': (CompactHistoryModel.timestamp, None),
+                      }
+
+    async def address_ids(self, addresses: Iterable[str]) -> Dict[str, int]:
+        """
+        Функция получения id адресов из словаря (с добавлением новых адресов отдельной транзакцией)
+
+        :param addresses: Адреса в формате base58check
+        :return: Словарь адрес - id
+        """
+        ids: Dict[str, int] = {}
+        missing: Dict[bytes, str] = {}
+        for address in set(addresses):
+            address_id = address_ids.get(address)
+            if address_id is None:
+                missing[to_raw_address(address)] = address
+            else:
+                ids[address] = address_id
+        if not missing:
+            return ids
+
+        async with async_session() as session:
+            await session.execute(dialect_insert(AddressModel).on_conflict_do_nothing(index_elements=['raw']),
+                                  [{'raw': raw} for raw in missing])
+            query = select(AddressModel.raw, AddressModel.id).where(AddressModel.raw.in_(list(missing)))
+            rows = (await session.execute(query)).all()
+            await session.commit()
+        for raw, address_id in rows:
+            ids[missing[raw]] = address_id
+            address_ids.set(missing[raw], address_id)
+        return ids
+
+    async def find_address_id(self, address: str) -> Optional[int]:
+        address_id = address_ids.get(address)
+        if address_id is not None:
+            return address_id
+        try:
+            raw = to_raw_address(address)
+        except ValueError:
+            return None
+        async with async_session() as session:
+            address_id = (await session.execute(select(AddressModel.id).filter_by(raw=raw))).scalar_one_or_none()
+        if address_id is not None:
+            address_ids.set(address, address_id)
+        return address_id
+
+    async def _to_rows(self, data: List[dict]) -> List[dict]:
+        ids = await self.address_ids(row['address'] for row in data)
+        rows = []
+        for row in data:
+            balance_sun = row.get('balance_sun')
+            if balance_sun is None and row.get('balance') is not None:
+                balance_sun = round(row['balance'] * SUN_PER_TRX)
+            compact = {'address_id': ids[row['address']],
+                       'balance_sun': balance_sun,
+                       'bandwidth': _to_int(row.get('bandwidth')),
+                       'energy': _to_int(row.get('energy')),
+                       }
+            if 'timestamp' in row:
+                compact['timestamp'] = row['timestamp']
+            rows.append(compact)
+        return rows
+
+    def _read_model(self, row, data: dict):
+        return row.to_read_model(data['address'])
+
+    async def _after_insert(self, session, data: List[dict], ids: Sequence[int]) -> None:
+        await insert_history_children(session, data, ids)
+
+    def _after_commit(self, data: List[dict]) -> None:
+        history_version.invalidate()
+
+    async def _after_delete(self, session, ids: Sequence[int]) -> None:
+        await delete_history_children(session, ids)
+
+    async def get_by_address(self, address: str, per_page: int,
+                             cursor: Optional[CursorKey] = None) -> Tuple[list, Optional[CursorKey]]:
+        address_id = await self.find_address_id(address)
+        if address_id is None:
+            return [], None
+        # адрес известен - соединение со словарем адресов не нужно
+        query = (self._newest_first(per_page, cursor).
+                 where(self.model.address_id == address_id).
+                 options(noload(self.model.address_ref)))
+        return await self._fetch_page(query, per_page, address=address)
+
+    def _epoch_seconds(self):
+        if IS_SQLITE:
+            # метка времени уже хранится секундами эпохи
+            return type_coerce(self.model.timestamp, BigInteger)
+        return super()._epoch_seconds()
+
+    async def get_series(self, address: str, since: datetime, until: datetime, width: int) -> List[dict]:
+        address_id = await self.find_address_id(address)
+        if address_id is None:
+            return []
+        values = {'balance': self.model.balance_sun, 'bandwidth': self.model.bandwidth, 'energy': self.model.energy}
+        buckets = await self._series(self.model.address_id == address_id, since, until, width, values)
+        # перевод в прежние единицы: баланс в TRX, ресурсы - числа с плавающей точкой
+        for bucket in buckets:
+            for name in ('balance', 'bandwidth', 'energy'):
+                for key in (f"{name}_min", f"{name}_max", f"{name}_last"):
+                    if bucket[key] is not None:
+                        bucket[key] = bucket[key] / SUN_PER_TRX if name == 'balance' else float(bucket[key])
+        return buckets
+
+    async def stream_all(self, columns: Sequence[str],
+                         address: Optional[str] = None,
+                         since: Optional[datetime] = None,
+                         until: Optional[datetime] = None,
+                         chunk_size: int = 1000,
+                         limit: Optional[int] = None) -> AsyncGenerator[Sequence[tuple], None]:
+        mapped = [self.EXPORT_COLUMNS[column] for column in columns]
+        query = (select(*[column for column, _ in mapped]).
+                 join(AddressModel, AddressModel.id == self.model.address_id).
+                 order_by(self.model.timestamp, self.model.id).
+                 limit(limit).
+                 execution_options(yield_per=chunk_size))
+        if address is not None:
+            address_id = await self.find_address_id(address)
+            if address_id is None:
+                return
+            query = query.where(self.model.address_id == address_id)
+        if since is not None:
+            query = query.where(self.model.timestamp >= since)
+        if until is not None:
+            query = query.where(self.model.timestamp < until)
+        converters = [convert for _, convert in mapped]
+        async with async_session() as session:
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield [tuple(value if convert is None or value is None else convert(value)
+                             for value, convert in zip(row, converters)) for row in rows]
+
+
+# хранилище истории выбирается настройкой HISTORY_STORAGE (legacy, compact)
+HistoryRepo = CompactHistoryRepo if HISTORY_STORAGE == "compact" else LegacyHistoryRepo
+
+
+class HistoryTokenBalanceRepo(SQLAlchemyRepository):
+    model = HistoryTokenBalanceModel
+
+    async def get_by_history(self, history_id: int) -> list:
+        async with async_session() as session:
+            query = select(self.model).filter_by(history_id=history_id).order_by(self.model.id)
+            rows = (await session.execute(query)).scalars().all()
+            return [row.to_read_model() for row in rows]
+
+    async def get_by_histories(self, history_ids: Sequence[int], columns: Sequence[str]) -> List[tuple]:
+        """
+        Функция получения балансов токенов строк истории (для переноса в архив)
+
+        :param history_ids: id строк истории
+        :param columns: Имена столбцов
+        :return: Список кортежей значений столбцов по возрастанию id
+        """
+        rows = []
+        async with async_session() as session:
+            for start in range(0, len(history_ids), IN_CHUNK_SIZE):
+                query = (select(*[getattr(self.model, column) for column in columns]).
+                         where(self.model.history_id.in_(history_ids[start:start + IN_CHUNK_SIZE])).
+                         order_by(self.model.id))
+                rows += [tuple(row) for row in (await session.execute(query)).all()]
+        return rows
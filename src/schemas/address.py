@@ -1,16 +1,44 @@
-from typing import Optional
-from pydantic import BaseModel
+from decimal import Decimal
+from typing import List, Optional
+from pydantic import BaseModel, Field
 
 
 class AddressRequestSchema(BaseModel):
     address: str
 
 
+class TokenBalanceSchema(BaseModel):
+    contract: str
+    symbol: Optional[str] = None
+    decimals: Optional[int] = None
+    balance: Optional[Decimal] = Field(None, description="Баланс с учетом decimals (нет - ошибка запроса)")
+
+
 class AddressResponseSchema(BaseModel):
     address: str
     bandwidth: Optional[float]
     energy: Optional[float]
     balance: Optional[float]
+    tokens: Optional[List[TokenBalanceSchema]] = Field(None, description="Балансы TRC-20 токенов")
 
     class Config:
         from_attributes = True
+
+
+class AddressBatchRequestSchema(BaseModel):
+    addresses: List[str] = Field(..., min_length=1, max_length=1000, description="Адреса кошельков")
+
+
+class AddressErrorSchema(BaseModel):
+    type: str = Field(..., description="Тип ошибки: invalid, not_found, overloaded, upstream")
+    detail: str
+
+
+class AddressBatchItemSchema(BaseModel):
+    address: str
+    result: Optional[AddressResponseSchema] = None
+    error: Optional[AddressErrorSchema] = None
+
+
+class AddressBatchResponseSchema(BaseModel):
+    items: List[AddressBatchItemSchema]
@@ -0,0 +1,38 @@
+from typing import List, Optional
+from pydantic import BaseModel
+
+
+class CacheStatsSchema(BaseModel):
+    hits: int
+    misses: int
+    coalesced: int
+    waited: int = 0
+    hit_ratio: float
+    size: int
+    in_flight: int
+    evictions: int
+    block: Optional[int] = None
+
+
+class TronEndpointStatsSchema(BaseModel):
+    uri: str
+    state: str
+    requests: int
+    failures: int
+    p50: Optional[float]
+    p95: Optional[float]
+    p99: Optional[float]
+
+
+class TronNodesStatsSchema(BaseModel):
+    hedged: int
+    endpoints: List[TronEndpointStatsSchema]
+
+
+class AdmissionStatsSchema(BaseModel):
+    enabled: bool
+    queued: int
+    clients_waiting: int
+    admitted: int
+    rejected: int
+    timed_out: int
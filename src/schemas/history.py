@@ -17,4 +17,79 @@ class HistoryResponseSchema(BaseModel):
 class HistoryResponseSchemas(BaseModel):
     page: int = Field(1, ge=1, le=100, description="Номер страницы")
     per_page: int = Field(10, ge=1, le=100, description="Элементов на странице")
+    total: Optional[int] = Field(None, description="Всего записей истории")
+    pages: Optional[int] = Field(None, description="Всего страниц")
     logs: Optional[List[HistoryResponseSchema]] = None
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
+
+
+class AddressHistoryResponseSchema(BaseModel):
+    address: str
+    per_page: int = Field(10, ge=1, le=100, description="Элементов на странице")
+    logs: Optional[List[HistoryResponseSchema]] = None
+    next_cursor: Optional[str] = Field(None, description="Курсор следующей страницы")
+
+
+class HourlyStatsSchema(BaseModel):
+    bucket: datetime
+    lookups: int
+    balance_min: Optional[float]
+    balance_max: Optional[float]
+    balance_last: Optional[float]
+
+
+class AddressStatsSchema(BaseModel):
+    address: str
+    lookups: int
+    balance_min: Optional[float]
+    balance_max: Optional[float]
+    balance_last: Optional[float]
+    first_seen: datetime
+    last_seen: datetime
+    hourly: List[HourlyStatsSchema] = []
+
+
+class SeriesPointSchema(BaseModel):
+    timestamp: datetime = Field(description="Начало корзины")
+    count: int = Field(description="Строк истории в корзине")
+    balance_min: Optional[float]
+    balance_max: Optional[float]
+    balance_last: Optional[float]
+    bandwidth_min: Optional[float]
+    bandwidth_max: Optional[float]
+    bandwidth_last: Optional[float]
+    energy_min: Optional[float]
+    energy_max: Optional[float]
+    energy_last: Optional[float]
+
+
+class AddressSeriesSchema(BaseModel):
+    address: str
+    since: datetime
+    until: datetime
+    method: str
+    resolution: int = Field(description="Ширина корзины (сек.)")
+    points: List[SeriesPointSchema] = []
+
+
+class HistoryWriterStatsSchema(BaseModel):
+    running: bool
+    queued: int
+    flushed: int
+    flushes: int
+    failed: int
+
+
+class HistoryArchiveStatsSchema(BaseModel):
+    running: bool
+    retention_days: float = Field(description="Срок хранения строк в таблице истории (дней)")
+    runs: int
+    archived: int = Field(description="Строк перенесено этим процессом")
+    errors: int
+    last_run: Optional[datetime]
+    periods: List[str] = Field(description="Месяцы архива")
+    segments: int
+    rows: int = Field(description="Строк в архиве")
+    bytes: int = Field(description="Размер сегментов (байт)")
+    oldest: Optional[datetime]
+    newest: Optional[datetime]
@@ -0,0 +1,19 @@
+from typing import List
+from pydantic import BaseModel, Field
+
+
+class WatchlistRequestSchema(BaseModel):
+    addresses: List[str] = Field(..., min_length=1, max_length=1000, description="Адреса кошельков")
+
+
+class WatchlistResponseSchema(BaseModel):
+    addresses: List[str]
+    invalid: List[str] = []
+
+
+class WatchlistStatsSchema(BaseModel):
+    addresses: int
+    subscribers: int
+    refreshes: int
+    changes: int
+    errors: int
@@ -0,0 +1,110 @@
+import asyncio
+from fastapi import HTTPException
+from tronpy.exceptions import AddressNotFound
+from typing import Dict, Any, Optional
+
+from src.tron.address import normalize_address
+from src.tron.admission import admission_budget, reserve
+from src.tron.blocks import block_tracker
+from src.tron.cache import account_cache, ACCOUNT_CACHE_BLOCK_TTL
+from src.tron.nodes import TronNodePool
+from src.tron.trc20 import trc20_balances
+from src.tron.units import SUN_PER_TRX
+from src.utils.metrics import stage_duration
+from src.utils.rate_limit import Overloaded
+
+# вызовов узла на снимок кошелька: getaccount, getaccountresource, getaccountnet
+ACCOUNT_RPC_CALLS = 3
+
+
+def overloaded(e: Overloaded) -> HTTPException:
+    return HTTPException(status_code=e.status_code, detail=e.detail, headers={"Retry-After": str(e.retry_after)})
+
+
+async def get_tron_account(client: TronNodePool, address: str, client_key: str = "") -> Dict[str, Any]:
+    """
+    Функция получения ТРОН-аккаунта
+
+    :param client: Общий набор узлов сети Трон
+    :param address: Нормализованный адрес кошелька (проверяется в fetch_tron_account)
+    :param client_key: Ключ клиента (IP-адрес) для контроля допуска
+    :return: Словарь данных аккаунта
+    """
+    # ограничение частоты запросов к внешнему API: токен на каждый вызов узла
+    try:
+        with stage_duration.time(stage="admission"):
+            budget = await reserve(client_key, ACCOUNT_RPC_CALLS + trc20_balances.calls)
+    except Overloaded as e:
+        raise overloaded(e)
+
+    # одновременный запрос аккаунта, ресурсов, bandwidth и балансов TRC-20 токенов
+    calls = [client.get_account(address), client.get_account_resource(address), client.get_bandwidth(address)]
+    if trc20_balances.enabled:
+        calls.append(trc20_balances.balances(client, address))
+    token = admission_budget.set(budget)
+    try:
+        with stage_duration.time(stage="tron_rpc"):
+            account, resource, bandwidth, *tokens = await asyncio.gather(*calls, return_exceptions=True)
+    finally:
+        admission_budget.reset(token)
+    for result in (account, resource, bandwidth):
+        if isinstance(result, Overloaded):
+            raise overloaded(result)
+    if isinstance(account, AddressNotFound) or not account:
+        raise HTTPException(status_code=404, detail="Account not found")
+    for result in (account, resource):
+        if isinstance(result, Exception) and not isinstance(result, AddressNotFound):
+            raise HTTPException(status_code=500, detail=str(result))
+
+    snapshot = to_wallet_snapshot(address, account, resource, bandwidth)
+    if trc20_balances.enabled:
+        snapshot['tokens'] = tokens[0] if isinstance(tokens[0], list) else []
+    return snapshot
+
+
+def to_wallet_snapshot(address: str, account: Dict[str, Any], resource: Any, bandwidth: Any) -> Dict[str, Any]:
+    """
+    Функция сборки снимка кошелька: баланс в TRX, доступные bandwidth и energy
+    (бесплатные + застейканные - израсходованные)
+
+    :param address: Адрес кошелька
+    :param account: Ответ "getaccount"
+    :param resource: Ответ "getaccountresource" (или исключение для неактивного аккаунта)
+    :param bandwidth: Доступный bandwidth из "getaccountnet" (или исключение - тогда считается по ресурсам)
+    :return: Словарь снимка кошелька
+    """
+    resource = resource if isinstance(resource, dict) else {}
+    if not isinstance(bandwidth, int):
+        bandwidth = (resource.get('freeNetLimit', 0) - resource.get('freeNetUsed', 0)
+                     + resource.get('NetLimit', 0) - resource.get('NetUsed', 0))
+    energy = resource.get('EnergyLimit', 0) - resource.get('EnergyUsed', 0)
+    balance_sun: int = account.get('balance', 0)
+    return {'address': address,
+            'balance': balance_sun / SUN_PER_TRX,
+            'balance_sun': balance_sun,
+            'bandwidth': {'available': max(bandwidth, 0)},
+            'energy': {'available': max(energy, 0)},
+            }
+
+
+async def fetch_tron_account(client: TronNodePool, address: str, client_key: str = "") -> Dict[str, Any]:
+    """
+    Функция получения ТРОН-аккаунта через кэш аккаунтов
+
+    :param client: Общий набор узлов сети Трон
+    :param address: Адрес кошелька
+    :param client_key: Ключ клиента (IP-адрес) для контроля допуска
+    :return: Словарь данных аккаунта
+    """
+    # проверка (валидация) адреса без обращения к сети - один раз, дальше передается нормализованный адрес
+    with stage_duration.time(stage="validate"):
+        normalized: Optional[str] = normalize_address(address)
+    if normalized is None:
+        raise HTTPException(status_code=400, detail="Invalid address")
+    block: Optional[int] = block_tracker.current()
+    if block is None:
+        return await account_cache.get_or_load(normalized, lambda: get_tron_account(client, normalized, client_key))
+    # запись актуальна до появления следующего блока
+    return await account_cache.get_or_load((block, normalized),
+                                           lambda: get_tron_account(client, normalized, client_key),
+                                           ttl=ACCOUNT_CACHE_BLOCK_TTL)
@@ -0,0 +1,328 @@
+import os
+import glob
+import time
+import heapq
+import fcntl
+import asyncio
+import calendar
+import logging
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from itertools import chain, groupby
+from typing import Any, AsyncGenerator, Dict, Iterator, List, Optional, Sequence, Tuple
+from dotenv import load_dotenv
+
+from src.database import vacuum_db
+from src.repositories.history import HISTORY_STORAGE, HistoryRepo, HistoryTokenBalanceRepo
+from src.utils.repository import AbstractRepository
+from src.utils.segments import read_columns, read_header, write_segment
+
+load_dotenv()
+HISTORY_ARCHIVE_ENABLED = os.getenv('HISTORY_ARCHIVE_ENABLED', 'False').lower() in ('true', '1')
+HISTORY_ARCHIVE_DIR = os.getenv('HISTORY_ARCHIVE_DIR', "./archive")
+HISTORY_RETENTION_DAYS = float(os.getenv('HISTORY_RETENTION_DAYS', 90))
+HISTORY_ARCHIVE_INTERVAL = float(os.getenv('HISTORY_ARCHIVE_INTERVAL', 3600.0))
+HISTORY_ARCHIVE_BATCH_SIZE = int(os.getenv('HISTORY_ARCHIVE_BATCH_SIZE', 50000))
+
+# столбцы сегментов: строки истории в прежнем формате (независимо от HISTORY_STORAGE) и балансы токенов
+HISTORY_SEGMENT_COLUMNS = {'id': "int", 'timestamp': "int", 'address': "dict",
+                           'balance': "float", 'bandwidth': "float", 'energy': "float"}
+TOKEN_SEGMENT_COLUMNS = {'history_id': "int", 'contract': "dict", 'symbol': "dict",
+                         'decimals': "dict", 'balance_raw': "dict"}
+SEGMENT_SUFFIX = ".seg"
+# сегмент записан, но строки еще не удалены из таблицы истории
+PENDING_SUFFIX = ".pending"
+
+
+def to_period(timestamp: datetime) -> str:
+    return timestamp.strftime("%Y-%m")
+
+
+def period_bounds(period: str) -> Tuple[datetime, datetime]:
+    start = datetime.strptime(period, "%Y-%m")
+    return start, (start + timedelta(days=32)).replace(day=1)
+
+
+class HistoryArchive:
+    """
+    Архив истории: строки старше срока хранения переносятся из таблицы истории в сжатые колоночные сегменты
+    (каталог на каждый месяц, файлы только добавляются) и остаются доступны для выгрузки
+    """
+
+    def __init__(self,
+                 history_repository: type,
+                 directory: str = HISTORY_ARCHIVE_DIR,
+                 retention_days: float = HISTORY_RETENTION_DAYS,
+                 interval: float = HISTORY_ARCHIVE_INTERVAL,
+                 batch_size: int = HISTORY_ARCHIVE_BATCH_SIZE,
+                 token_repository: Optional[type] = None,
+                 ):
+        self.history_repository: AbstractRepository = history_repository()
+        self.token_repository: Optional[AbstractRepository] = token_repository() if token_repository else None
+        self.directory: str = directory
+        self.retention_days: float = retention_days
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.runs: int = 0
+        self.archived: int = 0
+        self.errors: int = 0
+        self.last_run: Optional[datetime] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def _path(self, table: str, *parts: str) -> str:
+        return os.path.join(self.directory, table, *parts)
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """
+        Функция запуска фонового переноса строк в архив
+        """
+        if not self.running:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Функция остановки фонового переноса
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self) -> None:
+        while True:
+            try:
+                await self.archive()
+            except Exception as e:
+                self.errors += 1
+                logging.error(f"History archive run failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    @contextmanager
+    def _exclusive(self) -> Iterator[bool]:
+        # перенос выполняет один процесс хоста (воркеры uvicorn, ручной запуск) - остальные пропускают запуск
+        os.makedirs(self.directory, exist_ok=True)
+        with open(os.path.join(self.directory, ".lock"), "w") as lock:
+            try:
+                fcntl.flock(lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except BlockingIOError:
+                yield False
+                return
+            try:
+                yield True
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    async def archive(self, now: Optional[datetime] = None, vacuum: bool = True) -> Dict[str, int]:
+        """
+        Функция переноса в архив строк истории старше срока хранения: пакетами по batch_size строк
+        запись сегментов, удаление строк (вместе с балансами токенов) и подтверждение сегментов
+
+        :param now: Текущее время (UTC)
+        :param vacuum: Вернуть освобожденные страницы SQLite-файлу после переноса
+        :return: Словарь счетчиков: перенесено строк, записано сегментов
+        """
+        cutoff = (now or datetime.utcnow()) - timedelta(days=self.retention_days)
+        archived = segments = 0
+        with self._exclusive() as acquired:
+            if not acquired:
+                return {'archived': 0, 'segments': 0}
+            await self._recover()
+            while True:
+                rows = [tuple(row) async for chunk in self.history_repository.stream_all(
+                    list(HISTORY_SEGMENT_COLUMNS), until=cutoff, chunk_size=self.batch_size, limit=self.batch_size)
+                    for row in chunk]
+                if not rows:
+                    break
+                ids = [row[0] for row in rows]
+                tokens = []
+                if self.token_repository is not None:
+                    tokens = await self.token_repository.get_by_histories(ids, list(TOKEN_SEGMENT_COLUMNS))
+                pending, written = await asyncio.to_thread(self._write_pending, rows, tokens)
+                await self.history_repository.delete_many(ids)
+                self._commit(pending)
+                archived += len(rows)
+                segments += written
+                logging.info(f"Archived {archived} history rows older than {cutoff}")
+                if len(rows) < self.batch_size:
+                    break
+        if archived and vacuum:
+            await vacuum_db()
+        self.runs += 1
+        self.archived += archived
+        self.last_run = datetime.utcnow()
+        return {'archived': archived, 'segments': segments}
+
+    def _write_pending(self, rows: List[tuple], tokens: List[tuple]) -> Tuple[List[str], int]:
+        # строки упорядочены по (timestamp, id) - сегменты месяцев тоже получаются упорядоченными
+        pending, written = [], 0
+        # id удаленных строк SQLite может выдать повторно - метка пакета не дает имени совпасть с прежним сегментом
+        stamp = time.time_ns()
+        token_rows: Dict[int, List[tuple]] = {}
+        for row in tokens:
+            token_rows.setdefault(row[0], []).append(row)
+        for period, group in groupby(rows, key=lambda row: to_period(row[1])):
+            group = list(group)
+            ids = [row[0] for row in group]
+            name = f"{min(ids):012d}-{max(ids):012d}-{stamp}{SEGMENT_SUFFIX}{PENDING_SUFFIX}"
+            os.makedirs(self._path("history", period), exist_ok=True)
+            columns = dict(zip(HISTORY_SEGMENT_COLUMNS, map(list, zip(*group))))
+            columns['timestamp'] = [calendar.timegm(timestamp.timetuple()) for timestamp in columns['timestamp']]
+            meta = {'min_timestamp': columns['timestamp'][0], 'max_timestamp': columns['timestamp'][-1],
+                    'storage': HISTORY_STORAGE}
+            history_path = self._path("history", period, name)
+            write_segment(history_path, HISTORY_SEGMENT_COLUMNS, columns, meta)
+            written += 1
+
+            group_tokens = [row for history_id in ids for row in token_rows.get(history_id, ())]
+            if group_tokens:
+                os.makedirs(self._path("history_token_balance", period), exist_ok=True)
+                pending.append(self._path("history_token_balance", period, name))
+                write_segment(pending[-1], TOKEN_SEGMENT_COLUMNS,
+                              dict(zip(TOKEN_SEGMENT_COLUMNS, map(list, zip(*group_tokens)))))
+            # сегмент истории подтверждается последним: пока он не подтвержден, восстановление видит всю группу
+            pending.append(history_path)
+        return pending, written
+
+    @staticmethod
+    def _commit(pending: Sequence[str]) -> None:
+        for path in pending:
+            os.replace(path, path[:-len(PENDING_SUFFIX)])
+
+    async def _recover(self) -> None:
+        # сбой между записью сегмента и удалением строк: удаление выполняется одной транзакцией,
+        # поэтому строки сегмента либо все еще в таблице (сегмент отбрасывается), либо уже удалены (подтверждается)
+        for path in glob.glob(self._path("history", "*", f"*{PENDING_SUFFIX}")):
+            ids = read_columns(path, ["id"])['id']
+            tokens_path = path.replace(self._path("history"), self._path("history_token_balance"), 1)
+            paths = ([tokens_path] if os.path.exists(tokens_path) else []) + [path]
+            if await self.history_repository.count_existing(ids):
+                for pending in paths:
+                    os.remove(pending)
+            else:
+                self._commit(paths)
+        # сегмент балансов без неподтвержденного сегмента истории: строки уже удалены, сегмент истории подтвержден
+        orphans = glob.glob(self._path("history_token_balance", "*", f"*{PENDING_SUFFIX}"))
+        if orphans:
+            self._commit(orphans)
+
+    def periods(self, since: Optional[datetime] = None, until: Optional[datetime] = None) -> List[str]:
+        """
+        Функция получения месяцев архива, пересекающихся с периодом [since, until)
+        """
+        base = self._path("history")
+        if not os.path.isdir(base):
+            return []
+        periods = []
+        for period in sorted(os.listdir(base)):
+            start, end = period_bounds(period)
+            if (until is None or start < until) and (since is None or end > since):
+                periods.append(period)
+        return periods
+
+    def segments(self, period: str) -> List[str]:
+        return sorted(glob.glob(self._path("history", period, f"*{SEGMENT_SUFFIX}")))
+
+    def _plan(self, period: str, since: Optional[int], until: Optional[int]) -> List[List[str]]:
+        # сегменты месяца по времени первой строки; сегменты вне периода не читаются, пересекающиеся
+        # по времени (строки с задержанной меткой времени) объединяются в группу для слияния
+        headers = []
+        for path in self.segments(period):
+            meta = read_header(path)['meta']
+            if since is not None and meta['max_timestamp'] < since or until is not None and meta['min_timestamp'] >= until:
+                continue
+            headers.append((meta['min_timestamp'], meta['max_timestamp'], path))
+        groups, group_end = [], None
+        for start, end, path in sorted(headers):
+            if group_end is not None and start <= group_end:
+                groups[-1].append(path)
+                group_end = max(group_end, end)
+            else:
+                groups.append([path])
+                group_end = end
+        return groups
+
+    @staticmethod
+    def _load(paths: Sequence[str], columns: Sequence[str], address: Optional[str],
+              since: Optional[int], until: Optional[int]) -> List[tuple]:
+        # первые два столбца - ключ порядка (timestamp, id)
+        names = list(dict.fromkeys(("timestamp", "id", *(("address",) if address is not None else ()), *columns)))
+        loaded = []
+        for path in paths:
+            data = read_columns(path, names)
+            if address is not None and address not in data['address']:
+                continue
+            rows = zip(*data.values())
+            if address is not None:
+                rows = (row for row in rows if row[2] == address)
+            loaded.append([row for row in rows
+                           if (since is None or row[0] >= since) and (until is None or row[0] < until)])
+        positions = [names.index(column) for column in columns]
+        timestamp = columns.index("timestamp") if "timestamp" in columns else None
+        result = []
+        for row in heapq.merge(*loaded, key=lambda row: row[:2]) if len(loaded) > 1 else chain(*loaded):
+            row = [row[position] for position in positions]
+            if timestamp is not None:
+                row[timestamp] = datetime.utcfromtimestamp(row[timestamp])
+            result.append(tuple(row))
+        return result
+
+    async def stream(self, columns: Sequence[str],
+                     address: Optional[str] = None,
+                     since: Optional[datetime] = None,
+                     until: Optional[datetime] = None,
+                     chunk_size: int = 1000) -> AsyncGenerator[List[tuple], None]:
+        """
+        Функция потокового чтения архива в формате выгрузки истории по (timestamp, id): сегменты читаются
+        по одному в отдельном потоке, сливаются только сегменты с пересекающимися периодами
+
+        :param columns: Имена столбцов (id, address, balance, bandwidth, energy, timestamp)
+        :param address: Адрес кошелька
+        :param since: Начало периода (включительно)
+        :param until: Конец периода (не включительно)
+        :param chunk_size: Строк в одной порции
+        :return: Асинхронный генератор порций строк
+        """
+        since_epoch = None if since is None else calendar.timegm(since.timetuple())
+        until_epoch = None if until is None else calendar.timegm(until.timetuple())
+        for period in self.periods(since, until):
+            for paths in await asyncio.to_thread(self._plan, period, since_epoch, until_epoch):
+                rows = await asyncio.to_thread(self._load, paths, columns, address, since_epoch, until_epoch)
+                for start in range(0, len(rows), chunk_size):
+                    yield rows[start:start + chunk_size]
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Функция получения счетчиков переноса и размера архива
+        """
+        rows = size = 0
+        segments = []
+        for period in self.periods():
+            for path in self.segments(period):
+                header = read_header(path)
+                rows += header['rows']
+                size += os.path.getsize(path)
+                segments.append(header['meta'])
+        return {'running': self.running,
+                'retention_days': self.retention_days,
+                'runs': self.runs,
+                'archived': self.archived,
+                'errors': self.errors,
+                'last_run': self.last_run,
+                'periods': self.periods(),
+                'segments': len(segments),
+                'rows': rows,
+                'bytes': size,
+                'oldest': min((datetime.utcfromtimestamp(meta['min_timestamp']) for meta in segments), default=None),
+                'newest': max((datetime.utcfromtimestamp(meta['max_timestamp']) for meta in segments), default=None),
+                }
+
+
+history_archive = HistoryArchive(HistoryRepo, token_repository=HistoryTokenBalanceRepo)
@@ -1,26 +1,198 @@
-from src.schemas.history import HistoryResponseSchemas
+import os
+import csv
+import io
+import json
+import math
+from datetime import datetime, timedelta, timezone
+from typing import AsyncGenerator, List, Optional, Sequence
+from dotenv import load_dotenv
+from pydantic_core import to_json
+
+from src.repositories.history import HistoryRollupRepo, to_hour
+from src.schemas.history import AddressHistoryResponseSchema, HistoryResponseSchemas
+from src.services.archive import history_archive
+from src.services.history_writer import history_writer
+from src.utils.cache import TTLCache
+from src.utils.downsample import lttb
+from src.utils.pagination import decode_cursor, encode_cursor
 from src.utils.repository import AbstractRepository
 
+load_dotenv()
+LOGS_PAGE_CACHE_TTL = float(os.getenv('LOGS_PAGE_CACHE_TTL', 5.0))
+LOGS_PAGE_CACHE_SIZE = int(os.getenv('LOGS_PAGE_CACHE_SIZE', 100))
+
+# для LTTB период сначала агрегируется в БД на корзины в несколько раз мельче итогового разрешения
+SERIES_LTTB_OVERSAMPLING = 4
+SERIES_VALUES = ('balance', 'bandwidth', 'energy')
+
+EXPORT_COLUMNS = ('id', 'address', 'balance', 'bandwidth', 'energy', 'timestamp')
+EXPORT_MEDIA_TYPES = {'ndjson': "application/x-ndjson", 'csv': "text/csv"}
+
+# готовые JSON-ответы первых страниц "/logs/" по (поколение истории, per_page):
+# запись в историю меняет поколение, и прежние ответы больше не выбираются
+logs_page_cache = TTLCache(maxsize=LOGS_PAGE_CACHE_SIZE, ttl=LOGS_PAGE_CACHE_TTL)
+
+
+def _to_naive_utc(value: Optional[datetime]) -> Optional[datetime]:
+    # метки времени истории хранятся в UTC без часового пояса
+    if value is None or value.tzinfo is None:
+        return value
+    return value.astimezone(timezone.utc).replace(tzinfo=None)
+
+
+def _rows_to_ndjson(rows: Sequence) -> str:
+    lines = []
+    for row in rows:
+        row_dict = dict(zip(EXPORT_COLUMNS, row))
+        row_dict['timestamp'] = row_dict['timestamp'].isoformat()
+        lines.append(json.dumps(row_dict))
+    return "\n".join(lines) + "\n"
+
+
+def _rows_to_csv(rows: Sequence) -> str:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerows((*row[:-1], row[-1].isoformat()) for row in rows)
+    return buffer.getvalue()
+
 
 class HistoryService:
-    def __init__(self, history_repository: AbstractRepository):
+    def __init__(self, history_repository: AbstractRepository,
+                 rollup_repository: type = HistoryRollupRepo):
         self.history_repository: AbstractRepository = history_repository()
+        self.rollup_repository: HistoryRollupRepo = rollup_repository()
 
-    async def add_history(self, account: dict) -> int:
-        account_dict = {'address': account.get('address', ''),
+    @staticmethod
+    def to_history_dict(account: dict) -> dict:
+        history_dict = {'address': account.get('address', ''),
                         'balance': account.get('balance', 0.0),
                         'bandwidth': account.get('bandwidth', {}).get('available', 0.0),
                         'energy': account.get('energy', {}).get('available', 0.0),
                         }
-        history_id = await self.history_repository.add_one(account_dict)
-        return history_id
+        if 'balance_sun' in account:
+            # точный баланс для хранилища с целыми суммами
+            history_dict['balance_sun'] = account['balance_sun']
+        return history_dict
+
+    @staticmethod
+    def to_token_rows(account: dict) -> List[dict]:
+        return [{'contract': token['contract'],
+                 'symbol': token.get('symbol'),
+                 'decimals': token.get('decimals'),
+                 'balance_raw': token.get('balance_raw'),
+                 } for token in account.get('tokens') or ()]
+
+    def to_history_row(self, account: dict) -> dict:
+        # балансы токенов передаются репозиторию вместе со строкой и вставляются в ее транзакции
+        return {**self.to_history_dict(account), 'tokens': self.to_token_rows(account)}
+
+    async def add_history(self, account: dict, sync: bool = False) -> Optional[int]:
+        if history_writer.running and not sync:
+            await history_writer.put(self.to_history_dict(account), self.to_token_rows(account))
+            return None
+        return await self.history_repository.add_one(self.to_history_row(account))
+
+    async def add_history_returning(self, account: dict) -> dict:
+        # сохраненная строка возвращается запросом вставки (при отложенной записи - данные аккаунта)
+        account_dict = self.to_history_dict(account)
+        if history_writer.running:
+            await history_writer.put(account_dict, self.to_token_rows(account))
+            return account_dict
+        _, history = await self.history_repository.add_one_returning(self.to_history_row(account))
+        return dict(history)
+
+    async def add_history_many(self, accounts: List[dict]) -> List[int]:
+        return await self.history_repository.add_many([self.to_history_row(account) for account in accounts])
 
     async def get_history_one(self, history_id: int):
         history_dict = await self.history_repository.get_one(history_id)
         return history_dict
 
-    async def get_history_paginated(self, history: HistoryResponseSchemas):
-        history_dict = history.model_dump()
-        history_list = await self.history_repository.get_all(**history_dict)
+    async def get_history_paginated(self, history: HistoryResponseSchemas, cursor: Optional[str] = None):
+        cursor_key = decode_cursor(cursor) if cursor else None
+        history_list, next_key = await self.history_repository.get_all(history.page, history.per_page, cursor_key)
+        history.logs = history_list
+        history.next_cursor = encode_cursor(next_key)
+        # количество строк - из счетчика сводных таблиц, без COUNT(*) по истории
+        history.total = await self.rollup_repository.total()
+        history.pages = math.ceil(history.total / history.per_page)
+        return history
+
+    async def render_history_page(self, page: int, per_page: int, cursor: Optional[str], generation: int) -> bytes:
+        # первая страница - из кэша готовых ответов, пока поколение истории не изменилось
+        cacheable = page == 1 and cursor is None and LOGS_PAGE_CACHE_TTL > 0
+        if cacheable:
+            body = logs_page_cache.get((generation, per_page))
+            if body is not None:
+                return body
+        history = await self.get_history_paginated(HistoryResponseSchemas(page=page, per_page=per_page), cursor)
+        # сериализация по схеме ответа HistoryResponseSchemas (состав полей - как у response_model эндпоинта)
+        body = to_json(history)
+        if cacheable:
+            logs_page_cache.set((generation, per_page), body)
+        return body
+
+    async def get_address_history(self, history: AddressHistoryResponseSchema, cursor: Optional[str] = None):
+        cursor_key = decode_cursor(cursor) if cursor else None
+        history_list, next_key = await self.history_repository.get_by_address(history.address,
+                                                                              history.per_page,
+                                                                              cursor_key)
         history.logs = history_list
+        history.next_cursor = encode_cursor(next_key)
         return history
+
+    async def get_address_stats(self, address: str, hours: int) -> Optional[dict]:
+        since = to_hour(datetime.utcnow()) - timedelta(hours=hours - 1)
+        return await self.rollup_repository.get_address_stats(address, since)
+
+    async def get_address_series(self, address: str,
+                                 since: Optional[datetime],
+                                 until: Optional[datetime],
+                                 points: int,
+                                 method: str) -> Optional[dict]:
+        until = _to_naive_utc(until) or datetime.utcnow().replace(microsecond=0) + timedelta(seconds=1)
+        # начало периода по умолчанию - первый запрос адреса из сводки
+        since = _to_naive_utc(since) or await self.rollup_repository.get_first_seen(address)
+        if since is None:
+            return None
+        if since >= until:
+            raise ValueError("since must be earlier than until")
+
+        span = (until - since).total_seconds()
+        buckets_count = points * SERIES_LTTB_OVERSAMPLING if method == 'lttb' else points
+        width = max(1, math.ceil(span / buckets_count))
+        buckets = await self.history_repository.get_series(address, since, until, width)
+        series = [{'timestamp': since + timedelta(seconds=bucket['bucket'] * width),
+                   'count': bucket['count'],
+                   **{f"{name}_{kind}": bucket[f"{name}_{kind}"]
+                      for name in SERIES_VALUES for kind in ('min', 'max', 'last')},
+                   } for bucket in buckets]
+        if method == 'lttb':
+            # прореживание по балансу: сохраняются точки, определяющие форму графика
+            selected = lttb([bucket['bucket'] for bucket in buckets],
+                            [bucket['balance_last'] or 0.0 for bucket in buckets], points)
+            series = [series[index] for index in selected]
+        return {'address': address,
+                'since': since,
+                'until': until,
+                'method': method,
+                'resolution': width,
+                'points': series,
+                }
+
+    async def export_history(self, fmt: str,
+                             address: Optional[str] = None,
+                             since=None,
+                             until=None,
+                             archive: bool = True) -> AsyncGenerator[str, None]:
+        serializer = _rows_to_csv if fmt == 'csv' else _rows_to_ndjson
+        # границы с часовым поясом (например, "Z") сравниваются с наивным UTC в таблице и архиве
+        since, until = _to_naive_utc(since), _to_naive_utc(until)
+        if fmt == 'csv':
+            yield ",".join(EXPORT_COLUMNS) + "\r\n"
+        # строки архива старше строк таблицы истории - выгружаются первыми
+        if archive:
+            async for rows in history_archive.stream(EXPORT_COLUMNS, address, since, until):
+                yield serializer(rows)
+        async for rows in self.history_repository.stream_all(EXPORT_COLUMNS, address, since, until):
+            yield serializer(rows)
@@ -0,0 +1,144 @@
+import os
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional, Tuple
+from dotenv import load_dotenv
+
+from src.repositories.history import HistoryRepo
+from src.utils.repository import AbstractRepository
+
+load_dotenv()
+HISTORY_WRITE_BEHIND = os.getenv('HISTORY_WRITE_BEHIND', 'False').lower() in ('true', '1')
+HISTORY_BATCH_SIZE = int(os.getenv('HISTORY_BATCH_SIZE', 500))
+HISTORY_FLUSH_INTERVAL_MS = int(os.getenv('HISTORY_FLUSH_INTERVAL_MS', 50))
+HISTORY_QUEUE_SIZE = int(os.getenv('HISTORY_QUEUE_SIZE', 10000))
+HISTORY_FLUSH_RETRIES = int(os.getenv('HISTORY_FLUSH_RETRIES', 5))
+HISTORY_FLUSH_BACKOFF_MS = int(os.getenv('HISTORY_FLUSH_BACKOFF_MS', 100))
+
+
+class HistoryWriteBuffer:
+    """
+    Буфер отложенной записи истории с пакетной вставкой строк в фоновой задаче
+    """
+
+    def __init__(self,
+                 history_repository: type,
+                 batch_size: int = HISTORY_BATCH_SIZE,
+                 flush_interval_ms: int = HISTORY_FLUSH_INTERVAL_MS,
+                 maxsize: int = HISTORY_QUEUE_SIZE,
+                 retries: int = HISTORY_FLUSH_RETRIES,
+                 backoff_ms: int = HISTORY_FLUSH_BACKOFF_MS,
+                 ):
+        self.history_repository: AbstractRepository = history_repository()
+        self.batch_size: int = batch_size
+        self.flush_interval: float = flush_interval_ms / 1000
+        self.maxsize: int = maxsize
+        self.retries: int = retries
+        self.backoff: float = backoff_ms / 1000
+        self.flushed: int = 0
+        self.flushes: int = 0
+        self.retried: int = 0
+        self.failed: int = 0
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def running(self) -> bool:
+        return self._task is not None and not self._task.done()
+
+    async def start(self) -> None:
+        """
+        Функция запуска фоновой задачи записи
+        """
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.maxsize)
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Функция остановки фоновой задачи с записью всех строк из очереди
+        """
+        if not self.running:
+            return
+        await self._queue.put(None)
+        await self._task
+        self._task = None
+
+    async def put(self, data: Dict[str, Any], tokens: Optional[List[Dict[str, Any]]] = None) -> None:
+        """
+        Функция постановки строки в очередь (ожидает, если очередь заполнена)
+
+        :param data: Словарь данных строки истории
+        :param tokens: Строки балансов TRC-20 токенов для дочерней таблицы
+        """
+        await self._queue.put((data, tokens))
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        stopping = False
+        while not stopping:
+            item = await self._queue.get()
+            if item is None:
+                break
+            batch: List[Tuple[Dict[str, Any], Optional[list]]] = [item]
+            deadline = loop.time() + self.flush_interval
+            while len(batch) < self.batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(self._queue.get(), timeout)
+                except asyncio.TimeoutError:
+                    break
+                if item is None:
+                    stopping = True
+                    break
+                batch.append(item)
+            await self._flush(batch)
+
+        # запись остатка очереди при остановке
+        batch = []
+        while not self._queue.empty():
+            item = self._queue.get_nowait()
+            if item is not None:
+                batch.append(item)
+        for start in range(0, len(batch), self.batch_size):
+            await self._flush(batch[start:start + self.batch_size])
+
+    async def _flush(self, batch: List[Tuple[Dict[str, Any], Optional[list]]]) -> None:
+        # балансы токенов вставляются репозиторием в транзакции строк истории
+        rows = [{**data, 'tokens': tokens or []} for data, tokens in batch]
+        for attempt in range(self.retries + 1):
+            try:
+                await self.history_repository.add_many(rows)
+            except Exception as e:
+                if attempt == self.retries:
+                    self.failed += len(batch)
+                    logging.error(f"Failed to write history batch of {len(batch)} rows "
+                                  f"after {attempt + 1} attempts: {e}")
+                    return
+                # БД временно недоступна или заблокирована: пакет повторяется с растущей паузой,
+                # новые строки тем временем ждут в очереди (при заполнении очереди ждут и запросы)
+                self.retried += 1
+                logging.warning(f"Retrying history batch of {len(batch)} rows: {e}")
+                await asyncio.sleep(self.backoff * 2 ** attempt)
+            else:
+                self.flushed += len(batch)
+                self.flushes += 1
+                return
+
+    def stats(self) -> Dict[str, Any]:
+        """
+        Функция получения счетчиков буфера
+        """
+        return {'running': self.running,
+                'queued': self._queue.qsize() if self._queue is not None else 0,
+                'flushed': self.flushed,
+                'flushes': self.flushes,
+                'retried': self.retried,
+                'failed': self.failed,
+                }
+
+
+history_writer = HistoryWriteBuffer(HistoryRepo)
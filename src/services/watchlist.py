@@ -0,0 +1,156 @@
+import os
+import asyncio
+import logging
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set
+from dotenv import load_dotenv
+
+from src.repositories.history import HistoryRepo
+from src.services.history import HistoryService
+
+load_dotenv()
+WATCHLIST_INTERVAL = float(os.getenv('WATCHLIST_INTERVAL', 5.0))
+WATCHLIST_BATCH_SIZE = int(os.getenv('WATCHLIST_BATCH_SIZE', 100))
+WATCHLIST_CONCURRENCY = int(os.getenv('WATCHLIST_CONCURRENCY', 10))
+WATCHLIST_MAX_SIZE = int(os.getenv('WATCHLIST_MAX_SIZE', 10000))
+WATCHLIST_SUBSCRIBER_QUEUE = int(os.getenv('WATCHLIST_SUBSCRIBER_QUEUE', 100))
+
+TRACKED_FIELDS = ('balance', 'bandwidth', 'energy')
+
+
+class WatchlistFull(Exception):
+    pass
+
+
+class Watchlist:
+    """
+    Список отслеживаемых кошельков с фоновым обновлением и рассылкой изменений подписчикам
+    """
+
+    def __init__(self,
+                 interval: float = WATCHLIST_INTERVAL,
+                 batch_size: int = WATCHLIST_BATCH_SIZE,
+                 concurrency: int = WATCHLIST_CONCURRENCY,
+                 maxsize: int = WATCHLIST_MAX_SIZE,
+                 ):
+        self.interval: float = interval
+        self.batch_size: int = batch_size
+        self.concurrency: int = concurrency
+        self.maxsize: int = maxsize
+        self.refreshes: int = 0
+        self.changes: int = 0
+        self.errors: int = 0
+        self._snapshots: Dict[str, Optional[Dict[str, Any]]] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._task: Optional[asyncio.Task] = None
+
+    @property
+    def addresses(self) -> List[str]:
+        return list(self._snapshots)
+
+    def add(self, address: str) -> None:
+        if address not in self._snapshots and len(self._snapshots) >= self.maxsize:
+            raise WatchlistFull("Watchlist is full")
+        self._snapshots.setdefault(address, None)
+
+    def remove(self, address: str) -> bool:
+        return self._snapshots.pop(address, False) is not False
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=WATCHLIST_SUBSCRIBER_QUEUE)
+        self._subscribers.add(queue)
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                # медленный подписчик теряет самые старые события
+                queue.get_nowait()
+            queue.put_nowait(event)
+
+    async def start(self, fetch: Callable[[str], Awaitable[Dict[str, Any]]]) -> None:
+        """
+        Функция запуска фонового обновления отслеживаемых кошельков
+
+        :param fetch: Функция получения ТРОН-аккаунта по адресу
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(fetch))
+
+    async def stop(self) -> None:
+        """
+        Функция остановки фонового обновления
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, fetch: Callable[[str], Awaitable[Dict[str, Any]]]) -> None:
+        while True:
+            try:
+                await self.refresh(fetch)
+            except Exception as e:
+                logging.error(f"Watchlist refresh failed: {e}")
+            await asyncio.sleep(self.interval)
+
+    async def refresh(self, fetch: Callable[[str], Awaitable[Dict[str, Any]]]) -> int:
+        """
+        Функция обновления всех отслеживаемых кошельков пакетами
+
+        :param fetch: Функция получения ТРОН-аккаунта по адресу
+        :return: Количество изменившихся кошельков
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch_one(address: str) -> Optional[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    return await fetch(address)
+                except Exception:
+                    self.errors += 1
+                    return None
+
+        addresses = self.addresses
+        changed = 0
+        for start in range(0, len(addresses), self.batch_size):
+            batch = addresses[start:start + self.batch_size]
+            accounts = await asyncio.gather(*[fetch_one(address) for address in batch])
+            updates = []
+            for address, account in zip(batch, accounts):
+                if account is None or address not in self._snapshots:
+                    continue
+                snapshot = HistoryService.to_history_dict(account)
+                previous = self._snapshots[address]
+                if previous is not None and all(previous[field] == snapshot[field] for field in TRACKED_FIELDS):
+                    continue
+                self._snapshots[address] = snapshot
+                updates.append((account, snapshot, previous))
+
+            # история пишется только при изменении значений
+            if updates:
+                await HistoryService(HistoryRepo).add_history_many([account for account, _, _ in updates])
+            for _, snapshot, previous in updates:
+                self.publish({**snapshot, 'previous': previous})
+            changed += len(updates)
+
+        self.refreshes += 1
+        self.changes += changed
+        return changed
+
+    def stats(self) -> Dict[str, Any]:
+        return {'addresses': len(self._snapshots),
+                'subscribers': len(self._subscribers),
+                'refreshes': self.refreshes,
+                'changes': self.changes,
+                'errors': self.errors,
+                }
+
+
+watchlist = Watchlist()
@@ -101,3 +101,48 @@ async def history_test_data():
                                 balance=987.65
                                 )
     return history_data
+
+
+class FakeTronClient:
+    """
+    Класс-заглушка ТРОН-клиента
+    """
+
+    def __init__(self, accounts: Dict[str, Any]):
+        self.accounts = accounts
+        self.calls = 0
+
+    async def get_account(self, address: str) -> Dict[str, Any]:
+        self.calls += 1
+        account = self.accounts.get(address)
+        if isinstance(account, Exception):
+            raise account
+        return account
+
+    async def get_account_resource(self, address: str) -> Dict[str, Any]:
+        return {"freeNetLimit": 600, "freeNetUsed": 550, "EnergyLimit": 30, "EnergyUsed": 10}
+
+    async def get_bandwidth(self, address: str) -> int:
+        return 50
+
+
+@pytest_asyncio.fixture
+async def fake_tron_client():
+    """
+    Функция-фикстура подмены общего ТРОН-клиента
+    """
+    from src.main import app
+    from src.tron.cache import account_cache
+    from src.tron.nodes import get_tron_client
+
+    client = FakeTronClient({
+        "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL": {"address": "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL",
+                                               "balance": 1_000_000_000},
+        "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm": {},
+        "TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL": RuntimeError("node is down"),
+    })
+    app.dependency_overrides[get_tron_client] = lambda: client
+    account_cache.backend.clear()
+    yield client
+    app.dependency_overrides.pop(get_tron_client, None)
+    account_cache.backend.clear()
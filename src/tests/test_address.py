@@ -0,0 +1,27 @@
+from src.tron.address import normalize_address, to_hex_address
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+def test_normalize_base58_and_hex():
+    """
+    Тест приведения адресов base58check и hex к base58check
+    """
+    hex_address = to_hex_address(ADDRESS)
+
+    # проверка
+    assert hex_address.startswith("41")
+    assert normalize_address(ADDRESS) == ADDRESS
+    assert normalize_address(f"  {ADDRESS} ") == ADDRESS
+    assert normalize_address(hex_address) == ADDRESS
+    assert normalize_address("0x" + hex_address[2:]) == ADDRESS
+
+
+def test_normalize_invalid():
+    """
+    Тест отклонения некорректных адресов
+    """
+    assert normalize_address("invalid") is None
+    assert normalize_address(ADDRESS[:-1] + "X") is None
+    assert normalize_address("42" + "00" * 20) is None
+    assert normalize_address("41" + "zz" * 20) is None
@@ -0,0 +1,200 @@
+import json
+import pytest
+from datetime import datetime
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.migrations.history_rollup import rebuild
+from src.repositories.history import HistoryRollupRepo, HistoryTokenBalanceRepo, LegacyHistoryRepo
+from src.services.archive import HistoryArchive, history_archive
+from src.utils.segments import read_columns, read_header, write_segment
+
+ADDRESS = "TTBjjVvciWknH6atMfsTKdTUrcKvT3iPHA"
+OLD_ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+CONTRACT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+NOW = datetime(1999, 3, 15)
+
+
+async def add_old_history() -> list:
+    """
+    Функция добавления строк истории 1999 года: три старше срока хранения (30 дней) и одна новее
+    """
+    history_ids = await LegacyHistoryRepo().add_many([
+        {"address": ADDRESS, "balance": 1.5, "bandwidth": 10.0, "energy": None, "timestamp": datetime(1999, 1, 31, 23)},
+        {"address": ADDRESS, "balance": 2.5, "bandwidth": 20.0, "energy": 5.0, "timestamp": datetime(1999, 2, 1, 1)},
+        {"address": ADDRESS, "balance": None, "bandwidth": 30.0, "energy": 6.0, "timestamp": datetime(1999, 2, 2)},
+        {"address": ADDRESS, "balance": 4.0, "bandwidth": 40.0, "energy": 7.0, "timestamp": datetime(1999, 3, 1)},
+    ])
+    await HistoryTokenBalanceRepo().add_many([{"history_id": history_ids[1], "contract": CONTRACT, "symbol": "USDT",
+                                               "decimals": 6, "balance_raw": "1500000"}])
+    return history_ids
+
+
+def test_segment_roundtrip(tmp_path):
+    """
+    Тест записи и чтения колоночного сегмента: NULL, отрицательные дельты, словарные столбцы, запрет перезаписи
+    """
+    path = str(tmp_path / "test.seg")
+    kinds = {"id": "int", "value": "float", "name": "dict"}
+    columns = {"id": [5, 3, 900000000000], "value": [1.25, None, -2.0], "name": ["a", None, "a"]}
+
+    size = write_segment(path, kinds, columns, {"note": "test"})
+
+    # проверка
+    header = read_header(path)
+    assert (header["rows"], header["meta"], size) == (3, {"note": "test"}, (tmp_path / "test.seg").stat().st_size)
+    assert read_columns(path, ["name", "id"]) == {"name": ["a", None, "a"], "id": [5, 3, 900000000000]}
+    assert read_columns(path, ["value"])["value"] == [1.25, None, -2.0]
+    with pytest.raises(FileExistsError):
+        write_segment(path, kinds, columns)
+
+
+@pytest.mark.asyncio
+async def test_history_archive(clean_db, tmp_path, monkeypatch):
+    """
+    Тест переноса старых строк в архив: сегменты по месяцам, удаление из таблицы вместе с балансами токенов,
+    счетчики и сводки, выгрузка архивных строк и пересчет сводок с учетом архива
+    """
+    monkeypatch.setattr(history_archive, "directory", str(tmp_path))
+    archive = HistoryArchive(LegacyHistoryRepo, directory=str(tmp_path), retention_days=30, batch_size=2,
+                             token_repository=HistoryTokenBalanceRepo)
+    rollups = HistoryRollupRepo()
+    history_ids = await add_old_history()
+    await LegacyHistoryRepo().add_one({"address": OLD_ADDRESS, "balance": 0.5, "timestamp": datetime(1999, 1, 2)})
+    total, generation = await rollups.total(), await rollups.generation()
+
+    result = await archive.archive(now=NOW)
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        exported = await ac.get("/logs/export/", params={"address": ADDRESS, "until": "1999-04-01T00:00:00"})
+        hot_only = await ac.get("/logs/export/", params={"address": ADDRESS, "archive": "false"})
+        # 03:00+02:00 - это 01:00 UTC: вторая строка входит в выгрузку, граница "Z" отсекает строку 1 марта
+        zoned = await ac.get("/logs/export/", params={"address": ADDRESS, "since": "1999-02-01T03:00:00+02:00",
+                                                      "until": "1999-03-01T00:00:00Z"})
+        stats = await ac.get("/stats/history-archive/")
+
+    # проверка
+    assert result == {"archived": 4, "segments": 2}
+    assert archive.periods() == ["1999-01", "1999-02"]
+    assert await LegacyHistoryRepo().count_existing(history_ids) == 1
+    assert await HistoryTokenBalanceRepo().get_by_histories(history_ids, ["history_id"]) == []
+    tokens = list((tmp_path / "history_token_balance" / "1999-02").glob("*.seg"))
+    assert read_columns(str(tokens[0]), ["history_id", "balance_raw"]) == {"history_id": [history_ids[1]],
+                                                                           "balance_raw": ["1500000"]}
+    assert (await rollups.total(), await rollups.generation()) == (total - 4, generation + 4)
+    assert (await rollups.get_address_stats(ADDRESS, NOW))["lookups"] == 4
+
+    rows = [json.loads(line) for line in exported.text.splitlines()]
+    assert [(row["id"], row["balance"], row["energy"], row["timestamp"]) for row in rows] == [
+        (history_ids[0], 1.5, None, "1999-01-31T23:00:00"),
+        (history_ids[1], 2.5, 5.0, "1999-02-01T01:00:00"),
+        (history_ids[2], None, 6.0, "1999-02-02T00:00:00"),
+        (history_ids[3], 4.0, 7.0, "1999-03-01T00:00:00"),
+    ]
+    assert [json.loads(line)["id"] for line in hot_only.text.splitlines()] == [history_ids[3]]
+    assert zoned.status_code == 200
+    assert [json.loads(line)["id"] for line in zoned.text.splitlines()] == history_ids[1:3]
+    assert (stats.json()["rows"], stats.json()["segments"], stats.json()["periods"]) == (4, 2, ["1999-01", "1999-02"])
+
+    february = [row async for rows in archive.stream(("id",), since=datetime(1999, 2, 1, 12)) for row in rows]
+    assert february == [(history_ids[2],)]
+    result = await rebuild(chunk_size=1)
+    assert (await rollups.get_address_stats(ADDRESS, NOW))["lookups"] == 4
+    assert await rollups.total() == total - 4
+    assert result["rows"] == total - 4
+    # у адреса OLD_ADDRESS все строки в архиве - сводка сохраняется после пересчета
+    old_stats = await rollups.get_address_stats(OLD_ADDRESS, NOW)
+    assert (old_stats["lookups"], old_stats["first_seen"]) == (1, datetime(1999, 1, 2))
+
+
+@pytest.mark.asyncio
+async def test_history_archive_recovery(clean_db, tmp_path, monkeypatch):
+    """
+    Тест восстановления после сбоя между записью сегмента и удалением строк (и после удаления):
+    строки не теряются и не дублируются
+    """
+    archive = HistoryArchive(LegacyHistoryRepo, directory=str(tmp_path), retention_days=30)
+    history_ids = await add_old_history()
+
+    async def failing_delete(ids):
+        raise RuntimeError("database is down")
+
+    monkeypatch.setattr(archive.history_repository, "delete_many", failing_delete)
+    with pytest.raises(RuntimeError):
+        await archive.archive(now=NOW)
+    before_delete = (archive.stats()["rows"], len(list(tmp_path.glob("history/*/*.pending"))))
+    monkeypatch.undo()
+
+    def failing_commit(pending):
+        raise OSError("disk is full")
+
+    monkeypatch.setattr(HistoryArchive, "_commit", staticmethod(failing_commit))
+    with pytest.raises(OSError):
+        await archive.archive(now=NOW)
+    after_delete = (archive.stats()["rows"], await LegacyHistoryRepo().count_existing(history_ids))
+    monkeypatch.undo()
+    result = await archive.archive(now=NOW)
+
+    # проверка
+    assert before_delete == (0, 2)
+    assert after_delete == (0, 1)
+    assert result["archived"] == 0
+    assert archive.stats()["rows"] == 3
+    assert list(tmp_path.glob("history/*/*.pending")) == []
+
+
+@pytest.mark.asyncio
+async def test_history_archive_stream_groups(clean_db, tmp_path):
+    """
+    Тест потокового чтения архива: сегменты с непересекающимися периодами читаются по одному,
+    строка с задержанной меткой времени из следующего переноса сливается по (timestamp, id)
+    """
+    archive = HistoryArchive(LegacyHistoryRepo, directory=str(tmp_path), retention_days=30, batch_size=3)
+    history_ids = await add_old_history()
+    await archive.archive(now=NOW, vacuum=False)
+    late_ids = []
+    for timestamp in (datetime(1999, 2, 1, 12), datetime(1999, 2, 3)):
+        late_ids += await LegacyHistoryRepo().add_many([{"address": ADDRESS, "balance": 3.0, "bandwidth": 25.0,
+                                                         "energy": None, "timestamp": timestamp}])
+        await archive.archive(now=NOW, vacuum=False)
+
+    # проверка: первый сегмент февраля (1 - 2 февраля) сливается с опоздавшей строкой, 3 февраля - отдельно
+    assert [len(paths) for paths in archive._plan("1999-02", None, None)] == [2, 1]
+    rows = [row async for rows in archive.stream(("timestamp", "id"), chunk_size=2) for row in rows]
+    assert [row[1] for row in rows] == [history_ids[0], history_ids[1], late_ids[0], history_ids[2], late_ids[1]]
+    assert rows[2][0] == datetime(1999, 2, 1, 12)
+
+
+@pytest.mark.asyncio
+async def test_history_archive_commit_crash(clean_db, tmp_path, monkeypatch):
+    """
+    Тест сбоя при подтверждении сегментов: сегмент балансов токенов подтверждается раньше сегмента истории
+    и не теряется при восстановлении (в том числе оставшийся без сегмента истории)
+    """
+    archive = HistoryArchive(LegacyHistoryRepo, directory=str(tmp_path), retention_days=30,
+                             token_repository=HistoryTokenBalanceRepo)
+    history_ids = await add_old_history()
+    commit = HistoryArchive._commit
+
+    def failing_commit(pending):
+        commit(pending[:1])
+        raise OSError("disk is full")
+
+    monkeypatch.setattr(HistoryArchive, "_commit", staticmethod(failing_commit))
+    with pytest.raises(OSError):
+        await archive.archive(now=NOW)
+    monkeypatch.undo()
+    crashed = sorted(path.name.rsplit(".", 1)[-1] for path in tmp_path.glob("*/*/*") if path.is_file())
+    await archive.archive(now=NOW)
+    (token_segment,) = tmp_path.glob("history_token_balance/*/*.seg")
+    # сегмент балансов, оставшийся неподтвержденным после сбоя прежней версии
+    token_segment.rename(f"{token_segment}.pending")
+    await archive.archive(now=NOW)
+
+    # проверка
+    assert crashed == ["pending", "pending", "seg"]
+    assert await LegacyHistoryRepo().count_existing(history_ids) == 1
+    assert archive.stats()["rows"] == 3
+    assert list(tmp_path.glob("*/*/*.pending")) == []
+    assert read_columns(str(token_segment), ["history_id"]) == {"history_id": [history_ids[1]]}
@@ -0,0 +1,39 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.compare import compare
+from benchmarks.loadgen import Scenario, run_scenario
+from src.main import app
+
+
+@pytest.mark.asyncio
+async def test_loadgen_scenario(clean_db):
+    """
+    Тест генератора нагрузки: количество запросов, ошибки по кодам и перцентили задержек
+    """
+    scenario = Scenario("logs", lambda i: ("GET", "/logs/?per_page=5" if i % 2 else "/logs/?cursor=bad", None))
+
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        result = await run_scenario(ac, scenario, concurrency=4, requests=20)
+
+    # проверка
+    assert result["requests"] == 20
+    assert result["errors_by_status"] == {"400": 10}
+    assert result["rps"] > 0
+    assert result["p50_ms"] <= result["p95_ms"] <= result["p99_ms"]
+
+
+def test_benchmark_compare_regressions():
+    """
+    Тест сравнения результатов: ухудшение сверх порога считается регрессией
+    """
+    base = {("logs", 10): {"rps": 100.0, "p50_ms": 10.0, "p95_ms": 20.0, "p99_ms": 30.0}}
+    new = {("logs", 10): {"rps": 95.0, "p50_ms": 10.0, "p95_ms": 30.0, "p99_ms": 31.0}}
+
+    lines, regressions = compare(base, new, threshold=10.0)
+
+    # проверка
+    assert len(lines) == 2
+    assert regressions == ["logs x10: p95_ms +50.0%"]
@@ -0,0 +1,63 @@
+import asyncio
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from benchmarks.stub_node import StubTronNode
+from src.main import app
+from src.tron.blocks import BlockTracker, block_tracker
+from src.tron.nodes import TronNodePool
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+async def wait_for_block(tracker: BlockTracker, number: int, timeout: float = 5.0):
+    """
+    Функция ожидания появления блока с указанным номером
+    """
+    deadline = asyncio.get_running_loop().time() + timeout
+    while tracker.current() != number and asyncio.get_running_loop().time() < deadline:
+        await asyncio.sleep(0.01)
+    return tracker.current()
+
+
+@pytest.mark.asyncio
+async def test_block_tracker_polls_latest_block():
+    """
+    Тест фонового отслеживания номера последнего блока
+    """
+    with StubTronNode(block_number=5) as node:
+        nodes = TronNodePool([node.uri])
+        tracker = BlockTracker(interval=0.01)
+        await tracker.start(nodes)
+        first = await wait_for_block(tracker, 5)
+        node.block_number = 6
+        second = await wait_for_block(tracker, 6)
+        await tracker.stop()
+        await nodes.close()
+
+    # проверка
+    assert first == 5
+    assert second == 6
+
+
+@pytest.mark.asyncio
+async def test_account_cache_keyed_by_block(clean_db, fake_tron_client):
+    """
+    Тест кэширования аккаунта до появления следующего блока
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        block_tracker.update(100)
+        await ac.post("/address/", json={"address": ADDRESS})
+        await ac.post("/address/", json={"address": ADDRESS})
+        calls_same_block = fake_tron_client.calls
+        block_tracker.update(101)
+        await ac.post("/address/", json={"address": ADDRESS})
+        stats = (await ac.get("/stats/cache/")).json()
+    block_tracker.latest = None
+
+    # проверка
+    assert calls_same_block == 1
+    assert fake_tron_client.calls == 2
+    assert stats["block"] == 101
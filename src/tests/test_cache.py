@@ -0,0 +1,235 @@
+import math
+import pickle
+import asyncio
+import sqlite3
+import multiprocessing
+import pytest
+from decimal import Decimal
+
+from src.utils.cache import SharedSQLiteCache, SingleFlightCache, TTLCache
+
+
+def test_ttl_cache_expiry_and_lru():
+    """
+    Тест истечения времени жизни и вытеснения LRU
+    """
+    cache = TTLCache(maxsize=2, ttl=60)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")
+    cache.set("c", 3)
+
+    # проверка вытеснения самой старой записи
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    assert cache.evictions == 1
+
+    # проверка истечения времени жизни
+    expired = TTLCache(maxsize=2, ttl=-1)
+    expired.set("a", 1)
+    assert expired.get("a") is None
+
+
+@pytest.mark.asyncio
+async def test_single_flight_coalescing():
+    """
+    Тест объединения одновременных промахов в один вызов
+    """
+    cache = SingleFlightCache(TTLCache(maxsize=10, ttl=60))
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return {"balance": 1}
+
+    results = await asyncio.gather(*[cache.get_or_load("addr", loader) for _ in range(5)])
+    await cache.get_or_load("addr", loader)
+
+    # проверка
+    assert calls == 1
+    assert all(result == {"balance": 1} for result in results)
+    stats = await cache.stats()
+    assert stats["misses"] == 1
+    assert stats["coalesced"] == 4
+    assert stats["hits"] == 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_error_not_cached():
+    """
+    Тест отсутствия кэширования ошибок загрузчика
+    """
+    cache = SingleFlightCache(TTLCache(maxsize=10, ttl=60))
+
+    async def loader():
+        raise ValueError("upstream")
+
+    with pytest.raises(ValueError):
+        await cache.get_or_load("addr", loader)
+
+    # проверка
+    assert len(cache.backend) == 0
+    assert (await cache.stats())["in_flight"] == 0
+
+
+def _write_from_worker(path: str) -> None:
+    SharedSQLiteCache(path, "account", maxsize=10, ttl=60).set((1, "addr"), {"balance": Decimal("1.5")})
+
+
+def test_shared_cache_across_processes(tmp_path):
+    """
+    Тест общего кэша: запись другого процесса видна, время жизни, разделы и ограничение размера
+    """
+    path = str(tmp_path / "cache.db")
+    cache = SharedSQLiteCache(path, "account", maxsize=10, ttl=60)
+    cache.set("warm", 1)
+
+    worker = multiprocessing.get_context("fork").Process(target=_write_from_worker, args=(path,))
+    worker.start()
+    worker.join(10)
+
+    # проверка
+    assert worker.exitcode == 0
+    assert cache.get((1, "addr")) == {"balance": Decimal("1.5")}
+    assert SharedSQLiteCache(path, "other", maxsize=10, ttl=60).get((1, "addr")) is None
+
+    cache.set("expired", 1, ttl=-1)
+    cache.set("forever", 1, ttl=math.inf)
+    assert cache.get("expired") is None and cache.get("forever") == 1
+
+    for i in range(20):
+        cache.set(i, i)
+    cache.prune()
+    assert len(cache) == 10
+    assert cache.get("forever") == 1
+    assert cache.evictions > 0
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_single_load_across_workers(tmp_path):
+    """
+    Тест аренды загрузки: одновременные промахи двух "воркеров" приводят к одному вызову загрузчика
+    """
+    path = str(tmp_path / "cache.db")
+    workers = [SingleFlightCache(SharedSQLiteCache(path, "account", maxsize=10, ttl=60)) for _ in range(2)]
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.05)
+        return {"balance": 1}
+
+    results = await asyncio.gather(*[worker.get_or_load("addr", loader) for worker in workers])
+    await workers[1].get_or_load("addr", loader)
+
+    # проверка
+    assert calls == 1
+    assert results == [{"balance": 1}, {"balance": 1}]
+    assert sum([(await worker.stats())["waited"] for worker in workers]) == 1
+    assert (await workers[1].stats())["hits"] == 1
+    # ожидание загрузки другим процессом - промах, а не попадание
+    assert (await workers[1].stats())["hit_ratio"] == 0.5
+    assert (await workers[0].stats())["size"] == 1
+
+
+class RacingLeaseCache(TTLCache):
+    """
+    Хранилище, в котором другой процесс записывает значение и снимает аренду между промахом и получением аренды
+    """
+
+    def __init__(self, lease: bool):
+        super().__init__(maxsize=10, ttl=60)
+        self.lease = lease
+        self.released = 0
+
+    def acquire_lease(self, key, ttl):
+        if self.lease:
+            self.set(key, {"balance": 2})
+        return self.lease
+
+    def release_lease(self, key):
+        self.released += 1
+
+
+@pytest.mark.asyncio
+async def test_single_flight_lease_edge_cases():
+    """
+    Тест аренды: повторная проверка кэша после получения аренды, загрузка без аренды по истечении ожидания
+    не снимает чужую аренду
+    """
+    calls = 0
+
+    async def loader():
+        nonlocal calls
+        calls += 1
+        return {"balance": 1}
+
+    raced = SingleFlightCache(RacingLeaseCache(lease=True))
+    timed_out = SingleFlightCache(RacingLeaseCache(lease=False), lease_timeout=0.02)
+
+    # проверка
+    assert await raced.get_or_load("addr", loader) == {"balance": 2}
+    assert (calls, raced.backend.released) == (0, 1)
+    assert await timed_out.get_or_load("addr", loader) == {"balance": 1}
+    assert (calls, timed_out.backend.released) == (1, 0)
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_busy_does_not_block(tmp_path):
+    """
+    Тест занятого другим процессом файла кэша: промах и загрузка без ожидания блокировки,
+    цикл событий не блокируется
+    """
+    path = str(tmp_path / "cache.db")
+    cache = SingleFlightCache(SharedSQLiteCache(path, "account", maxsize=10, ttl=60, busy_timeout=0.2))
+    await cache.get_or_load("warm", lambda: asyncio.sleep(0, {"balance": 0}))
+    writer = sqlite3.connect(path, isolation_level=None)
+    writer.execute("BEGIN IMMEDIATE")
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            await asyncio.sleep(0.01)
+            ticks += 1
+
+    ticking = asyncio.create_task(ticker())
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    value = await cache.get_or_load("addr", lambda: asyncio.sleep(0, {"balance": 1}))
+    elapsed = loop.time() - started
+    ticking.cancel()
+    writer.execute("ROLLBACK")
+    writer.close()
+
+    # проверка: аренда и запись пропущены после busy_timeout, цикл событий продолжал работать
+    assert value == {"balance": 1}
+    assert elapsed < 1.0
+    assert ticks >= elapsed / 0.01 / 2
+    assert (await cache.stats())["busy"] == 2
+    assert cache.backend.get("addr") is None
+
+
+@pytest.mark.asyncio
+async def test_shared_cache_json_values(tmp_path):
+    """
+    Тест формата значений общего кэша: JSON с Decimal, запись в формате pickle не исполняется и считается промахом,
+    недоступный файл не ломает счетчики
+    """
+    path = str(tmp_path / "cache.db")
+    cache = SharedSQLiteCache(path, "account", maxsize=10, ttl=60)
+    value = {"balance": 1.5, "tokens": [{"balance": Decimal("12.345678"), "balance_raw": "12345678"}], "energy": None}
+    cache.set("addr", value)
+    cache.connection.execute("INSERT INTO cache (namespace, key, expires_at, value) VALUES (?, ?, ?, ?)",
+                             ("account", repr("pickled"), math.inf, pickle.dumps({"balance": 1})))
+    unavailable = SingleFlightCache(SharedSQLiteCache(str(tmp_path), "account", maxsize=10, ttl=60))
+
+    # проверка
+    assert cache.get("addr") == value
+    assert cache.get("pickled") is None
+    stats = await unavailable.stats()
+    assert (stats["size"], stats["busy"]) == (0, 1)
+    assert unavailable.backend.get("addr") is None
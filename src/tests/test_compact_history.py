@@ -0,0 +1,67 @@
+import pytest
+from sqlalchemy import select
+
+from src.database import async_session
+from src.migrations.compact_history import migrate
+from src.models.history import CompactHistoryModel
+from src.repositories.history import CompactHistoryRepo, LegacyHistoryRepo
+from src.tron.address import from_raw_address
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+OTHER_ADDRESS = "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm"
+
+
+@pytest.mark.asyncio
+async def test_compact_history_migration(clean_db):
+    """
+    Тест переноса истории в компактное хранилище: id и значения сохраняются, некорректные адреса пропускаются
+    """
+    ids = await LegacyHistoryRepo().add_many([
+        {"address": ADDRESS, "balance": 1234.567891, "bandwidth": 600.0, "energy": 20.0},
+        {"address": OTHER_ADDRESS, "balance": 0.0, "bandwidth": 0.0, "energy": 0.0},
+        {"address": "not_an_address", "balance": 1.0, "bandwidth": 1.0, "energy": 1.0},
+    ])
+
+    result = await migrate(batch_size=2)
+    again = await migrate(batch_size=2)
+
+    # проверка
+    assert result["skipped"] >= 1
+    assert again["migrated"] == 0
+    async with async_session() as session:
+        rows = {row.id: row for row in (await session.execute(
+            select(CompactHistoryModel).where(CompactHistoryModel.id.in_(ids)))).scalars()}
+    assert set(rows) == set(ids[:2])
+    assert rows[ids[0]].balance_sun == 1_234_567_891
+    assert rows[ids[0]].bandwidth == 600
+    assert from_raw_address(rows[ids[0]].address_ref.raw) == ADDRESS
+    assert rows[ids[0]].address_id != rows[ids[1]].address_id
+
+
+@pytest.mark.asyncio
+async def test_compact_history_repository(clean_db):
+    """
+    Тест компактного хранилища: точный баланс в sun, ответ в прежнем формате, выборка по адресу и выгрузка
+    """
+    repository = CompactHistoryRepo()
+    history_id, history = await repository.add_one_returning(
+        {"address": ADDRESS, "balance": 9007199254.740993, "balance_sun": 9_007_199_254_740_993,
+         "bandwidth": 50, "energy": 20})
+    await repository.add_many([{"address": OTHER_ADDRESS, "balance": 1.5, "bandwidth": 1, "energy": 2},
+                               {"address": ADDRESS, "balance": 2.0, "bandwidth": 3, "energy": 4}])
+
+    # проверка
+    assert history.address == ADDRESS and history.timestamp is not None
+    async with async_session() as session:
+        row = await session.get(CompactHistoryModel, history_id)
+    assert row.balance_sun == 9_007_199_254_740_993
+
+    logs, _ = await repository.get_by_address(ADDRESS, per_page=10)
+    assert [log.balance for log in logs[:2]] == [2.0, 9007199254.740993]
+    assert all(log.address == ADDRESS for log in logs)
+    assert (await repository.get_one(history_id)).bandwidth == 50.0
+    assert await repository.get_by_address("TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL", per_page=10) == ([], None)
+
+    exported = [row async for rows in repository.stream_all(("id", "address", "balance"), address=OTHER_ADDRESS)
+                for row in rows]
+    assert exported[-1][1:] == (OTHER_ADDRESS, 1.5)
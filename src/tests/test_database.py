@@ -1,14 +1,18 @@
 import pytest
 from unittest.mock import patch
 from fastapi.testclient import TestClient
-from sqlalchemy import select, delete
+from sqlalchemy import select, delete, text
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.exc import OperationalError
+from datetime import datetime
 from typing import Any, Dict
 
+from src.database import engine, SQLITE_BUSY_TIMEOUT_MS
 from src.main import app
 from src.models.history import HistoryModel
 from src.repositories.history import HistoryRepo
 from src.services.history import HistoryService
+from src.services.history_writer import HistoryWriteBuffer
 
 
 @pytest.mark.asyncio
@@ -103,6 +107,23 @@ async def test_history_service(clean_db, mock_account_data):
     assert result.energy == 20.0
 
 
+@pytest.mark.asyncio
+async def test_history_service_returning(clean_db, mock_account_data):
+    """
+    Тест записи истории с возвратом сохраненной строки (включая серверную метку времени)
+    """
+
+    # добавление данных в БД
+    result = await HistoryService(HistoryRepo).add_history_returning(mock_account_data)
+
+    # проверка
+    assert isinstance(result["timestamp"], datetime)
+    assert result["address"] == "full_fields_address"
+    assert result["balance"] == 1000.0
+    assert result["bandwidth"] == 50.0
+    assert result["energy"] == 20.0
+
+
 #TODO
 # разобраться с моканьтем и включить тест
 @pytest.mark.asyncio
@@ -153,3 +174,114 @@ async def _test_db_save_with_real_flow(test_db_session: AsyncSession, clean_db):
         assert result.balance == 1000.0
 
     # app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_history_service_many(clean_db, mock_account_data):
+    """
+    Тест пакетной записи истории одним запросом
+    """
+
+    # добавление данных в БД
+    history_ids = await HistoryService(HistoryRepo).add_history_many([mock_account_data] * 3)
+
+    # проверка
+    assert len(history_ids) == 3
+    assert history_ids == sorted(history_ids)
+    result = await HistoryService(HistoryRepo).get_history_one(history_ids[-1])
+    assert result.address == "full_fields_address"
+    assert result.bandwidth == 50.0
+
+
+@pytest.mark.asyncio
+async def test_history_write_behind(clean_db, mock_account_data):
+    """
+    Тест отложенной пакетной записи истории
+    """
+    writer = HistoryWriteBuffer(HistoryRepo, batch_size=2, flush_interval_ms=10, maxsize=3)
+    await writer.start()
+
+    # постановка строк в очередь
+    for _ in range(5):
+        await writer.put(HistoryService.to_history_dict(mock_account_data))
+    await writer.stop()
+
+    # проверка
+    stats = writer.stats()
+    assert not stats["running"]
+    assert stats["flushed"] == 5
+    assert stats["failed"] == 0
+    assert stats["flushes"] >= 3
+
+
+@pytest.mark.asyncio
+async def test_history_write_behind_retry(clean_db, mock_account_data, monkeypatch):
+    """
+    Тест повтора записи пакета при ошибке БД: пакет записывается после временных ошибок
+    и отбрасывается после исчерпания повторов
+    """
+    writer = HistoryWriteBuffer(HistoryRepo, batch_size=10, flush_interval_ms=10, retries=2, backoff_ms=1)
+    add_many = writer.history_repository.add_many
+    errors = [OperationalError("INSERT", {}, Exception("database is locked"))] * 2
+
+    async def flaky_add_many(rows):
+        if errors:
+            raise errors.pop()
+        return await add_many(rows)
+
+    monkeypatch.setattr(writer.history_repository, "add_many", flaky_add_many)
+    await writer.start()
+    await writer.put(HistoryService.to_history_dict(mock_account_data))
+    await writer.stop()
+    recovered = writer.stats()
+
+    errors.extend([OperationalError("INSERT", {}, Exception("disk I/O error"))] * 3)
+    await writer.start()
+    await writer.put(HistoryService.to_history_dict(mock_account_data))
+    await writer.stop()
+
+    # проверка
+    assert (recovered["flushed"], recovered["retried"], recovered["failed"]) == (1, 2, 0)
+    assert (writer.stats()["flushed"], writer.stats()["retried"], writer.stats()["failed"]) == (1, 4, 1)
+    assert errors == []
+
+
+@pytest.mark.asyncio
+async def test_history_cursor_pagination(clean_db):
+    """
+    Тест keyset-пагинации по курсору при одинаковых метках времени
+    """
+    repo = HistoryRepo()
+    same_time = datetime(2020, 1, 1, 12, 0, 0)
+    await repo.add_many([{"address": "cursor_address", "balance": float(i), "timestamp": same_time}
+                         for i in range(5)])
+
+    # обход всех страниц по курсору
+    logs, cursor = await repo.get_all(1, 2)
+    pages = [logs]
+    while cursor is not None:
+        logs, cursor = await repo.get_all(1, 2, cursor)
+        pages.append(logs)
+    rows = [log for page in pages for log in page]
+
+    # проверка
+    timestamps = [row.timestamp for row in rows]
+    assert timestamps == sorted(timestamps, reverse=True)
+    balances = [row.balance for row in rows if row.address == "cursor_address"]
+    assert balances == [4.0, 3.0, 2.0, 1.0, 0.0]
+
+
+@pytest.mark.asyncio
+async def test_sqlite_pragmas():
+    """
+    Тест настройки SQLite-соединений пула (WAL, synchronous, busy_timeout)
+    """
+    async with engine.connect() as conn:
+        journal_mode = (await conn.execute(text("PRAGMA journal_mode"))).scalar_one()
+        synchronous = (await conn.execute(text("PRAGMA synchronous"))).scalar_one()
+        busy_timeout = (await conn.execute(text("PRAGMA busy_timeout"))).scalar_one()
+
+    # проверка
+    assert journal_mode == "wal"
+    assert synchronous == 1
+    assert busy_timeout == SQLITE_BUSY_TIMEOUT_MS
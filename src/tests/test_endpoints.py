@@ -1,3 +1,4 @@
+import json
 import pytest
 from unittest.mock import patch
 from fastapi.testclient import TestClient
@@ -9,6 +10,8 @@ from typing import Any, Dict
 from src.database import get_db_session
 from src.main import app
 from src.models.history import HistoryModel
+from src.schemas.address import AddressResponseSchema
+from src.schemas.history import HistoryResponseSchemas
 
 
 @pytest.fixture(scope="module")
@@ -143,3 +146,113 @@ async def _test_post_address(test_db_session: AsyncSession, clean_db):
         }
 
     app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_address_batch(clean_db, fake_tron_client):
+    """
+    Тест пакетного запроса с ошибками по отдельным адресам
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        response = await ac.post("/address/batch/", json={"addresses": ["TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL",
+                                                                         "invalid",
+                                                                         "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm",
+                                                                         "TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL"]})
+    assert response.status_code == 200
+    items = response.json()["items"]
+    assert items[0]["result"]["balance"] == 1000.0
+    assert items[0]["error"] is None
+    assert [item["error"]["type"] for item in items[1:]] == ["invalid", "not_found", "upstream"]
+
+
+@pytest.mark.asyncio
+async def test_get_logs_invalid_cursor(clean_db):
+    """
+    Тест передачи некорректного курсора
+    """
+    client = TestClient(app)
+    response = client.get("/logs/?cursor=broken")
+    assert response.status_code == 400
+    assert "Invalid cursor" in response.json()["detail"]
+
+
+@pytest.mark.asyncio
+async def test_invalid_address_offline(clean_db, fake_tron_client):
+    """
+    Тест отклонения неверного адреса без обращения к ТРОН-клиенту
+    """
+    client = TestClient(app)
+    response = client.post("/address/", json={"address": "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeX"})
+
+    assert response.status_code == 400
+    assert fake_tron_client.calls == 0
+
+
+@pytest.mark.asyncio
+async def test_export_logs(clean_db, fake_tron_client):
+    """
+    Тест потоковой выгрузки истории по адресу в NDJSON и CSV
+    """
+    address = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        await ac.post("/address/batch/", json={"addresses": [address, address]})
+        ndjson = await ac.get("/logs/export/", params={"address": address})
+        csv = await ac.get("/logs/export/", params={"address": address, "format": "csv"})
+
+    assert ndjson.status_code == 200
+    rows = [json.loads(line) for line in ndjson.text.splitlines()]
+    assert len(rows) >= 2
+    assert all(row["address"] == address for row in rows)
+    lines = csv.text.splitlines()
+    assert lines[0] == "id,address,balance,bandwidth,energy,timestamp"
+    assert len(lines) == len(rows) + 1
+
+
+@pytest.mark.asyncio
+async def test_address_history(clean_db, fake_tron_client):
+    """
+    Тест истории запросов одного адреса с пагинацией по курсору
+    """
+    address = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        await ac.post("/address/batch/", json={"addresses": [address] * 3})
+        first = (await ac.get(f"/address/{address}/history/", params={"per_page": 2})).json()
+        second = (await ac.get(f"/address/{address}/history/",
+                               params={"per_page": 2, "cursor": first["next_cursor"]})).json()
+        invalid = await ac.get("/address/invalid/history/")
+
+    assert len(first["logs"]) == 2
+    assert first["next_cursor"] is not None
+    assert len(second["logs"]) >= 1
+    assert all(log["address"] == address for log in first["logs"] + second["logs"])
+    assert invalid.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_post_address_snapshot(clean_db, fake_tron_client):
+    """
+    Тест снимка кошелька: баланс в TRX, доступные bandwidth и energy. Ответы, сериализованные без
+    response_model, совпадают с ответом схемы (все поля, в том числе tokens: null)
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        response = await ac.post("/address/", json={"address": "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"})
+        logs = await ac.get("/logs/", params={"per_page": 1})
+
+    assert response.status_code == 200
+    assert response.json() == {
+        "address": "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL",
+        "bandwidth": 50.0,
+        "energy": 20.0,
+        "balance": 1000.0,
+        "tokens": None,
+    }
+    assert response.json() == AddressResponseSchema.model_validate(response.json()).model_dump(mode="json")
+    assert logs.json() == HistoryResponseSchemas.model_validate(logs.json()).model_dump(mode="json")
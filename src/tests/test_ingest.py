@@ -0,0 +1,73 @@
+import json
+import pytest
+from sqlalchemy import func, select
+
+from src.database import async_session
+from src.ingest import ingest, read_checkpoint
+from src.models.history import HistoryModel
+from src.services.history import HistoryService
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+NOT_FOUND_ADDRESS = "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm"
+FAILING_ADDRESS = "TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL"
+
+
+async def count_history(address: str) -> int:
+    async with async_session() as session:
+        return (await session.execute(select(func.count()).filter(HistoryModel.address == address))).scalar()
+
+
+@pytest.mark.asyncio
+async def test_ingest_file(clean_db, fake_tron_client, tmp_path):
+    """
+    Тест загрузки адресов: запись пакетами, офлайн-проверка, повтор при сбое узла, итоги и контрольная точка
+    """
+    lines = [ADDRESS, "", "not_an_address", NOT_FOUND_ADDRESS, FAILING_ADDRESS, f"  {ADDRESS}  ", "# comment"]
+    checkpoint = str(tmp_path / "addresses.checkpoint")
+    before = await count_history(ADDRESS)
+
+    result = await ingest(lines, fake_tron_client, source="addresses.txt", concurrency=2, batch_size=2,
+                          checkpoint=checkpoint, retries=1, retry_backoff=0)
+    repeated = await ingest(lines, fake_tron_client, source="addresses.txt", checkpoint=checkpoint)
+
+    # проверка
+    assert (result["read"], result["written"], result["failed"], result["invalid"]) == (5, 2, 2, 1)
+    assert result["errors"] == {"404": 1, "500": 1}
+    assert await count_history(ADDRESS) == before + 2
+    with open(checkpoint) as f:
+        assert json.load(f) == {"source": "addresses.txt", "line": 7, "written": 2, "failed": 2, "invalid": 1}
+    # законченный вход при повторном запуске не загружается заново
+    assert (repeated["resumed_from"], repeated["read"], repeated["written"]) == (7, 0, 0)
+    with pytest.raises(ValueError):
+        read_checkpoint(checkpoint, "other.txt")
+
+
+@pytest.mark.asyncio
+async def test_ingest_resume_after_crash(clean_db, fake_tron_client, tmp_path, monkeypatch):
+    """
+    Тест возобновления загрузки после сбоя записи с последней контрольной точки
+    """
+    lines = [ADDRESS] * 5
+    checkpoint = str(tmp_path / "addresses.checkpoint")
+    before = await count_history(ADDRESS)
+    add_history_many = HistoryService.add_history_many
+    calls = []
+
+    async def failing(self, accounts):
+        calls.append(len(accounts))
+        if len(calls) == 2:
+            raise RuntimeError("database is down")
+        return await add_history_many(self, accounts)
+
+    monkeypatch.setattr(HistoryService, "add_history_many", failing)
+    with pytest.raises(RuntimeError):
+        await ingest(lines, fake_tron_client, concurrency=1, batch_size=2, checkpoint=checkpoint)
+    crashed = read_checkpoint(checkpoint, "-")
+    monkeypatch.setattr(HistoryService, "add_history_many", add_history_many)
+    resumed = await ingest(lines, fake_tron_client, concurrency=1, batch_size=2, checkpoint=checkpoint)
+
+    # проверка
+    assert (crashed["line"], crashed["written"]) == (2, 2)
+    assert (resumed["resumed_from"], resumed["written"]) == (2, 3)
+    assert read_checkpoint(checkpoint, "-")["written"] == 5
+    assert await count_history(ADDRESS) == before + 5
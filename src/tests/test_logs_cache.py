@@ -0,0 +1,110 @@
+import pytest
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.repositories.history import history_version
+from src.services.history import HistoryService, logs_page_cache
+from src.utils.responses import not_modified
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+@pytest.fixture
+def count_queries(monkeypatch):
+    """
+    Функция-фикстура подсчета запросов страниц истории к БД
+    """
+    calls = []
+    get_history_paginated = HistoryService.get_history_paginated
+
+    async def counted(self, history, cursor=None):
+        calls.append((history.page, history.per_page, cursor))
+        return await get_history_paginated(self, history, cursor)
+
+    monkeypatch.setattr(HistoryService, "get_history_paginated", counted)
+    logs_page_cache.clear()
+    history_version.invalidate()
+    yield calls
+    logs_page_cache.clear()
+
+
+@pytest.mark.asyncio
+async def test_logs_conditional_requests(clean_db, fake_tron_client, count_queries):
+    """
+    Тест ответа 304 на If-None-Match без запроса к БД и нового ETag после записи
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        first = await ac.get("/logs/?page=2&per_page=5")
+        etag = first.headers["etag"]
+        by_etag = await ac.get("/logs/?page=2&per_page=5", headers={"If-None-Match": f"W/{etag}, \"other\""})
+        await ac.post("/address/", json={"address": ADDRESS})
+        changed = await ac.get("/logs/?page=2&per_page=5", headers={"If-None-Match": etag})
+
+    # проверка
+    assert first.status_code == 200
+    assert first.headers["cache-control"] == "no-cache"
+    assert (by_etag.status_code, by_etag.content, by_etag.headers["etag"]) == (304, b"", etag)
+    assert changed.status_code == 200 and changed.headers["etag"] != etag
+    assert "last-modified" not in first.headers
+    assert len(count_queries) == 2
+
+
+@pytest.mark.asyncio
+async def test_logs_same_second_writes(clean_db, fake_tron_client, count_queries):
+    """
+    Тест двух записей в одну секунду: опрос после второй записи не получает 304 ни по ETag,
+    ни по If-Modified-Since (время изменения не используется для проверки)
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        await ac.post("/address/", json={"address": ADDRESS})
+        first = await ac.get("/logs/?per_page=5")
+        await ac.post("/address/", json={"address": ADDRESS})
+        since = format_datetime(datetime.now(timezone.utc) + timedelta(seconds=1), usegmt=True)
+        by_etag = await ac.get("/logs/?per_page=5", headers={"If-None-Match": first.headers["etag"]})
+        by_date = await ac.get("/logs/?per_page=5", headers={"If-Modified-Since": since})
+
+    # проверка
+    assert by_etag.status_code == 200 and by_etag.headers["etag"] != first.headers["etag"]
+    assert by_date.status_code == 200
+    assert by_date.json()["total"] == first.json()["total"] + 1
+
+
+@pytest.mark.asyncio
+async def test_logs_first_page_cache(clean_db, fake_tron_client, count_queries):
+    """
+    Тест кэша готовых первых страниц: повторный запрос без обращения к БД, сброс после записи
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        first = await ac.get("/logs/?per_page=3")
+        cached = await ac.get("/logs/?per_page=3")
+        await ac.get("/logs/?page=2&per_page=3")
+        await ac.post("/address/", json={"address": ADDRESS})
+        fresh = await ac.get("/logs/?per_page=3")
+
+    # проверка
+    assert cached.content == first.content
+    assert count_queries == [(1, 3, None), (2, 3, None), (1, 3, None)]
+    assert fresh.json()["logs"][0]["address"] == ADDRESS
+    assert fresh.json()["total"] == first.json()["total"] + 1
+
+
+def test_not_modified_validators():
+    """
+    Тест разбора заголовка If-None-Match
+    """
+
+    # проверка
+    assert not_modified({"if-none-match": '"7"'}, "7")
+    assert not_modified({"if-none-match": "*"}, "7")
+    assert not_modified({"if-none-match": 'W/"6", "7"'}, "7")
+    assert not not_modified({"if-none-match": '"6"', "if-modified-since": "Wed, 01 May 2024 12:00:00 GMT"}, "7")
+    assert not not_modified({"if-modified-since": "Wed, 01 May 2024 12:00:00 GMT"}, "7")
+    assert not not_modified({}, "7")
@@ -0,0 +1,59 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.utils.metrics import MetricsRegistry
+
+
+def test_metrics_render():
+    """
+    Тест вывода счетчика, измерителя и гистограммы в текстовом формате Prometheus
+    """
+    registry = MetricsRegistry()
+    requests = registry.counter("requests_total", "Requests", ("status",))
+    in_flight = registry.gauge("in_flight", "In flight")
+    latency = registry.histogram("latency_seconds", "Latency", ("stage",), buckets=(0.1, 1.0))
+
+    requests.inc(status="200")
+    requests.inc(2, status="200")
+    in_flight.inc()
+    latency.observe(0.05, stage="db")
+    latency.observe(0.5, stage="db")
+    with latency.time(stage="rpc"):
+        pass
+
+    text = registry.render()
+
+    # проверка
+    assert "# TYPE requests_total counter" in text
+    assert 'requests_total{status="200"} 3' in text
+    assert "in_flight 1" in text
+    assert 'latency_seconds_bucket{stage="db",le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{stage="db",le="1"} 2' in text
+    assert 'latency_seconds_bucket{stage="db",le="+Inf"} 2' in text
+    assert 'latency_seconds_count{stage="db"} 2' in text
+    assert latency.count(stage="rpc") == 1
+    with pytest.raises(ValueError):
+        registry.counter("requests_total", "Duplicate")
+
+
+@pytest.mark.asyncio
+async def test_metrics_endpoint(clean_db, fake_tron_client):
+    """
+    Тест эндпоинта "/metrics": задержки по этапам запроса "/address/" и ошибки сети Трон
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        await ac.post("/address/", json={"address": "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"})
+        response = await ac.get("/metrics")
+
+    # проверка
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    text = response.text
+    for stage in ("validate", "tron_rpc", "db_insert", "serialize"):
+        assert f'stage_duration_seconds_count{{stage="{stage}"}}' in text
+    assert 'http_requests_total{method="POST",route="/address/",status="200"}' in text
+    assert "http_requests_in_flight 1" in text
+    assert "db_session_commits_total" in text
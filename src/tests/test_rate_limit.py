@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+from src.utils.rate_limit import AdmissionController, Overloaded
+
+
+@pytest.mark.asyncio
+async def test_burst_then_queue():
+    """
+    Тест пропуска запросов в пределах burst и ожидания в очереди сверх него
+    """
+    controller = AdmissionController(rate=50, burst=2, max_queue=10, max_queue_per_client=10, max_wait=1.0)
+    loop = asyncio.get_running_loop()
+    started = loop.time()
+    await asyncio.gather(*[controller.acquire("client") for _ in range(4)])
+    elapsed = loop.time() - started
+
+    # проверка: 2 запроса сразу, еще 2 - по 1/50 сек.
+    assert controller.admitted == 4
+    assert elapsed >= 0.03
+
+
+@pytest.mark.asyncio
+async def test_rejections_with_retry_after():
+    """
+    Тест немедленного отклонения при заполненной очереди и превышении доли клиента
+    """
+    controller = AdmissionController(rate=1, burst=1, max_queue=2, max_queue_per_client=1, max_wait=5.0)
+    await controller.acquire("noisy")
+    waiting = asyncio.create_task(controller.acquire("noisy"))
+    await asyncio.sleep(0)
+
+    with pytest.raises(Overloaded) as per_client:
+        await controller.acquire("noisy")
+    other = asyncio.create_task(controller.acquire("quiet"))
+    await asyncio.sleep(0)
+    with pytest.raises(Overloaded) as queue_full:
+        await controller.acquire("third")
+
+    # проверка
+    assert per_client.value.status_code == 429
+    assert queue_full.value.status_code == 503
+    assert queue_full.value.retry_after >= 1
+    waiting.cancel()
+    other.cancel()
+
+
+@pytest.mark.asyncio
+async def test_fair_dispatch_and_deadline():
+    """
+    Тест поочередной выдачи токенов клиентам и отказа по истечении срока ожидания
+    """
+    controller = AdmissionController(rate=20, burst=1, max_queue=10, max_queue_per_client=10, max_wait=0.5)
+    await controller.acquire("noisy")
+    order = []
+
+    async def request(client_key):
+        await controller.acquire(client_key)
+        order.append(client_key)
+
+    noisy = [asyncio.create_task(request("noisy")) for _ in range(3)]
+    await asyncio.sleep(0)
+    quiet = asyncio.create_task(request("quiet"))
+    await asyncio.gather(*noisy, quiet)
+
+    # проверка: тихий клиент обслуживается вторым, а не после всех запросов шумного
+    assert order.index("quiet") == 1
+
+    slow = AdmissionController(rate=1, burst=1, max_queue=10, max_queue_per_client=10, max_wait=0.05)
+    await slow.acquire()
+    with pytest.raises(Overloaded) as timed_out:
+        await slow.acquire()
+    assert timed_out.value.status_code == 503
+    assert slow.stats()["queued"] == 0
@@ -0,0 +1,89 @@
+import uuid
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy import func, select
+
+from src.database import async_session
+from src.main import app
+from src.migrations.history_rollup import rebuild
+from src.models.history import HistoryModel
+from src.repositories.history import HistoryRollupRepo, LegacyHistoryRepo, to_hour
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+@pytest.mark.asyncio
+async def test_rollups_incremental(clean_db):
+    """
+    Тест обновления сводок вместе со вставкой строк: итоги по адресу, по часам и общий счетчик
+    """
+    address = f"rollup_{uuid.uuid4().hex[:8]}"
+    hour = to_hour(datetime.utcnow()) - timedelta(hours=5)
+    rollups = HistoryRollupRepo()
+    total = await rollups.total()
+
+    await LegacyHistoryRepo().add_one({"address": address, "balance": 5.0, "timestamp": hour + timedelta(minutes=10)})
+    await LegacyHistoryRepo().add_many([
+        {"address": address, "balance": 7.0, "timestamp": hour + timedelta(hours=1, minutes=1)},
+        # более ранняя строка не меняет последний баланс
+        {"address": address, "balance": 1.0, "timestamp": hour + timedelta(minutes=5)},
+        {"address": address, "balance": None, "timestamp": hour + timedelta(minutes=20)},
+    ])
+    stats = await rollups.get_address_stats(address, hour)
+
+    # проверка
+    assert await rollups.total() == total + 4
+    assert (stats["lookups"], stats["balance_min"], stats["balance_max"], stats["balance_last"]) == (4, 1.0, 7.0, 7.0)
+    assert stats["first_seen"] == hour + timedelta(minutes=5)
+    assert [(row["bucket"], row["lookups"], row["balance_last"]) for row in stats["hourly"]] == [
+        (hour, 3, None), (hour + timedelta(hours=1), 1, 7.0)]
+    assert (await rollups.get_address_stats(address, hour + timedelta(hours=1)))["hourly"][0]["lookups"] == 1
+    assert await rollups.get_address_stats("unknown_address", hour) is None
+
+
+@pytest.mark.asyncio
+async def test_address_stats_endpoint(clean_db, fake_tron_client):
+    """
+    Тест эндпоинта "/address/{address}/stats/" и общего количества строк в ответе "/logs/"
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        before = await ac.get(f"/address/{ADDRESS}/stats/")
+        await ac.post("/address/", json={"address": ADDRESS})
+        after = await ac.get(f"/address/{ADDRESS}/stats/", params={"hours": 1})
+        unknown = await ac.get("/address/TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL/stats/")
+        invalid = await ac.get("/address/not_an_address/stats/")
+        logs = await ac.get("/logs/?per_page=3")
+
+    # проверка
+    lookups = before.json()["lookups"] if before.status_code == 200 else 0
+    assert after.status_code == 200
+    assert after.json()["lookups"] == lookups + 1
+    assert after.json()["balance_last"] == 1000.0
+    assert after.json()["hourly"][-1]["lookups"] >= 1
+    assert unknown.status_code == 404
+    assert invalid.status_code == 400
+    total = await HistoryRollupRepo().total()
+    assert logs.json()["total"] == total
+    assert logs.json()["pages"] == -(-total // 3)
+
+
+@pytest.mark.asyncio
+async def test_rollups_rebuild(clean_db):
+    """
+    Тест пересчета сводок по истории: счетчик совпадает с количеством строк
+    """
+    await LegacyHistoryRepo().add_many([{"address": ADDRESS, "balance": 2.0}, {"address": ADDRESS, "balance": 3.0}])
+
+    result = await rebuild(chunk_size=1)
+
+    # проверка
+    async with async_session() as session:
+        rows = (await session.execute(select(func.count()).select_from(HistoryModel))).scalar()
+        address_rows = (await session.execute(select(func.count()).filter(HistoryModel.address == ADDRESS))).scalar()
+    assert result["rows"] == rows
+    assert await HistoryRollupRepo().total() == rows
+    stats = await HistoryRollupRepo().get_address_stats(ADDRESS, to_hour(datetime.utcnow()))
+    assert (stats["lookups"], stats["balance_last"]) == (address_rows, 3.0)
@@ -0,0 +1,88 @@
+import pytest
+from datetime import datetime, timedelta
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.repositories.history import CompactHistoryRepo, HistoryRepo
+from src.utils.downsample import lttb
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+OTHER_ADDRESS = "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm"
+UNKNOWN_ADDRESS = "TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL"
+START = datetime(2001, 3, 1)
+
+
+@pytest.mark.asyncio
+async def test_address_series_endpoint(clean_db):
+    """
+    Тест эндпоинта "/address/{address}/series/": корзины с минимумом, максимумом и последним значением,
+    прореживание LTTB до заданного количества точек
+    """
+    await HistoryRepo().add_many([{"address": ADDRESS, "balance": float(i), "bandwidth": 100 - i, "energy": i % 7,
+                                   "timestamp": START + timedelta(minutes=i)} for i in range(100)])
+    params = {"since": START.isoformat(), "until": (START + timedelta(minutes=100)).isoformat(), "points": 10}
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        buckets = await ac.get(f"/address/{ADDRESS}/series/", params=params)
+        reduced = await ac.get(f"/address/{ADDRESS}/series/", params={**params, "points": 5, "method": "lttb"})
+        empty = await ac.get(f"/address/{UNKNOWN_ADDRESS}/series/")
+        invalid = await ac.get("/address/not_an_address/series/")
+        reversed_period = await ac.get(f"/address/{ADDRESS}/series/",
+                                       params={"since": params["until"], "until": params["since"]})
+
+    # проверка
+    assert buckets.status_code == 200
+    series = buckets.json()
+    assert (series["resolution"], series["method"], len(series["points"])) == (600, "buckets", 10)
+    first, last = series["points"][0], series["points"][-1]
+    assert (first["count"], first["balance_min"], first["balance_max"], first["balance_last"]) == (10, 0.0, 9.0, 9.0)
+    assert (first["bandwidth_min"], first["bandwidth_max"], first["bandwidth_last"]) == (91.0, 100.0, 91.0)
+    assert datetime.fromisoformat(last["timestamp"]) == START + timedelta(minutes=90)
+    assert (last["balance_min"], last["balance_last"]) == (90.0, 99.0)
+
+    points = reduced.json()["points"]
+    assert len(points) == 5
+    assert (points[0]["balance_min"], points[-1]["balance_last"]) == (0.0, 99.0)
+    assert empty.status_code == 404
+    assert invalid.status_code == 400
+    assert reversed_period.status_code == 400
+
+
+@pytest.mark.asyncio
+async def test_compact_history_series(clean_db):
+    """
+    Тест корзин временного ряда компактного хранилища: баланс переводится из sun в TRX
+    """
+    repository = CompactHistoryRepo()
+    await repository.add_many([{"address": OTHER_ADDRESS, "balance": 1.5, "bandwidth": 10, "energy": 1,
+                                "timestamp": START},
+                               {"address": OTHER_ADDRESS, "balance": 0.25, "bandwidth": 20, "energy": 2,
+                                "timestamp": START + timedelta(seconds=30)},
+                               {"address": OTHER_ADDRESS, "balance": 3.0, "bandwidth": 5, "energy": 3,
+                                "timestamp": START + timedelta(seconds=90)}])
+
+    buckets = await repository.get_series(OTHER_ADDRESS, START, START + timedelta(minutes=5), 60)
+
+    # проверка
+    assert [(bucket["bucket"], bucket["count"]) for bucket in buckets] == [(0, 2), (1, 1)]
+    assert (buckets[0]["balance_min"], buckets[0]["balance_max"], buckets[0]["balance_last"]) == (0.25, 1.5, 0.25)
+    assert (buckets[0]["bandwidth_max"], buckets[1]["energy_last"]) == (20.0, 3.0)
+    assert await repository.get_series(UNKNOWN_ADDRESS, START, START + timedelta(minutes=5), 60) == []
+
+
+def test_lttb():
+    """
+    Тест прореживания LTTB: крайние точки и выбросы сохраняются
+    """
+    xs = list(range(20))
+    ys = [0.0] * 20
+    ys[7], ys[14] = 50.0, -50.0
+
+    # проверка
+    selected = lttb(xs, ys, 6)
+    assert len(selected) == 6
+    assert (selected[0], selected[-1]) == (0, 19)
+    assert {7, 14} <= set(selected)
+    assert lttb(xs, ys, 30) == list(range(20))
+    assert lttb(xs, ys, 2) == [0, 19]
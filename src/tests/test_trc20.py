@@ -0,0 +1,151 @@
+import pytest
+from decimal import Decimal
+from httpx import AsyncClient, ASGITransport
+from sqlalchemy.exc import IntegrityError
+from tronpy.abi import trx_abi
+from tronpy.exceptions import TvmError
+from typing import Any, Dict, List, Optional, Tuple
+
+from src.main import app
+from src.repositories.history import HistoryRepo, HistoryRollupRepo, HistoryTokenBalanceRepo
+from src.schemas.address import AddressResponseSchema
+from src.services.history import HistoryService
+from src.tron.trc20 import Trc20Balances, TRY_AGGREGATE, token_metadata
+
+OWNER = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+USDT = "TR7NHqjeKQxGTCi8q8ZY4pL8otSzgjLj6t"
+USDC = "TEkxiTehnzSmSe2XqrBj4w32RUN966rdz8"
+UNKNOWN = "TA9pkx4DFxrEw8JZzUtyDrh2uAat1LDuJL"
+MULTICALL = "TA4Wt1DUCqz6YegbnsmqsWC5uUfbdBqPxm"
+
+
+class FakeTrc20Node:
+    """
+    Класс-заглушка узла с TRC-20 контрактами и multicall-контрактом (tryAggregate)
+    """
+
+    def __init__(self, tokens: Dict[str, Dict[str, Any]]):
+        self.tokens = tokens
+        self.calls: List[Tuple[str, str]] = []
+
+    def balance_of(self, token: str, owner: str) -> Optional[int]:
+        if token not in self.tokens:
+            return None
+        return self.tokens[token]["balances"].get(owner, 0)
+
+    async def trigger_const_smart_contract_function(self, owner: str, contract: str,
+                                                    selector: str, parameter: str) -> str:
+        self.calls.append((contract, selector))
+        if contract == MULTICALL and selector == TRY_AGGREGATE:
+            _, calls = trx_abi.decode_abi(["bool", "(address,bytes)[]"], bytes.fromhex(parameter))
+            results = []
+            for target, data in calls:
+                balance = self.balance_of(target, trx_abi.decode_single("address", data[4:]))
+                results.append((False, b"") if balance is None else (True, trx_abi.encode_single("uint256", balance)))
+            return trx_abi.encode_abi(["(bool,bytes)[]"], [results]).hex()
+        if contract not in self.tokens:
+            raise TvmError("REVERT opcode executed")
+        token = self.tokens[contract]
+        if selector == "decimals()":
+            return trx_abi.encode_single("uint8", token["decimals"]).hex()
+        if selector == "symbol()":
+            return trx_abi.encode_single("string", token["symbol"]).hex()
+        return trx_abi.encode_single("uint256", self.balance_of(contract, owner)).hex()
+
+
+@pytest.fixture
+def trc20_node():
+    token_metadata.backend.clear()
+    yield FakeTrc20Node({
+        USDT: {"symbol": "USDT", "decimals": 6, "balances": {OWNER: 12_345_678}},
+        USDC: {"symbol": "USDC", "decimals": 18, "balances": {OWNER: 10 ** 30}},
+    })
+    token_metadata.backend.clear()
+
+
+@pytest.mark.asyncio
+async def test_trc20_multicall_batches(trc20_node):
+    """
+    Тест получения балансов одним multicall-вызовом на пакет токенов
+    """
+    trc20 = Trc20Balances([USDT, USDC, UNKNOWN], multicall=MULTICALL, batch_size=2)
+
+    tokens = await trc20.balances(trc20_node, OWNER)
+
+    # проверка
+    assert [token["balance"] for token in tokens] == [Decimal("12.345678"), Decimal(10 ** 12), None]
+    assert tokens[0]["symbol"] == "USDT" and tokens[1]["decimals"] == 18
+    assert tokens[1]["balance_raw"] == str(10 ** 30)
+    assert tokens[2]["symbol"] is None
+    assert [call for call in trc20_node.calls if call[1] == TRY_AGGREGATE] == [(MULTICALL, TRY_AGGREGATE)] * 2
+
+
+@pytest.mark.asyncio
+async def test_trc20_metadata_cached(trc20_node):
+    """
+    Тест постоянного кэша метаданных токенов и запроса balanceOf без multicall
+    """
+    trc20 = Trc20Balances([USDT, USDC])
+
+    first = await trc20.balances(trc20_node, OWNER)
+    metadata_calls = len([call for call in trc20_node.calls if call[1] in ("decimals()", "symbol()")])
+    second = await trc20.balances(trc20_node, OWNER)
+
+    # проверка
+    assert first == second
+    assert metadata_calls == 4
+    assert len([call for call in trc20_node.calls if call[1] in ("decimals()", "symbol()")]) == 4
+    assert len([call for call in trc20_node.calls if call[1] == "balanceOf(address)"]) == 4
+
+
+@pytest.mark.asyncio
+async def test_trc20_history_child_rows(clean_db, trc20_node):
+    """
+    Тест записи балансов токенов в дочернюю таблицу истории
+    """
+    tokens = await Trc20Balances([USDT, USDC], multicall=MULTICALL).balances(trc20_node, OWNER)
+    account = {"address": OWNER, "balance": 1.0, "tokens": tokens}
+
+    history_id = await HistoryService(HistoryRepo).add_history(account, sync=True)
+    history_ids = await HistoryService(HistoryRepo).add_history_many([account, {"address": OWNER}])
+
+    # проверка
+    rows = await HistoryTokenBalanceRepo().get_by_history(history_id)
+    assert [(row.symbol, row.balance) for row in rows] == [("USDT", Decimal("12.345678")),
+                                                           ("USDC", Decimal(10 ** 12))]
+    assert len(await HistoryTokenBalanceRepo().get_by_history(history_ids[0])) == 2
+    assert await HistoryTokenBalanceRepo().get_by_history(history_ids[1]) == []
+
+
+@pytest.mark.asyncio
+async def test_trc20_history_single_transaction(clean_db):
+    """
+    Тест записи строки истории и балансов токенов одной транзакцией: ошибка вставки баланса отменяет строку
+    """
+    total = await HistoryRollupRepo().total()
+    account = {"address": OWNER, "balance": 1.0, "tokens": [{"contract": None, "balance_raw": "1"}]}
+
+    with pytest.raises(IntegrityError):
+        await HistoryService(HistoryRepo).add_history(account, sync=True)
+
+    # проверка
+    assert await HistoryRollupRepo().total() == total
+
+
+@pytest.mark.asyncio
+async def test_post_address_with_tokens(clean_db, fake_tron_client, trc20_node, monkeypatch):
+    """
+    Тест ответа "/address/" с балансами TRC-20 токенов
+    """
+    fake_tron_client.trigger_const_smart_contract_function = trc20_node.trigger_const_smart_contract_function
+    monkeypatch.setattr("src.services.account.trc20_balances", Trc20Balances([USDT], multicall=MULTICALL))
+
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        response = await ac.post("/address/", json={"address": OWNER})
+
+    # проверка
+    assert response.status_code == 200
+    assert response.json()["tokens"] == [{"contract": USDT, "symbol": "USDT", "decimals": 6, "balance": "12.345678"}]
+    assert response.json() == AddressResponseSchema.model_validate(response.json()).model_dump(mode="json")
@@ -0,0 +1,34 @@
+import pytest
+
+from src.tron.client import TronClientPool
+
+
+@pytest.mark.asyncio
+async def test_pool_reuses_clients():
+    """
+    Тест повторного использования клиентов пула
+    """
+    pool = TronClientPool(network="shasta", size=2)
+    first = await pool.get_client()
+    second = await pool.get_client()
+    third = await pool.get_client()
+
+    # проверка
+    assert pool.is_open
+    assert first is not second
+    assert first is third
+    await pool.close()
+
+
+@pytest.mark.asyncio
+async def test_pool_close():
+    """
+    Тест закрытия HTTP-соединений пула
+    """
+    pool = TronClientPool(network="shasta")
+    client = await pool.get_client()
+    await pool.close()
+
+    # проверка
+    assert not pool.is_open
+    assert client.provider.client.is_closed
@@ -0,0 +1,145 @@
+import time
+import asyncio
+import pytest
+from fastapi import HTTPException
+
+from benchmarks.stub_node import StubTronNode
+from src.services.account import get_tron_account
+from src.tron.admission import upstream_admission
+from src.tron.nodes import EndpointStats, TronNodePool
+from src.utils.rate_limit import TokenBucket
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+@pytest.mark.asyncio
+async def test_failover_to_healthy_node():
+    """
+    Тест переключения на исправный узел при ошибке основного
+    """
+    with StubTronNode(error_rate=1.0) as broken, StubTronNode() as healthy:
+        nodes = TronNodePool([broken.uri, healthy.uri])
+        account = await nodes.get_account(ADDRESS)
+        await nodes.close()
+
+    # проверка
+    assert account["address"] == ADDRESS
+    stats = {endpoint["uri"]: endpoint for endpoint in nodes.stats()["endpoints"]}
+    assert stats[broken.uri]["failures"] == 1
+    assert stats[healthy.uri]["failures"] == 0
+
+
+@pytest.mark.asyncio
+async def test_hedged_request():
+    """
+    Тест хеджирования: медленный узел дублируется запросом на второй узел
+    """
+    with StubTronNode(latency=1.0) as slow, StubTronNode() as fast:
+        nodes = TronNodePool([slow.uri, fast.uri], hedge=True, hedge_delay_ms=50)
+        started = time.perf_counter()
+        account = await nodes.get_account(ADDRESS)
+        elapsed = time.perf_counter() - started
+        await nodes.close()
+
+    # проверка
+    assert account["address"] == ADDRESS
+    assert elapsed < 0.9
+    assert nodes.hedged == 1
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_opens():
+    """
+    Тест отключения узла после серии ошибок
+    """
+    with StubTronNode(error_rate=1.0) as broken, StubTronNode() as healthy:
+        nodes = TronNodePool([broken.uri, healthy.uri])
+        broken_endpoint = nodes.endpoints[0]
+        broken_endpoint.breaker.failure_threshold = 2
+        for _ in range(5):
+            await nodes.get_account(ADDRESS)
+        await nodes.close()
+
+    # проверка: после открытия автомата запросы на узел не отправляются
+    assert broken_endpoint.breaker.state == "open"
+    assert broken.requests == 2
+
+
+@pytest.mark.asyncio
+async def test_circuit_breaker_single_trial():
+    """
+    Тест полуоткрытого автомата: после паузы пробный запрос получает один из одновременных вызовов,
+    остальные выбирают другой узел
+    """
+    with StubTronNode(error_rate=1.0) as broken, StubTronNode() as healthy:
+        nodes = TronNodePool([broken.uri, healthy.uri])
+        breaker = nodes.endpoints[0].breaker
+        breaker.state, breaker.reset_timeout = "open", 0.0
+        accounts = await asyncio.gather(*[nodes.get_account(ADDRESS) for _ in range(5)])
+        await nodes.close()
+
+    # проверка
+    assert [account["address"] for account in accounts] == [ADDRESS] * 5
+    assert broken.requests == 1
+    assert breaker.state == "open"
+
+
+def test_endpoint_stats_percentile():
+    """
+    Тест процентилей по скользящему окну задержек
+    """
+    stats = EndpointStats(window=4)
+    for latency in (0.5, 0.1, 0.4, 0.2, 0.3, 0.6):
+        stats.record(latency, ok=True)
+    stats.record(9.0, ok=False)
+
+    # проверка: в окне последние четыре успешные задержки
+    assert list(stats.latencies) == [0.4, 0.2, 0.3, 0.6]
+    assert (stats.percentile(0.0), stats.percentile(0.5), stats.percentile(0.99)) == (0.2, 0.4, 0.6)
+    assert (stats.requests, stats.failures) == (7, 1)
+
+
+@pytest.mark.asyncio
+async def test_wallet_snapshot_concurrent():
+    """
+    Тест одновременного получения аккаунта, ресурсов и bandwidth в один снимок кошелька
+    """
+    with StubTronNode(latency=0.2) as node:
+        nodes = TronNodePool([node.uri])
+        started = time.perf_counter()
+        snapshot = await get_tron_account(nodes, ADDRESS)
+        elapsed = time.perf_counter() - started
+        await nodes.close()
+
+    # проверка: три запроса за время одного
+    assert node.requests == 3
+    assert elapsed < 0.5
+    assert snapshot["balance"] == 1.0
+    assert snapshot["bandwidth"] == {"available": 500}
+    assert snapshot["energy"] == {"available": 750}
+
+
+@pytest.mark.asyncio
+async def test_admission_per_rpc(monkeypatch):
+    """
+    Тест контроля допуска по вызовам узла: снимок кошелька расходует токен на каждый вызов,
+    фоновые вызовы вне запроса аккаунта тоже получают токен, при нехватке токенов - 503
+    """
+    monkeypatch.setattr(upstream_admission, "bucket", TokenBucket(rate=0.001, burst=10))
+    monkeypatch.setattr(upstream_admission, "max_wait", 0.05)
+    with StubTronNode() as node:
+        nodes = TronNodePool([node.uri])
+        await get_tron_account(nodes, ADDRESS, "client")
+        after_account = round(upstream_admission.bucket.tokens)
+        await nodes.get_latest_block_number()
+        after_block = round(upstream_admission.bucket.tokens)
+        # burst меньше числа вызовов: заранее получены 2 токена, третий вызов ждет токен и получает отказ
+        upstream_admission.bucket.burst = upstream_admission.bucket.tokens = 2
+        with pytest.raises(HTTPException) as overloaded:
+            await get_tron_account(nodes, ADDRESS, "client")
+        await nodes.close()
+
+    # проверка
+    assert (after_account, after_block) == (7, 6)
+    assert overloaded.value.status_code == 503
+    assert node.requests == 6
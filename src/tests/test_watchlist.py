@@ -0,0 +1,52 @@
+import pytest
+from httpx import AsyncClient, ASGITransport
+
+from src.main import app
+from src.services.watchlist import Watchlist
+
+ADDRESS = "TNPeeaaFB7K9cmo4uQpcU32zGK8G1NYqeL"
+
+
+@pytest.mark.asyncio
+async def test_watchlist_refresh_publishes_changes(clean_db):
+    """
+    Тест обновления отслеживаемого кошелька: событие и запись истории только при изменении
+    """
+    balances = iter([100.0, 100.0, 250.0])
+
+    async def fetch(address):
+        return {"address": address, "balance": next(balances)}
+
+    watchlist = Watchlist()
+    watchlist.add(ADDRESS)
+    queue = watchlist.subscribe()
+
+    changes = [await watchlist.refresh(fetch) for _ in range(3)]
+
+    # проверка
+    assert changes == [1, 0, 1]
+    assert queue.qsize() == 2
+    first, second = queue.get_nowait(), queue.get_nowait()
+    assert first["previous"] is None
+    assert second["balance"] == 250.0
+    assert second["previous"]["balance"] == 100.0
+
+
+@pytest.mark.asyncio
+async def test_watchlist_endpoints(clean_db):
+    """
+    Тест добавления, просмотра и удаления кошельков из отслеживания
+    """
+    async with AsyncClient(transport=ASGITransport(app),
+                           base_url="http://test",
+                           ) as ac:
+        added = (await ac.post("/watchlist/", json={"addresses": [ADDRESS, "invalid"]})).json()
+        listed = (await ac.get("/watchlist/")).json()
+        removed = await ac.delete(f"/watchlist/{ADDRESS}/")
+        missing = await ac.delete(f"/watchlist/{ADDRESS}/")
+
+    # проверка
+    assert added == {"addresses": [ADDRESS], "invalid": ["invalid"]}
+    assert ADDRESS in listed["addresses"]
+    assert removed.status_code == 204
+    assert missing.status_code == 404
@@ -0,0 +1,63 @@
+import os
+import base58
+from functools import lru_cache
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+ADDRESS_CACHE_SIZE = int(os.getenv('ADDRESS_CACHE_SIZE', 4096))
+
+ADDRESS_PREFIX = 0x41
+ADDRESS_LENGTH = 21
+
+
+def _decode(value: str) -> Optional[bytes]:
+    if len(value) == 34 and value[0] == "T":
+        try:
+            return base58.b58decode_check(value)
+        except ValueError:
+            return None
+    try:
+        if len(value) == 42 and value[:2].lower() == "0x":
+            return bytes([ADDRESS_PREFIX]) + bytes.fromhex(value[2:])
+        if len(value) == 42:
+            return bytes.fromhex(value)
+    except ValueError:
+        return None
+    return None
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def normalize_address(value: str) -> Optional[str]:
+    """
+    Функция офлайн-проверки адреса (base58check, hex с префиксом 0x41 или 0x) и приведения к base58check
+
+    :param value: Адрес кошелька в любом формате
+    :return: Адрес в формате base58check или None, если адрес некорректен
+    """
+    raw = _decode(value.strip())
+    if raw is None or len(raw) != ADDRESS_LENGTH or raw[0] != ADDRESS_PREFIX:
+        return None
+    return base58.b58encode_check(raw).decode()
+
+
+def to_raw_address(address: str) -> bytes:
+    """
+    Функция получения 21-байтового представления корректного base58check-адреса
+    """
+    return base58.b58decode_check(address)
+
+
+def to_hex_address(address: str) -> str:
+    """
+    Функция получения hex-представления (с префиксом 41) корректного base58check-адреса
+    """
+    return to_raw_address(address).hex()
+
+
+@lru_cache(maxsize=ADDRESS_CACHE_SIZE)
+def from_raw_address(raw: bytes) -> str:
+    """
+    Функция получения base58check-адреса из 21-байтового представления
+    """
+    return base58.b58encode_check(raw).decode()
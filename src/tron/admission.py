@@ -0,0 +1,67 @@
+import os
+from contextvars import ContextVar
+from typing import Optional
+from dotenv import load_dotenv
+
+from src.utils.rate_limit import AdmissionController
+
+load_dotenv()
+TRON_RATE_LIMIT = float(os.getenv('TRON_RATE_LIMIT', 0))
+TRON_RATE_BURST = float(os.getenv('TRON_RATE_BURST', 10))
+TRON_ADMISSION_QUEUE = int(os.getenv('TRON_ADMISSION_QUEUE', 100))
+TRON_ADMISSION_QUEUE_PER_CLIENT = int(os.getenv('TRON_ADMISSION_QUEUE_PER_CLIENT', 10))
+TRON_ADMISSION_MAX_WAIT = float(os.getenv('TRON_ADMISSION_MAX_WAIT', 2.0))
+
+# ключ клиента фоновых вызовов узла (опрос последнего блока)
+BACKGROUND_CLIENT_KEY = "background"
+
+upstream_admission = AdmissionController(rate=TRON_RATE_LIMIT,
+                                         burst=TRON_RATE_BURST,
+                                         max_queue=TRON_ADMISSION_QUEUE,
+                                         max_queue_per_client=TRON_ADMISSION_QUEUE_PER_CLIENT,
+                                         max_wait=TRON_ADMISSION_MAX_WAIT)
+
+
+class AdmissionBudget:
+    """
+    Токены, полученные заранее на все вызовы узла одного запроса аккаунта
+    """
+
+    def __init__(self, client_key: str, tokens: float):
+        self.client_key: str = client_key
+        self.tokens: float = tokens
+
+
+# бюджет текущего запроса аккаунта: задачи asyncio.gather наследуют контекст и расходуют общий бюджет
+admission_budget: ContextVar[Optional[AdmissionBudget]] = ContextVar("admission_budget", default=None)
+
+
+async def reserve(client_key: str, calls: int) -> AdmissionBudget:
+    """
+    Функция получения токенов на все вызовы узла запроса одним ожиданием в очереди клиента
+    (не больше burst - вызовы сверх бюджета получают токены по одному)
+
+    :param client_key: Ключ клиента (IP-адрес) для справедливой очереди
+    :param calls: Количество вызовов узла
+    :return: Бюджет токенов запроса
+    :raises Overloaded: Если очередь заполнена или истек срок ожидания
+    """
+    if upstream_admission.bucket is None:
+        return AdmissionBudget(client_key, calls)
+    cost = min(calls, upstream_admission.bucket.burst)
+    await upstream_admission.acquire(client_key, cost=cost)
+    return AdmissionBudget(client_key, cost)
+
+
+async def admit_call() -> None:
+    """
+    Функция допуска одного вызова узла: токен из бюджета запроса аккаунта,
+    иначе новый токен в очереди клиента запроса (или фоновых вызовов)
+
+    :raises Overloaded: Если очередь заполнена или истек срок ожидания
+    """
+    budget = admission_budget.get()
+    if budget is not None and budget.tokens >= 1:
+        budget.tokens -= 1
+        return
+    await upstream_admission.acquire(budget.client_key if budget is not None else BACKGROUND_CLIENT_KEY)
@@ -0,0 +1,71 @@
+import os
+import time
+import asyncio
+import logging
+from typing import Optional
+from dotenv import load_dotenv
+
+load_dotenv()
+TRON_BLOCK_POLL_ENABLED = os.getenv('TRON_BLOCK_POLL_ENABLED', 'False').lower() in ('true', '1')
+TRON_BLOCK_POLL_INTERVAL = float(os.getenv('TRON_BLOCK_POLL_INTERVAL', 1.0))
+TRON_BLOCK_MAX_AGE = float(os.getenv('TRON_BLOCK_MAX_AGE', 10.0))
+
+
+class BlockTracker:
+    """
+    Фоновое отслеживание номера последнего блока сети Трон
+    """
+
+    def __init__(self, interval: float = TRON_BLOCK_POLL_INTERVAL, max_age: float = TRON_BLOCK_MAX_AGE):
+        self.interval: float = interval
+        self.max_age: float = max_age
+        self.latest: Optional[int] = None
+        self.updated_at: float = 0.0
+        self.errors: int = 0
+        self._task: Optional[asyncio.Task] = None
+
+    def update(self, number: int) -> None:
+        self.latest = max(number, self.latest or 0)
+        self.updated_at = time.monotonic()
+
+    def current(self) -> Optional[int]:
+        """
+        Функция получения номера последнего блока (None, если данные устарели или отсутствуют)
+        """
+        if self.latest is None or time.monotonic() - self.updated_at > self.max_age:
+            return None
+        return self.latest
+
+    async def start(self, client) -> None:
+        """
+        Функция запуска фонового опроса узла
+
+        :param client: Набор узлов сети Трон
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(client))
+
+    async def stop(self) -> None:
+        """
+        Функция остановки фонового опроса узла
+        """
+        if self._task is None:
+            return
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        self._task = None
+
+    async def _run(self, client) -> None:
+        while True:
+            try:
+                self.update(await client.get_latest_block_number())
+            except Exception as e:
+                self.errors += 1
+                logging.warning(f"Failed to poll latest block: {e}")
+            await asyncio.sleep(self.interval)
+
+
+block_tracker = BlockTracker()
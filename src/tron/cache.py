@@ -0,0 +1,30 @@
+import os
+from dotenv import load_dotenv
+
+from src.utils.cache import AbstractCache, SharedSQLiteCache, SingleFlightCache, TTLCache
+
+load_dotenv()
+ACCOUNT_CACHE_TTL = float(os.getenv('ACCOUNT_CACHE_TTL', 3.0))
+ACCOUNT_CACHE_SIZE = int(os.getenv('ACCOUNT_CACHE_SIZE', 10000))
+# верхняя граница жизни записи, привязанной к номеру блока
+ACCOUNT_CACHE_BLOCK_TTL = float(os.getenv('ACCOUNT_CACHE_BLOCK_TTL', 30.0))
+# memory - кэш каждого процесса; sqlite - общий файл для всех воркеров хоста
+CACHE_BACKEND = os.getenv('CACHE_BACKEND', "memory")
+SHARED_CACHE_PATH = os.getenv('SHARED_CACHE_PATH', "./tron_cache.db")
+
+
+def make_cache_backend(namespace: str, maxsize: int, ttl: float) -> AbstractCache:
+    """
+    Функция создания хранилища кэша по настройке CACHE_BACKEND
+
+    :param namespace: Имя кэша (раздел общего файла)
+    :param maxsize: Максимальное количество записей
+    :param ttl: Время жизни записи по умолчанию
+    :return: Хранилище кэша
+    """
+    if CACHE_BACKEND == "sqlite":
+        return SharedSQLiteCache(SHARED_CACHE_PATH, namespace, maxsize, ttl)
+    return TTLCache(maxsize=maxsize, ttl=ttl)
+
+
+account_cache = SingleFlightCache(make_cache_backend("account", ACCOUNT_CACHE_SIZE, ACCOUNT_CACHE_TTL))
@@ -0,0 +1,82 @@
+import os
+import httpx
+from itertools import cycle
+from typing import List
+from dotenv import load_dotenv
+from tronpy import AsyncTron
+from tronpy.defaults import conf_for_name
+from tronpy.providers.async_http import AsyncHTTPProvider, DEFAULT_API_KEY
+
+load_dotenv()
+TRON_NETWORK = os.getenv('TRON_NETWORK', "shasta")
+TRON_PROVIDER_URI = os.getenv('TRON_PROVIDER_URI', "")
+TRON_API_KEY = os.getenv('TRON_API_KEY') or DEFAULT_API_KEY
+TRON_CLIENT_POOL_SIZE = int(os.getenv('TRON_CLIENT_POOL_SIZE', 1))
+TRON_TIMEOUT = float(os.getenv('TRON_TIMEOUT', 10.0))
+TRON_CONNECT_TIMEOUT = float(os.getenv('TRON_CONNECT_TIMEOUT', 5.0))
+TRON_MAX_CONNECTIONS = int(os.getenv('TRON_MAX_CONNECTIONS', 100))
+TRON_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv('TRON_MAX_KEEPALIVE_CONNECTIONS', 20))
+TRON_KEEPALIVE_EXPIRY = float(os.getenv('TRON_KEEPALIVE_EXPIRY', 30.0))
+TRON_BATCH_CONCURRENCY = int(os.getenv('TRON_BATCH_CONCURRENCY', 10))
+
+
+class TronClientPool:
+    """
+    Пул долгоживущих ТРОН-клиентов с общими настройками HTTP-соединений
+    """
+
+    def __init__(self,
+                 network: str = TRON_NETWORK,
+                 endpoint_uri: str = TRON_PROVIDER_URI,
+                 size: int = TRON_CLIENT_POOL_SIZE,
+                 ):
+        self.network: str = network
+        self.endpoint_uri: str = endpoint_uri or conf_for_name(network)["fullnode"]
+        self.size: int = max(size, 1)
+        self._clients: List[AsyncTron] = []
+        self._cycle = None
+
+    @property
+    def is_open(self) -> bool:
+        return bool(self._clients)
+
+    def _make_client(self) -> AsyncTron:
+        """
+        Функция создания ТРОН-клиента с настроенным пулом HTTP-соединений
+        """
+        http_client = httpx.AsyncClient(
+            headers={"Tron-Pro-Api-Key": TRON_API_KEY},
+            timeout=httpx.Timeout(TRON_TIMEOUT, connect=TRON_CONNECT_TIMEOUT),
+            limits=httpx.Limits(max_connections=TRON_MAX_CONNECTIONS,
+                                max_keepalive_connections=TRON_MAX_KEEPALIVE_CONNECTIONS,
+                                keepalive_expiry=TRON_KEEPALIVE_EXPIRY),
+        )
+        provider = AsyncHTTPProvider(self.endpoint_uri, timeout=TRON_TIMEOUT, client=http_client)
+        return AsyncTron(provider=provider)
+
+    async def open(self) -> None:
+        """
+        Функция открытия пула клиентов
+        """
+        if self.is_open:
+            return
+        self._clients = [self._make_client() for _ in range(self.size)]
+        self._cycle = cycle(self._clients)
+
+    async def close(self) -> None:
+        """
+        Функция закрытия всех клиентов пула
+        """
+        clients, self._clients, self._cycle = self._clients, [], None
+        for client in clients:
+            await client.close()
+
+    async def get_client(self) -> AsyncTron:
+        """
+        Функция получения клиента из пула (по кругу)
+
+        :return: ТРОН-клиент
+        """
+        if not self.is_open:
+            await self.open()
+        return next(self._cycle)
@@ -0,0 +1,300 @@
+import os
+import time
+import asyncio
+from bisect import bisect_left, insort
+from collections import deque
+from typing import Any, Deque, Dict, List, Optional, Sequence
+from dotenv import load_dotenv
+from tronpy.defaults import conf_for_name
+from tronpy.exceptions import AddressNotFound, BadAddress, TvmError
+
+from src.tron.admission import admit_call
+from src.tron.client import TronClientPool, TRON_NETWORK, TRON_PROVIDER_URI
+from src.utils.metrics import tron_rpc_duration, tron_rpc_in_flight, tron_upstream_errors
+
+load_dotenv()
+TRON_PROVIDER_URIS = os.getenv('TRON_PROVIDER_URIS', "")
+TRON_HEDGE_ENABLED = os.getenv('TRON_HEDGE_ENABLED', 'False').lower() in ('true', '1')
+TRON_HEDGE_PERCENTILE = float(os.getenv('TRON_HEDGE_PERCENTILE', 0.95))
+TRON_HEDGE_DELAY_MS = float(os.getenv('TRON_HEDGE_DELAY_MS', 200))
+TRON_HEDGE_MIN_DELAY_MS = float(os.getenv('TRON_HEDGE_MIN_DELAY_MS', 20))
+TRON_LATENCY_WINDOW = int(os.getenv('TRON_LATENCY_WINDOW', 256))
+TRON_CB_FAILURES = int(os.getenv('TRON_CB_FAILURES', 5))
+TRON_CB_RESET_TIMEOUT = float(os.getenv('TRON_CB_RESET_TIMEOUT', 30.0))
+
+# ошибки, которые означают корректный ответ узла и не должны повторяться на другом узле
+NON_RETRIABLE_ERRORS = (AddressNotFound, BadAddress, TvmError)
+
+MIN_LATENCY_SAMPLES = 10
+
+
+class NoHealthyEndpoint(Exception):
+    pass
+
+
+class EndpointStats:
+    """
+    Статистика задержек и ошибок одного узла по скользящему окну
+    """
+
+    def __init__(self, window: int = TRON_LATENCY_WINDOW):
+        self.requests: int = 0
+        self.failures: int = 0
+        self.latencies: Deque[float] = deque(maxlen=window)
+        # те же задержки по возрастанию: процентиль берется по индексу без сортировки на каждый выбор узла
+        self._ordered: List[float] = []
+
+    def record(self, latency: float, ok: bool) -> None:
+        self.requests += 1
+        if ok:
+            if len(self.latencies) == self.latencies.maxlen:
+                del self._ordered[bisect_left(self._ordered, self.latencies[0])]
+            self.latencies.append(latency)
+            insort(self._ordered, latency)
+        else:
+            self.failures += 1
+
+    def percentile(self, q: float) -> Optional[float]:
+        if not self._ordered:
+            return None
+        return self._ordered[min(int(q * len(self._ordered)), len(self._ordered) - 1)]
+
+
+class CircuitBreaker:
+    """
+    Автомат отключения узла после серии ошибок (closed -> open -> half_open -> closed)
+    """
+
+    def __init__(self, failure_threshold: int = TRON_CB_FAILURES, reset_timeout: float = TRON_CB_RESET_TIMEOUT):
+        self.failure_threshold: int = failure_threshold
+        self.reset_timeout: float = reset_timeout
+        self.state: str = "closed"
+        self.consecutive_failures: int = 0
+        self.opened_at: float = 0.0
+        self._trial_in_flight: bool = False
+
+    def available(self) -> bool:
+        if self.state == "open":
+            return time.monotonic() - self.opened_at >= self.reset_timeout
+        return self.state == "closed" or not self._trial_in_flight
+
+    def try_acquire(self) -> bool:
+        """
+        Функция допуска запроса на узел: проверка и захват пробного запроса выполняются одним шагом,
+        без await между ними, поэтому пробный запрос после паузы получает только одна задача
+        """
+        if not self.available():
+            return False
+        if self.state != "closed":
+            # пробный запрос после паузы
+            self.state = "half_open"
+            self._trial_in_flight = True
+        return True
+
+    def release(self) -> None:
+        self._trial_in_flight = False
+
+    def record_success(self) -> None:
+        self.state = "closed"
+        self.consecutive_failures = 0
+        self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        self.consecutive_failures += 1
+        self._trial_in_flight = False
+        if self.state == "half_open" or self.consecutive_failures >= self.failure_threshold:
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+
+class TronEndpoint:
+    """
+    Узел сети Трон: пул клиентов, статистика и автомат отключения
+    """
+
+    def __init__(self, uri: str, network: str = TRON_NETWORK):
+        self.uri: str = uri
+        self.pool: TronClientPool = TronClientPool(network=network, endpoint_uri=uri)
+        self.stats: EndpointStats = EndpointStats()
+        self.breaker: CircuitBreaker = CircuitBreaker()
+
+    async def call(self, method: str, *args) -> Any:
+        # допуск на узел (breaker.try_acquire) выполняет TronNodePool при выборе узла
+        try:
+            client = await self.pool.get_client()
+        except asyncio.CancelledError:
+            self.breaker.release()
+            raise
+        started = time.perf_counter()
+        tron_rpc_in_flight.inc()
+        try:
+            result = await getattr(client, method)(*args)
+        except NON_RETRIABLE_ERRORS as e:
+            self.stats.record(time.perf_counter() - started, ok=True)
+            self.breaker.record_success()
+            tron_upstream_errors.inc(method=method, type=type(e).__name__)
+            raise
+        except asyncio.CancelledError:
+            # проигравший хеджированный запрос: узел не виноват
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self.stats.record(time.perf_counter() - started, ok=False)
+            self.breaker.record_failure()
+            tron_upstream_errors.inc(method=method, type=type(e).__name__)
+            raise
+        finally:
+            tron_rpc_in_flight.dec()
+            tron_rpc_duration.observe(time.perf_counter() - started, method=method)
+        self.stats.record(time.perf_counter() - started, ok=True)
+        self.breaker.record_success()
+        return result
+
+    def info(self) -> Dict[str, Any]:
+        return {'uri': self.uri,
+                'state': self.breaker.state,
+                'requests': self.stats.requests,
+                'failures': self.stats.failures,
+                'p50': self.stats.percentile(0.5),
+                'p95': self.stats.percentile(0.95),
+                'p99': self.stats.percentile(0.99),
+                }
+
+
+class TronNodePool:
+    """
+    Набор узлов сети Трон с выбором самого быстрого исправного узла,
+    переключением при ошибках и хеджированием медленных запросов
+    """
+
+    def __init__(self,
+                 uris: List[str],
+                 network: str = TRON_NETWORK,
+                 hedge: bool = TRON_HEDGE_ENABLED,
+                 hedge_percentile: float = TRON_HEDGE_PERCENTILE,
+                 hedge_delay_ms: float = TRON_HEDGE_DELAY_MS,
+                 ):
+        self.endpoints: List[TronEndpoint] = [TronEndpoint(uri, network) for uri in uris]
+        self.hedge: bool = hedge
+        self.hedge_percentile: float = hedge_percentile
+        self.hedge_delay: float = hedge_delay_ms / 1000
+        self.hedged: int = 0
+
+    async def open(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.pool.open()
+
+    async def close(self) -> None:
+        for endpoint in self.endpoints:
+            await endpoint.pool.close()
+
+    def _candidates(self, exclude: Sequence[TronEndpoint] = ()) -> List[TronEndpoint]:
+        """
+        Функция выбора узлов по возрастанию медианной задержки (узлы без статистики - первыми)
+
+        :param exclude: Узлы, уже получившие этот вызов
+        """
+        allowed = [endpoint for endpoint in self.endpoints
+                   if endpoint not in exclude and endpoint.breaker.available()]
+        return sorted(allowed, key=lambda endpoint: endpoint.stats.percentile(0.5) or 0.0)
+
+    def _acquire(self, exclude: Sequence[TronEndpoint] = ()) -> Optional[TronEndpoint]:
+        """
+        Функция выбора и захвата лучшего узла по текущим статистике и состоянию автоматов
+        """
+        for endpoint in self._candidates(exclude):
+            if endpoint.breaker.try_acquire():
+                return endpoint
+        return None
+
+    def _hedge_delay_for(self, endpoint: TronEndpoint) -> float:
+        if len(endpoint.stats.latencies) < MIN_LATENCY_SAMPLES:
+            return self.hedge_delay
+        return max(endpoint.stats.percentile(self.hedge_percentile), TRON_HEDGE_MIN_DELAY_MS / 1000)
+
+    async def call(self, method: str, *args) -> Any:
+        """
+        Функция вызова метода ТРОН-клиента на лучшем узле с переключением и хеджированием
+        (каждый вызов расходует токен контроля допуска)
+
+        :param method: Имя метода AsyncTron
+        :param args: Аргументы метода
+        :return: Результат первого успешного ответа
+        :raises Overloaded: Если контроль допуска отклонил вызов
+        """
+        await admit_call()
+        pending: Dict[asyncio.Task, TronEndpoint] = {}
+        tried: List[TronEndpoint] = []
+        last_error: Optional[BaseException] = None
+
+        def launch() -> bool:
+            # узел выбирается заново при каждом запуске: статистика и автоматы могли измениться за время ожидания
+            endpoint = self._acquire(tried)
+            if endpoint is None:
+                return False
+            tried.append(endpoint)
+            pending[asyncio.create_task(endpoint.call(method, *args))] = endpoint
+            return True
+
+        if not launch():
+            raise NoHealthyEndpoint("No healthy Tron endpoints")
+        hedge_delay = self._hedge_delay_for(tried[0]) if self.hedge else None
+        try:
+            while pending:
+                done, _ = await asyncio.wait(pending, timeout=hedge_delay, return_when=asyncio.FIRST_COMPLETED)
+                if not done:
+                    # основной узел не ответил за порог задержки - дублируем запрос на следующий узел
+                    hedge_delay = None
+                    if launch():
+                        self.hedged += 1
+                    continue
+                for task in done:
+                    pending.pop(task)
+                    error = task.exception()
+                    if error is None:
+                        return task.result()
+                    if isinstance(error, NON_RETRIABLE_ERRORS):
+                        raise error
+                    last_error = error
+                if not pending:
+                    launch()
+            raise last_error
+        finally:
+            for task in pending:
+                task.cancel()
+
+    async def get_account(self, address: str) -> dict:
+        return await self.call("get_account", address)
+
+    async def get_account_resource(self, address: str) -> dict:
+        return await self.call("get_account_resource", address)
+
+    async def get_bandwidth(self, address: str) -> int:
+        return await self.call("get_bandwidth", address)
+
+    async def get_latest_block_number(self) -> int:
+        return await self.call("get_latest_block_number")
+
+    async def trigger_const_smart_contract_function(self, owner: str, contract: str,
+                                                    selector: str, parameter: str) -> str:
+        return await self.call("trigger_const_smart_contract_function", owner, contract, selector, parameter)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'hedged': self.hedged,
+                'endpoints': [endpoint.info() for endpoint in self.endpoints],
+                }
+
+
+def _provider_uris() -> List[str]:
+    uris = [uri.strip() for uri in TRON_PROVIDER_URIS.split(",") if uri.strip()]
+    return uris or [TRON_PROVIDER_URI or conf_for_name(TRON_NETWORK)["fullnode"]]
+
+
+tron_nodes = TronNodePool(_provider_uris())
+
+
+async def get_tron_client() -> TronNodePool:
+    """
+    Функция-зависимость получения общего набора узлов сети Трон
+    """
+    return tron_nodes
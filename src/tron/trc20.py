@@ -0,0 +1,165 @@
+import os
+import math
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+from dotenv import load_dotenv
+from tronpy.abi import trx_abi
+from tronpy.keys import keccak256
+
+from src.tron.address import normalize_address
+from src.tron.cache import make_cache_backend
+from src.tron.nodes import TronNodePool
+from src.tron.units import to_token_amount
+from src.utils.cache import SingleFlightCache
+
+load_dotenv()
+TRON_TRC20_TOKENS = os.getenv('TRON_TRC20_TOKENS', "")
+TRON_MULTICALL_ADDRESS = os.getenv('TRON_MULTICALL_ADDRESS', "")
+TRON_MULTICALL_BATCH = int(os.getenv('TRON_MULTICALL_BATCH', 50))
+TRON_TRC20_CONCURRENCY = int(os.getenv('TRON_TRC20_CONCURRENCY', 5))
+
+TRC20_METADATA_CACHE_SIZE = 1024
+
+BALANCE_OF = "balanceOf(address)"
+BALANCE_OF_SELECTOR = keccak256(BALANCE_OF.encode())[:4]
+# Multicall2: tryAggregate(false, ...) не откатывает весь пакет из-за одного токена
+TRY_AGGREGATE = "tryAggregate(bool,(address,bytes)[])"
+
+# метаданные токена (decimals, symbol) неизменны - хранятся без срока жизни
+token_metadata = SingleFlightCache(make_cache_backend("trc20_metadata", TRC20_METADATA_CACHE_SIZE, math.inf))
+
+
+def _parse_addresses(value: str) -> List[str]:
+    addresses = []
+    for item in value.split(","):
+        if not item.strip():
+            continue
+        address = normalize_address(item.strip())
+        if address is None:
+            logging.error(f"Invalid TRC-20 contract address skipped: {item.strip()}")
+            continue
+        addresses.append(address)
+    return addresses
+
+
+def _decode_uint(data: bytes) -> Optional[int]:
+    return int.from_bytes(data[:32], "big") if len(data) >= 32 else None
+
+
+class Trc20Balances:
+    """
+    Балансы TRC-20 токенов из настроенного списка: один вызов multicall на пакет токенов
+    (или параллельные вызовы balanceOf, если multicall-контракт не задан)
+    """
+
+    def __init__(self,
+                 tokens: List[str],
+                 multicall: Optional[str] = None,
+                 batch_size: int = TRON_MULTICALL_BATCH,
+                 concurrency: int = TRON_TRC20_CONCURRENCY,
+                 ):
+        self.tokens: List[str] = tokens
+        self.multicall: Optional[str] = multicall or None
+        self.batch_size: int = batch_size
+        self.concurrency: int = concurrency
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.tokens)
+
+    @property
+    def calls(self) -> int:
+        """
+        Количество вызовов узла на балансы одного кошелька (без метаданных - они берутся из кэша)
+        """
+        if self.multicall is None:
+            return len(self.tokens)
+        return math.ceil(len(self.tokens) / self.batch_size)
+
+    async def metadata(self, client: TronNodePool, token: str) -> Dict[str, Any]:
+        """
+        Функция получения метаданных токена (decimals, symbol) через постоянный кэш
+
+        :param client: Общий набор узлов сети Трон
+        :param token: Адрес контракта токена
+        :return: Словарь метаданных
+        """
+        return await token_metadata.get_or_load(token, lambda: self._load_metadata(client, token))
+
+    @staticmethod
+    async def _load_metadata(client: TronNodePool, token: str) -> Dict[str, Any]:
+        decimals, symbol = await asyncio.gather(
+            client.trigger_const_smart_contract_function(token, token, "decimals()", ""),
+            client.trigger_const_smart_contract_function(token, token, "symbol()", ""),
+        )
+        try:
+            symbol = trx_abi.decode_single("string", bytes.fromhex(symbol))
+        except Exception:
+            # часть старых токенов возвращает symbol как bytes32
+            symbol = bytes.fromhex(symbol)[:32].rstrip(b"\x00").decode(errors="ignore")
+        return {'decimals': trx_abi.decode_single("uint8", bytes.fromhex(decimals)), 'symbol': symbol}
+
+    async def balances(self, client: TronNodePool, owner: str) -> List[Dict[str, Any]]:
+        """
+        Функция получения балансов токенов кошелька (ошибка по токену не прерывает запрос)
+
+        :param client: Общий набор узлов сети Трон
+        :param owner: Адрес кошелька
+        :return: Список балансов токенов
+        """
+        metadata, raw = await asyncio.gather(
+            asyncio.gather(*[self.metadata(client, token) for token in self.tokens], return_exceptions=True),
+            self._raw_balances(client, owner),
+        )
+        tokens = []
+        for token, meta, balance_raw in zip(self.tokens, metadata, raw):
+            meta = meta if isinstance(meta, dict) else {}
+            decimals: Optional[int] = meta.get('decimals')
+            balance = None
+            if balance_raw is not None and decimals is not None:
+                balance = to_token_amount(balance_raw, decimals)
+            tokens.append({'contract': token,
+                           'symbol': meta.get('symbol'),
+                           'decimals': decimals,
+                           'balance': balance,
+                           'balance_raw': None if balance_raw is None else str(balance_raw),
+                           })
+        return tokens
+
+    async def _raw_balances(self, client: TronNodePool, owner: str) -> List[Optional[int]]:
+        semaphore = asyncio.Semaphore(self.concurrency)
+        if self.multicall is None:
+            async def balance_of(token: str) -> Optional[int]:
+                async with semaphore:
+                    try:
+                        result = await client.trigger_const_smart_contract_function(
+                            owner, token, BALANCE_OF, trx_abi.encode_single("address", owner).hex())
+                    except Exception as e:
+                        logging.error(f"TRC-20 balanceOf {token} failed: {e}")
+                        return None
+                    return _decode_uint(bytes.fromhex(result))
+
+            return list(await asyncio.gather(*[balance_of(token) for token in self.tokens]))
+
+        async def aggregate(batch: List[str]) -> List[Optional[int]]:
+            call_data = BALANCE_OF_SELECTOR + trx_abi.encode_single("address", owner)
+            parameter = trx_abi.encode_abi(["bool", "(address,bytes)[]"],
+                                           [False, [(token, call_data) for token in batch]])
+            async with semaphore:
+                try:
+                    result = await client.trigger_const_smart_contract_function(
+                        owner, self.multicall, TRY_AGGREGATE, parameter.hex())
+                except Exception as e:
+                    logging.error(f"TRC-20 multicall of {len(batch)} tokens failed: {e}")
+                    return [None] * len(batch)
+            (results,) = trx_abi.decode_abi(["(bool,bytes)[]"], bytes.fromhex(result))
+            return [_decode_uint(data) if success else None for success, data in results]
+
+        batches = [self.tokens[start:start + self.batch_size]
+                   for start in range(0, len(self.tokens), self.batch_size)]
+        results = await asyncio.gather(*[aggregate(batch) for batch in batches])
+        return [balance for batch in results for balance in batch]
+
+
+trc20_balances = Trc20Balances(_parse_addresses(TRON_TRC20_TOKENS), normalize_address(TRON_MULTICALL_ADDRESS))
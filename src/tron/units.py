@@ -0,0 +1,17 @@
+from decimal import Decimal
+
+SUN_PER_TRX = 1_000_000
+
+
+def to_token_amount(balance_raw: int, decimals: int) -> Decimal:
+    """
+    Функция перевода целого баланса токена в десятичное значение с учетом decimals (без потери точности)
+
+    :param balance_raw: Баланс в минимальных единицах токена
+    :param decimals: Количество знаков после запятой
+    :return: Баланс токена
+    """
+    if decimals <= 0:
+        return Decimal(balance_raw)
+    digits = str(balance_raw).rjust(decimals + 1, "0")
+    return Decimal(f"{digits[:-decimals]}.{digits[-decimals:]}")
@@ -0,0 +1,334 @@
+import os
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+SHARED_CACHE_PRUNE_EVERY = 256
+SHARED_CACHE_LEASE_POLL = 0.005
+# ожидание блокировки записи общего файла (сек.): дольше - запись пропускается, чтение считается промахом
+SHARED_CACHE_BUSY_TIMEOUT = 0.1
+# метка Decimal (балансы токенов) в JSON-значениях общего кэша
+DECIMAL_TAG = "__decimal__"
+
+
+class AbstractCache(ABC):
+    # True - операции обращаются к файлу и выполняются SingleFlightCache в отдельном потоке
+    blocking: bool = False
+
+    @abstractmethod
+    def get(self, key: Hashable) -> Optional[Any]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete(self, key: Hashable) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def __len__(self) -> int:
+        raise NotImplementedError
+
+    def acquire_lease(self, key: Hashable, ttl: float) -> Optional[bool]:
+        # право загрузить значение по ключу (None - хранилище занято, аренда неизвестна);
+        # в кэше одного процесса промахи уже объединяет SingleFlightCache
+        return True
+
+    def release_lease(self, key: Hashable) -> None:
+        return None
+
+
+class TTLCache(AbstractCache):
+    """
+    Кэш в памяти процесса с временем жизни записей и вытеснением LRU
+    """
+
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.evictions: int = 0
+        self._data: OrderedDict[Hashable, Tuple[float, Any]] = OrderedDict()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        item = self._data.get(key)
+        if item is None:
+            return None
+        expires_at, value = item
+        if expires_at < time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        self._data[key] = (time.monotonic() + (self.ttl if ttl is None else ttl), value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+def _default(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return {DECIMAL_TAG: str(value)}
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def _object_hook(value: Dict[str, Any]) -> Any:
+    if len(value) == 1 and DECIMAL_TAG in value:
+        return Decimal(value[DECIMAL_TAG])
+    return value
+
+
+def dump_value(value: Any) -> str:
+    """
+    Функция сериализации значения общего кэша в JSON (Decimal - строкой с меткой)
+    """
+    return json.dumps(value, default=_default, separators=(",", ":"))
+
+
+def load_value(data: Any) -> Any:
+    """
+    Функция чтения значения общего кэша из JSON: файл доступен всем процессам хоста,
+    поэтому значения не исполняются при чтении (в отличие от pickle)
+    """
+    return json.loads(data, object_hook=_object_hook)
+
+
+class SharedSQLiteCache(AbstractCache):
+    """
+    Кэш в файле SQLite, общий для всех процессов (воркеров) на одном хосте: время жизни записей,
+    ограничение размера (вытесняются записи, истекающие раньше) и аренда загрузки ключа между процессами.
+    Блокировка файла дольше busy_timeout не ждется: чтение - промах, запись пропускается
+    """
+    blocking = True
+
+    def __init__(self, path: str, namespace: str, maxsize: int, ttl: float,
+                 busy_timeout: float = SHARED_CACHE_BUSY_TIMEOUT):
+        self.path: str = path
+        self.namespace: str = namespace
+        self.maxsize: int = maxsize
+        self.ttl: float = ttl
+        self.busy_timeout: float = busy_timeout
+        self.evictions: int = 0
+        self.busy: int = 0
+        self._writes: int = 0
+        self._local: threading.local = threading.local()
+
+    @property
+    def connection(self) -> sqlite3.Connection:
+        # соединение SQLite нельзя наследовать при fork и делить между потоками - у каждого потока процесса свое
+        local = self._local
+        if getattr(local, 'connection', None) is None or local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, isolation_level=None, timeout=self.busy_timeout)
+            connection.execute("PRAGMA journal_mode=WAL")
+            # потеря кэша при сбое питания допустима - без fsync на каждую запись
+            connection.execute("PRAGMA synchronous=OFF")
+            connection.execute("PRAGMA mmap_size=67108864")
+            connection.execute("CREATE TABLE IF NOT EXISTS cache (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                               "expires_at REAL NOT NULL, value BLOB NOT NULL, "
+                               "PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+            connection.execute("CREATE INDEX IF NOT EXISTS ix_cache_expires_at ON cache (namespace, expires_at)")
+            connection.execute("CREATE TABLE IF NOT EXISTS lease (namespace TEXT NOT NULL, key TEXT NOT NULL, "
+                               "expires_at REAL NOT NULL, PRIMARY KEY (namespace, key)) WITHOUT ROWID")
+            local.connection, local.pid = connection, os.getpid()
+        return local.connection
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        try:
+            row = self.connection.execute("SELECT value FROM cache "
+                                          "WHERE namespace = ? AND key = ? AND expires_at >= ?",
+                                          (self.namespace, repr(key), time.time())).fetchone()
+        except sqlite3.OperationalError:
+            self.busy += 1
+            return None
+        if row is None:
+            return None
+        try:
+            return load_value(row[0])
+        except (TypeError, ValueError):
+            # запись прежнего формата или поврежденная запись - промах
+            return None
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None) -> None:
+        expires_at = time.time() + (self.ttl if ttl is None else ttl)
+        try:
+            self.connection.execute("INSERT OR REPLACE INTO cache (namespace, key, expires_at, value) "
+                                    "VALUES (?, ?, ?, ?)",
+                                    (self.namespace, repr(key), expires_at, dump_value(value)))
+            self._writes += 1
+            if self._writes % SHARED_CACHE_PRUNE_EVERY == 0:
+                self.prune()
+        except sqlite3.OperationalError:
+            self.busy += 1
+
+    def prune(self) -> None:
+        """
+        Функция удаления истекших записей и вытеснения записей сверх размера кэша
+        """
+        connection = self.connection
+        connection.execute("DELETE FROM cache WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        connection.execute("DELETE FROM lease WHERE namespace = ? AND expires_at < ?", (self.namespace, time.time()))
+        excess = len(self) - self.maxsize
+        if excess > 0:
+            connection.execute("DELETE FROM cache WHERE namespace = ? AND key IN (SELECT key FROM cache "
+                               "WHERE namespace = ? ORDER BY expires_at LIMIT ?)",
+                               (self.namespace, self.namespace, excess))
+            self.evictions += excess
+
+    def delete(self, key: Hashable) -> None:
+        try:
+            self.connection.execute("DELETE FROM cache WHERE namespace = ? AND key = ?",
+                                    (self.namespace, repr(key)))
+        except sqlite3.OperationalError:
+            self.busy += 1
+
+    def clear(self) -> None:
+        try:
+            self.connection.execute("DELETE FROM cache WHERE namespace = ?", (self.namespace,))
+            self.connection.execute("DELETE FROM lease WHERE namespace = ?", (self.namespace,))
+        except sqlite3.OperationalError:
+            self.busy += 1
+
+    def __len__(self) -> int:
+        try:
+            return self.connection.execute("SELECT COUNT(*) FROM cache WHERE namespace = ?",
+                                           (self.namespace,)).fetchone()[0]
+        except sqlite3.OperationalError:
+            # размер неизвестен - вытеснение в prune пропускается до следующего раза
+            self.busy += 1
+            return 0
+
+    def acquire_lease(self, key: Hashable, ttl: float) -> Optional[bool]:
+        # аренда занимается, если ее нет или предыдущая истекла (процесс-владелец мог завершиться)
+        now = time.time()
+        try:
+            cursor = self.connection.execute(
+                "INSERT INTO lease (namespace, key, expires_at) VALUES (?, ?, ?) ON CONFLICT (namespace, key) "
+                "DO UPDATE SET expires_at = excluded.expires_at WHERE lease.expires_at < ?",
+                (self.namespace, repr(key), now + ttl, now))
+        except sqlite3.OperationalError:
+            self.busy += 1
+            return None
+        return cursor.rowcount == 1
+
+    def release_lease(self, key: Hashable) -> None:
+        try:
+            self.connection.execute("DELETE FROM lease WHERE namespace = ? AND key = ?",
+                                    (self.namespace, repr(key)))
+        except sqlite3.OperationalError:
+            # аренда истечет сама через lease_timeout
+            self.busy += 1
+
+
+class SingleFlightCache:
+    """
+    Кэш с объединением одновременных промахов по одному ключу в один вызов загрузчика
+    """
+
+    def __init__(self, backend: AbstractCache, lease_timeout: float = 10.0):
+        self.backend: AbstractCache = backend
+        self.lease_timeout: float = lease_timeout
+        self.hits: int = 0
+        self.misses: int = 0
+        self.coalesced: int = 0
+        self.waited: int = 0
+        self._in_flight: Dict[Hashable, asyncio.Future] = {}
+
+    async def get_or_load(self, key: Hashable, loader: Callable[[], Awaitable[Any]],
+                          ttl: Optional[float] = None) -> Any:
+        """
+        Функция получения значения из кэша или его загрузки при промахе
+
+        :param key: Ключ кэша
+        :param loader: Функция загрузки значения
+        :param ttl: Время жизни записи (по умолчанию - время жизни кэша)
+        :return: Значение
+        """
+        value = await self._backend(self.backend.get, key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        task = self._in_flight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return await asyncio.shield(task)
+
+        self.misses += 1
+        task = asyncio.ensure_future(self._load(key, loader, ttl))
+        self._in_flight[key] = task
+        return await asyncio.shield(task)
+
+    async def _backend(self, method: Callable, *args) -> Any:
+        # операции с файлом не блокируют цикл событий
+        if self.backend.blocking:
+            return await asyncio.to_thread(method, *args)
+        return method(*args)
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]], ttl: Optional[float]) -> Any:
+        try:
+            # ключ уже загружает другой процесс - ждем его результата в общем кэше вместо повторного запроса
+            deadline = time.monotonic() + self.lease_timeout
+            while not (leased := await self._backend(self.backend.acquire_lease, key, self.lease_timeout)):
+                if leased is None or time.monotonic() >= deadline:
+                    # хранилище занято или владелец аренды не успел - загружаем без аренды
+                    break
+                await asyncio.sleep(SHARED_CACHE_LEASE_POLL)
+                value = await self._backend(self.backend.get, key)
+                if value is not None:
+                    self.waited += 1
+                    return value
+            if leased:
+                # другой процесс мог записать значение и снять аренду между промахом и получением аренды
+                value = await self._backend(self.backend.get, key)
+                if value is not None:
+                    self.waited += 1
+                    await self._backend(self.backend.release_lease, key)
+                    return value
+            try:
+                value = await loader()
+                await self._backend(self.backend.set, key, value, ttl)
+                return value
+            finally:
+                if leased:
+                    await self._backend(self.backend.release_lease, key)
+        finally:
+            self._in_flight.pop(key, None)
+
+    async def stats(self) -> Dict[str, Any]:
+        """
+        Функция получения счетчиков кэша (waited - часть misses: значение загрузил другой процесс)
+        """
+        requests = self.hits + self.misses + self.coalesced
+        return {'hits': self.hits,
+                'misses': self.misses,
+                'coalesced': self.coalesced,
+                'waited': self.waited,
+                'hit_ratio': (self.hits + self.coalesced) / requests if requests else 0.0,
+                'size': await self._backend(len, self.backend),
+                'in_flight': len(self._in_flight),
+                'evictions': getattr(self.backend, 'evictions', 0),
+                'busy': getattr(self.backend, 'busy', 0),
+                }
@@ -0,0 +1,37 @@
+from typing import List, Sequence
+
+
+def lttb(xs: Sequence[float], ys: Sequence[float], threshold: int) -> List[int]:
+    """
+    Функция прореживания ряда алгоритмом Largest-Triangle-Three-Buckets: из каждой корзины выбирается точка,
+    образующая наибольший треугольник с предыдущей выбранной точкой и средним следующей корзины
+
+    :param xs: Значения по оси X (по возрастанию)
+    :param ys: Значения по оси Y
+    :param threshold: Количество точек результата
+    :return: Индексы выбранных точек (первая и последняя точки ряда всегда входят)
+    """
+    length = len(xs)
+    if threshold >= length:
+        return list(range(length))
+    if threshold < 3:
+        return [0, length - 1][:max(threshold, 0)]
+
+    every = (length - 2) / (threshold - 2)
+    selected = [0]
+    a = 0
+    for i in range(threshold - 2):
+        avg_start = int((i + 1) * every) + 1
+        avg_end = min(int((i + 2) * every) + 1, length)
+        avg_x = sum(xs[avg_start:avg_end]) / (avg_end - avg_start)
+        avg_y = sum(ys[avg_start:avg_end]) / (avg_end - avg_start)
+
+        best, best_area = int(i * every) + 1, -1.0
+        for j in range(int(i * every) + 1, int((i + 1) * every) + 1):
+            area = abs((xs[a] - avg_x) * (ys[j] - ys[a]) - (xs[a] - xs[j]) * (avg_y - ys[a]))
+            if area > best_area:
+                best, best_area = j, area
+        selected.append(best)
+        a = best
+    selected.append(length - 1)
+    return selected
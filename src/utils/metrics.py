@@ -0,0 +1,216 @@
+import time
+from bisect import bisect_left
+from typing import Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+LabelValues = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(str(value))}"' for name, value in zip(names, values)) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class Metric:
+    """
+    Базовая метрика: имя, описание и значения по наборам меток
+    """
+    type: str = "untyped"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        self.name: str = name
+        self.description: str = description
+        self.labelnames: Tuple[str, ...] = tuple(labelnames)
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        return tuple(str(labels[name]) for name in self.labelnames)
+
+    def samples(self) -> Iterable[Tuple[str, Sequence[str], Sequence[str], float]]:
+        raise NotImplementedError
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.type}"]
+        for suffix, names, values, value in self.samples():
+            lines.append(f"{self.name}{suffix}{_format_labels(names, values)} {_format_value(value)}")
+        return lines
+
+
+class Counter(Metric):
+    """
+    Монотонно растущий счетчик
+    """
+    type = "counter"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, description, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def value(self, **labels: str) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        for key, value in self._values.items():
+            yield "", self.labelnames, key, value
+
+
+class Gauge(Metric):
+    """
+    Текущее значение (задается явно или вычисляется функцией при каждом сборе метрик)
+    """
+    type = "gauge"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 function: Optional[Callable[[], float]] = None):
+        super().__init__(name, description, labelnames)
+        self.function: Optional[Callable[[], float]] = function
+        self._values: Dict[LabelValues, float] = {}
+
+    def set(self, value: float, **labels: str) -> None:
+        self._values[self._key(labels)] = value
+
+    def inc(self, value: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + value
+
+    def dec(self, value: float = 1.0, **labels: str) -> None:
+        self.inc(-value, **labels)
+
+    def value(self, **labels: str) -> float:
+        if self.function is not None:
+            return self.function()
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self):
+        if self.function is not None:
+            yield "", (), (), self.function()
+            return
+        for key, value in self._values.items():
+            yield "", self.labelnames, key, value
+
+
+class _HistogramTimer:
+    __slots__ = ("histogram", "key", "started")
+
+    def __init__(self, histogram: "Histogram", key: LabelValues):
+        self.histogram: Histogram = histogram
+        self.key: LabelValues = key
+
+    def __enter__(self) -> "_HistogramTimer":
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.histogram._observe(self.key, time.perf_counter() - self.started)
+
+
+class Histogram(Metric):
+    """
+    Гистограмма распределения значений (задержек) по корзинам
+    """
+    type = "histogram"
+
+    def __init__(self, name: str, description: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, description, labelnames)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets)) + (float("inf"),)
+        # по набору меток: [количество в каждой корзине (не накопительно), сумма]
+        self._values: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def _observe(self, key: LabelValues, value: float) -> None:
+        counts_sum = self._values.get(key)
+        if counts_sum is None:
+            counts_sum = self._values[key] = ([0] * len(self.buckets), [0.0])
+        counts, total = counts_sum
+        counts[bisect_left(self.buckets, value)] += 1
+        total[0] += value
+
+    def observe(self, value: float, **labels: str) -> None:
+        self._observe(self._key(labels), value)
+
+    def time(self, **labels: str) -> _HistogramTimer:
+        """
+        Функция замера длительности блока with в секундах
+
+        :param labels: Значения меток
+        :return: Контекстный менеджер замера
+        """
+        return _HistogramTimer(self, self._key(labels))
+
+    def count(self, **labels: str) -> int:
+        counts_sum = self._values.get(self._key(labels))
+        return sum(counts_sum[0]) if counts_sum else 0
+
+    def samples(self):
+        names = self.labelnames + ("le",)
+        for key, (counts, total) in self._values.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets, counts):
+                cumulative += count
+                yield "_bucket", names, key + (_format_value(bound),), cumulative
+            yield "_sum", self.labelnames, key, total[0]
+            yield "_count", self.labelnames, key, cumulative
+
+
+class MetricsRegistry:
+    """
+    Реестр метрик процесса с выводом в текстовом формате Prometheus
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, description: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, description, labelnames))
+
+    def gauge(self, name: str, description: str, labelnames: Sequence[str] = (),
+              function: Optional[Callable[[], float]] = None) -> Gauge:
+        return self.register(Gauge(name, description, labelnames, function))
+
+    def histogram(self, name: str, description: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self.register(Histogram(name, description, labelnames, buckets))
+
+    def render(self) -> str:
+        """
+        Функция вывода всех метрик в текстовом формате Prometheus (version 0.0.4)
+        """
+        lines = []
+        for metric in self._metrics.values():
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+
+registry = MetricsRegistry()
+
+# метрики, общие для слоев приложения
+http_requests = registry.counter("http_requests_total", "HTTP requests", ("method", "route", "status"))
+http_request_duration = registry.histogram("http_request_duration_seconds", "HTTP request latency",
+                                           ("method", "route"))
+http_requests_in_flight = registry.gauge("http_requests_in_flight", "HTTP requests being processed")
+stage_duration = registry.histogram("stage_duration_seconds", "Latency of request processing stages", ("stage",))
+tron_rpc_duration = registry.histogram("tron_rpc_duration_seconds", "Tron node RPC latency", ("method",))
+tron_rpc_in_flight = registry.gauge("tron_rpc_in_flight", "Tron node RPCs in progress")
+tron_upstream_errors = registry.counter("tron_upstream_errors_total", "Tron node RPC errors by type",
+                                        ("method", "type"))
@@ -0,0 +1,35 @@
+import base64
+from datetime import datetime
+from typing import Optional, Tuple
+
+CursorKey = Tuple[datetime, int]
+
+
+def encode_cursor(key: Optional[CursorKey]) -> Optional[str]:
+    """
+    Функция кодирования ключа (timestamp, id) последней записи в непрозрачный курсор
+
+    :param key: Кортеж (timestamp, id)
+    :return: Строка курсора
+    """
+    if key is None:
+        return None
+    timestamp, row_id = key
+    raw = f"{timestamp.isoformat()}|{row_id}".encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> CursorKey:
+    """
+    Функция декодирования курсора в ключ (timestamp, id)
+
+    :param cursor: Строка курсора
+    :return: Кортеж (timestamp, id)
+    :raises ValueError: Если курсор некорректен
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)).decode()
+        timestamp, row_id = raw.split("|")
+        return datetime.fromisoformat(timestamp), int(row_id)
+    except Exception:
+        raise ValueError("Invalid cursor")
@@ -0,0 +1,149 @@
+import math
+import time
+import asyncio
+from collections import OrderedDict, deque
+from typing import Any, Deque, Dict, Optional, Tuple
+
+
+class Overloaded(Exception):
+    """
+    Запрос отклонен контролем допуска (очередь заполнена или истек срок ожидания)
+    """
+
+    def __init__(self, status_code: int, detail: str, retry_after: int):
+        super().__init__(detail)
+        self.status_code: int = status_code
+        self.detail: str = detail
+        self.retry_after: int = retry_after
+
+
+class TokenBucket:
+    """
+    Ограничитель частоты "корзина токенов": rate токенов в секунду, не более burst накопленных
+    """
+
+    def __init__(self, rate: float, burst: float):
+        self.rate: float = rate
+        self.burst: float = max(burst, 1.0)
+        self.tokens: float = self.burst
+        self.updated: float = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def try_take(self, cost: float = 1.0) -> bool:
+        self._refill()
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True
+        return False
+
+    def wait_time(self, cost: float = 1.0) -> float:
+        self._refill()
+        return max(cost - self.tokens, 0.0) / self.rate
+
+
+class AdmissionController:
+    """
+    Контроль допуска запросов к внешнему API: корзина токенов, ограниченная очередь ожидания
+    со сроком и поочередная (по клиентам) выдача токенов, чтобы один клиент не вытеснял остальных
+    """
+
+    def __init__(self,
+                 rate: float,
+                 burst: float,
+                 max_queue: int,
+                 max_queue_per_client: int,
+                 max_wait: float,
+                 ):
+        self.bucket: Optional[TokenBucket] = TokenBucket(rate, burst) if rate > 0 else None
+        self.max_queue: int = max_queue
+        self.max_queue_per_client: int = max_queue_per_client
+        self.max_wait: float = max_wait
+        self.admitted: int = 0
+        self.rejected: int = 0
+        self.timed_out: int = 0
+        self._waiting: OrderedDict[str, Deque[Tuple[asyncio.Future, float]]] = OrderedDict()
+        self._queued: int = 0
+        self._dispatcher: Optional[asyncio.Task] = None
+
+    def _retry_after(self, cost: float) -> int:
+        return max(math.ceil((self._queued + 1) * cost / self.bucket.rate), 1)
+
+    async def acquire(self, client_key: str = "", cost: float = 1.0) -> None:
+        """
+        Функция получения разрешения на запрос к внешнему API (ожидает в очереди при превышении частоты)
+
+        :param client_key: Ключ клиента (IP-адрес) для справедливой очереди
+        :param cost: Стоимость запроса в токенах
+        :raises Overloaded: Если очередь заполнена или истек срок ожидания
+        """
+        if self.bucket is None:
+            return
+        if not self._waiting and self.bucket.try_take(cost):
+            self.admitted += 1
+            return
+
+        if self._queued >= self.max_queue:
+            self.rejected += 1
+            raise Overloaded(503, "Upstream queue is full", self._retry_after(cost))
+        queue = self._waiting.get(client_key)
+        if queue is not None and len(queue) >= self.max_queue_per_client:
+            self.rejected += 1
+            raise Overloaded(429, "Too many queued requests from client", self._retry_after(cost))
+
+        future = asyncio.get_running_loop().create_future()
+        item = (future, cost)
+        self._waiting.setdefault(client_key, deque()).append(item)
+        self._queued += 1
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch())
+
+        try:
+            await asyncio.wait_for(future, self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            self._discard(client_key, item)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.timed_out += 1
+            raise Overloaded(503, "Upstream queue wait timed out", self._retry_after(cost))
+        self.admitted += 1
+
+    def _discard(self, client_key: str, item: Tuple[asyncio.Future, float]) -> None:
+        queue = self._waiting.get(client_key)
+        if queue is None or item not in queue:
+            return
+        queue.remove(item)
+        self._queued -= 1
+        if not queue:
+            del self._waiting[client_key]
+
+    async def _dispatch(self) -> None:
+        while self._waiting:
+            client_key, queue = next(iter(self._waiting.items()))
+            future, cost = queue[0]
+            if not self.bucket.try_take(cost):
+                await asyncio.sleep(self.bucket.wait_time(cost))
+                continue
+            queue.popleft()
+            self._queued -= 1
+            if queue:
+                # следующий токен - следующему клиенту
+                self._waiting.move_to_end(client_key)
+            else:
+                del self._waiting[client_key]
+            if future.done():
+                self.bucket.tokens += cost
+            else:
+                future.set_result(None)
+
+    def stats(self) -> Dict[str, Any]:
+        return {'enabled': self.bucket is not None,
+                'queued': self._queued,
+                'clients_waiting': len(self._waiting),
+                'admitted': self.admitted,
+                'rejected': self.rejected,
+                'timed_out': self.timed_out,
+                }
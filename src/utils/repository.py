@@ -1,7 +1,15 @@
+import calendar
 from abc import ABC, abstractmethod
+from datetime import datetime
+from typing import Any, AsyncGenerator, List, Optional, Sequence, Tuple
 
-from sqlalchemy import select, insert
-from src.database import async_session
+from sqlalchemy import BigInteger, cast, delete, func, select, insert, or_, Row, Select
+from src.database import async_session, IS_SQLITE
+from src.utils.metrics import stage_duration
+from src.utils.pagination import CursorKey
+
+# id в одном условии IN (ограничение числа параметров запроса SQLite)
+IN_CHUNK_SIZE = 1000
 
 
 class AbstractRepository(ABC):
@@ -11,6 +19,14 @@ class AbstractRepository(ABC):
     async def add_one(self, *args, **kwargs):
         raise NotImplemented
 
+    @abstractmethod
+    async def add_one_returning(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def add_many(self, *args, **kwargs):
+        raise NotImplementedError
+
     @abstractmethod
     async def get_one(self, *args, **kwargs):
         raise NotImplemented
@@ -19,32 +35,199 @@ class AbstractRepository(ABC):
     async def get_all(self, *args, **kwargs):
         raise NotImplemented
 
+    @abstractmethod
+    async def get_by_address(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    def stream_all(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def get_series(self, *args, **kwargs):
+        raise NotImplementedError
+
+    @abstractmethod
+    async def delete_many(self, *args, **kwargs):
+        raise NotImplementedError
+
 
 class SQLAlchemyRepository(AbstractRepository):
     model = None
 
+    async def _to_rows(self, data: List[dict]) -> List[dict]:
+        # ключи, которых нет среди столбцов таблицы (например, balance_sun), отбрасываются
+        columns = self.model.__table__.c
+        return [{key: value for key, value in row.items() if key in columns} for row in data]
+
+    def _read_model(self, row, data: dict):
+        return row.to_read_model()
+
+    async def _after_insert(self, session, data: List[dict], ids: Sequence[int]) -> None:
+        # дополнительные изменения в той же транзакции, что и вставка строк (например, сводные таблицы)
+        return None
+
+    def _after_commit(self, data: List[dict]) -> None:
+        # действия после фиксации вставки (например, сброс закэшированной версии данных)
+        return None
+
+    async def _after_delete(self, session, ids: Sequence[int]) -> None:
+        # дополнительные изменения в той же транзакции, что и удаление строк (дочерние строки, счетчики)
+        return None
+
     async def add_one(self, data: dict) -> int:
+        with stage_duration.time(stage="db_insert"):
+            values = (await self._to_rows([data]))[0]
+            async with async_session() as session:
+                stmt = insert(self.model).values(**values).returning(self.model.id)
+                history_id = (await session.execute(stmt)).scalar_one()
+                await self._after_insert(session, [data], [history_id])
+                await session.commit()
+            self._after_commit([data])
+            return history_id
+
+    async def add_one_returning(self, data: dict) -> Tuple[int, Any]:
+        # строка целиком (включая серверные значения по умолчанию) возвращается тем же запросом
+        with stage_duration.time(stage="db_insert"):
+            values = (await self._to_rows([data]))[0]
+            async with async_session() as session:
+                stmt = insert(self.model).values(**values).returning(self.model)
+                row = (await session.scalars(stmt)).one()
+                await self._after_insert(session, [data], [row.id])
+                await session.commit()
+            self._after_commit([data])
+            return row.id, self._read_model(row, data)
+
+    async def add_many(self, data: List[dict]) -> List[int]:
+        if not data:
+            return []
+        with stage_duration.time(stage="db_insert"):
+            rows = await self._to_rows(data)
+            async with async_session() as session:
+                stmt = insert(self.model).returning(self.model.id, sort_by_parameter_order=True)
+                ids = list((await session.execute(stmt, rows)).scalars().all())
+                await self._after_insert(session, data, ids)
+                await session.commit()
+            self._after_commit(data)
+            return ids
+
+    async def delete_many(self, ids: Sequence[int]) -> int:
+        if not ids:
+            return 0
+        deleted = 0
+        with stage_duration.time(stage="db_delete"):
+            async with async_session() as session:
+                for start in range(0, len(ids), IN_CHUNK_SIZE):
+                    stmt = delete(self.model).where(self.model.id.in_(ids[start:start + IN_CHUNK_SIZE]))
+                    deleted += (await session.execute(stmt)).rowcount
+                await self._after_delete(session, ids)
+                await session.commit()
+            self._after_commit([])
+            return deleted
+
+    async def count_existing(self, ids: Sequence[int]) -> int:
+        count = 0
         async with async_session() as session:
-            stmt = insert(self.model).values(**data).returning(self.model.id)
-            result = await session.execute(stmt)
-            await session.flush()
-            await session.commit()
-            return result.scalar_one()
+            for start in range(0, len(ids), IN_CHUNK_SIZE):
+                query = select(func.count()).where(self.model.id.in_(ids[start:start + IN_CHUNK_SIZE]))
+                count += (await session.execute(query)).scalar()
+        return count
 
     async def get_one(self, history_id):
-        async with async_session() as session:
-            query = select(self.model).filter_by(id=history_id)
-            result = await session.execute(query)
-            log = result.all()[0][0].to_read_model()
-            return log
+        with stage_duration.time(stage="db_query"):
+            async with async_session() as session:
+                query = select(self.model).filter_by(id=history_id)
+                result = await session.execute(query)
+                log = result.scalar_one().to_read_model()
+                return log
+
+    def _newest_first(self, per_page: int, cursor: Optional[CursorKey] = None) -> Select:
+        query = (select(self.model).
+                 order_by(self.model.timestamp.desc(), self.model.id.desc()).
+                 limit(per_page + 1))
+        if cursor is not None:
+            # keyset-пагинация: строки строго "старше" ключа (timestamp, id) последней записи
+            timestamp, row_id = cursor
+            query = query.where(self.model.timestamp <= timestamp,
+                                or_(self.model.timestamp < timestamp, self.model.id < row_id))
+        return query
 
-    async def get_all(self, page, per_page, logs):
-        offset: int = (page - 1) * per_page
+    async def _fetch_page(self, query: Select, per_page: int, **read_kwargs) -> Tuple[list, Optional[CursorKey]]:
+        with stage_duration.time(stage="db_query"):
+            async with async_session() as session:
+                rows = (await session.execute(query)).scalars().all()
+        next_key = (rows[per_page - 1].timestamp, rows[per_page - 1].id) if len(rows) > per_page else None
+        logs = [row.to_read_model(**read_kwargs) for row in rows[:per_page]]
+        return logs, next_key
+
+    async def get_all(self, page: int, per_page: int,
+                      cursor: Optional[CursorKey] = None) -> Tuple[list, Optional[CursorKey]]:
+        query = self._newest_first(per_page, cursor)
+        if cursor is None:
+            query = query.offset((page - 1) * per_page)
+        return await self._fetch_page(query, per_page)
+
+    async def get_by_address(self, address: str, per_page: int,
+                             cursor: Optional[CursorKey] = None) -> Tuple[list, Optional[CursorKey]]:
+        query = self._newest_first(per_page, cursor).where(self.model.address == address)
+        return await self._fetch_page(query, per_page)
+
+    async def stream_all(self, columns: Sequence[str],
+                         address: Optional[str] = None,
+                         since: Optional[datetime] = None,
+                         until: Optional[datetime] = None,
+                         chunk_size: int = 1000,
+                         limit: Optional[int] = None) -> AsyncGenerator[Sequence[Row], None]:
+        query = (select(*[getattr(self.model, column) for column in columns]).
+                 order_by(self.model.timestamp, self.model.id).
+                 limit(limit).
+                 execution_options(yield_per=chunk_size))
+        if address is not None:
+            query = query.where(self.model.address == address)
+        if since is not None:
+            query = query.where(self.model.timestamp >= since)
+        if until is not None:
+            query = query.where(self.model.timestamp < until)
         async with async_session() as session:
-            query = (select(self.model).
-                     order_by(self.model.timestamp.desc()).
-                     offset(offset).
-                     limit(per_page))
-            logs = await session.execute(query)
-            logs = [row[0].to_read_model() for row in logs.all()]
-            return logs
+            result = await session.stream(query)
+            async for rows in result.partitions():
+                yield rows
+
+    def _epoch_seconds(self):
+        # метка времени строки в секундах эпохи (UTC) - для разбиения периода на корзины
+        if IS_SQLITE:
+            return cast(func.strftime('%s', self.model.timestamp), BigInteger)
+        return cast(func.floor(func.extract('epoch', self.model.timestamp)), BigInteger)
+
+    async def _series(self, where, since: datetime, until: datetime, width: int, values: dict) -> List[dict]:
+        """
+        Функция агрегации строк периода по корзинам ширины width секунд средствами БД:
+        количество строк, минимум и максимум каждого значения и значения последней строки корзины
+
+        :param where: Условие отбора строк (адрес)
+        :param since: Начало периода (включительно)
+        :param until: Конец периода (не включительно)
+        :param width: Ширина корзины (сек.)
+        :param values: Словарь имя - столбец агрегируемых значений
+        :return: Список словарей корзин по возрастанию номера корзины
+        """
+        bucket = ((self._epoch_seconds() - calendar.timegm(since.timetuple())) // width).label('bucket')
+        aggregates = [bucket, func.count().label('count'), func.max(self.model.id).label('last_id')]
+        for name, column in values.items():
+            aggregates += [func.min(column).label(f"{name}_min"), func.max(column).label(f"{name}_max")]
+        buckets = (select(*aggregates).
+                   where(where, self.model.timestamp >= since, self.model.timestamp < until).
+                   group_by(bucket).
+                   subquery())
+        # последняя строка корзины - с наибольшим id (id растут вместе со временем вставки)
+        query = (select(buckets, *[column.label(f"{name}_last") for name, column in values.items()]).
+                 join(self.model, self.model.id == buckets.c.last_id).
+                 order_by(buckets.c.bucket))
+        with stage_duration.time(stage="db_query"):
+            async with async_session() as session:
+                rows = (await session.execute(query)).mappings().all()
+        return [dict(row) for row in rows]
+
+    async def get_series(self, address: str, since: datetime, until: datetime, width: int) -> List[dict]:
+        values = {'balance': self.model.balance, 'bandwidth': self.model.bandwidth, 'energy': self.model.energy}
+        return await self._series(self.model.address == address, since, until, width, values)
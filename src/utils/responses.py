@@ -0,0 +1,74 @@
+from typing import Any, Dict, Mapping, Optional, Type, get_args, get_origin
+from fastapi.responses import Response
+from pydantic import BaseModel
+from pydantic_core import to_json
+
+
+def _list_item_schema(annotation: Any) -> Optional[Type[BaseModel]]:
+    for arg in (annotation, *get_args(annotation)):
+        if get_origin(arg) is list:
+            item = get_args(arg)[0]
+            return item if isinstance(item, type) and issubclass(item, BaseModel) else None
+    return None
+
+
+def project(schema: Type[BaseModel], data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Функция выбора из словаря только полей схемы (включая вложенные списки моделей).
+    Поля, которых нет в данных, получают значение по умолчанию (None) - как при ответе через response_model
+
+    :param schema: Схема ответа
+    :param data: Словарь данных
+    :return: Словарь всех полей схемы
+    """
+    projected = {}
+    for name, field in schema.model_fields.items():
+        if name not in data:
+            projected[name] = None if field.is_required() else field.get_default(call_default_factory=True)
+            continue
+        value = data[name]
+        item_schema = _list_item_schema(field.annotation)
+        if item_schema is not None and isinstance(value, list):
+            value = [project(item_schema, item) for item in value]
+        projected[name] = value
+    return projected
+
+
+def trusted_response(schema: Type[BaseModel], data: Dict[str, Any], status_code: int = 200) -> Response:
+    """
+    Функция сериализации ответа из данных, собранных самим приложением, без повторной валидации схемой
+
+    :param schema: Схема ответа (задает состав полей)
+    :param data: Словарь данных ответа
+    :param status_code: Код ответа
+    :return: JSON-ответ
+    """
+    return Response(content=to_json(project(schema, data)), status_code=status_code, media_type="application/json")
+
+
+def validator_headers(etag: str) -> Dict[str, str]:
+    """
+    Функция заголовков проверки актуальности ответа: клиент повторяет запрос с If-None-Match
+
+    :param etag: Тег версии данных (без кавычек)
+    :return: Словарь заголовков ответа
+    """
+    return {'ETag': f'"{etag}"',
+            'Cache-Control': "no-cache",
+            }
+
+
+def not_modified(request_headers: Mapping[str, str], etag: str) -> bool:
+    """
+    Функция проверки условного запроса по If-None-Match (RFC 9110). If-Modified-Since не учитывается:
+    время с точностью до секунды не различает версии, записанные в одну секунду
+
+    :param request_headers: Заголовки запроса
+    :param etag: Текущий тег версии данных (без кавычек)
+    :return: True, если у клиента актуальная версия (ответ 304)
+    """
+    if_none_match = request_headers.get("if-none-match")
+    if if_none_match is None:
+        return False
+    tags = [tag.strip().removeprefix("W/").strip('"') for tag in if_none_match.split(",")]
+    return "*" in tags or etag in tags
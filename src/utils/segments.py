@@ -0,0 +1,123 @@
+import os
+import sys
+import json
+import math
+import zlib
+import struct
+from array import array
+from itertools import accumulate
+from typing import Any, Dict, List, Optional, Sequence
+
+SEGMENT_MAGIC = b"TRSEG\x00\x01\n"
+SEGMENT_COMPRESSION_LEVEL = 9
+
+# типы столбцов сегмента:
+# int - целые без NULL, дельта-кодирование (возрастающие id и метки времени сжимаются в разы лучше)
+# float - числа с плавающей точкой, NULL хранится как NaN
+# dict - словарное кодирование любых JSON-значений (адреса, контракты): список значений + номера
+COLUMN_KINDS = ("int", "float", "dict")
+
+
+def _to_bytes(values: array) -> bytes:
+    # на диске - little-endian независимо от платформы
+    if sys.byteorder != "little":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values.tobytes()
+
+
+def _from_bytes(typecode: str, data: bytes) -> array:
+    values = array(typecode)
+    values.frombytes(data)
+    if sys.byteorder != "little":
+        values.byteswap()
+    return values
+
+
+def _encode(kind: str, values: Sequence) -> bytes:
+    if kind == "int":
+        deltas = array('q', (value - previous for previous, value in zip([0, *values], values)))
+        return _to_bytes(deltas)
+    if kind == "float":
+        return _to_bytes(array('d', (math.nan if value is None else value for value in values)))
+    dictionary: Dict[Any, int] = {}
+    indices = array('I', (dictionary.setdefault(value, len(dictionary)) for value in values))
+    keys = json.dumps(list(dictionary)).encode()
+    return struct.pack("<I", len(keys)) + keys + _to_bytes(indices)
+
+
+def _decode(kind: str, data: bytes) -> list:
+    if kind == "int":
+        return list(accumulate(_from_bytes('q', data)))
+    if kind == "float":
+        return [None if math.isnan(value) else value for value in _from_bytes('d', data)]
+    (length,) = struct.unpack_from("<I", data)
+    keys = json.loads(data[4:4 + length])
+    return [keys[index] for index in _from_bytes('I', data[4 + length:])]
+
+
+def write_segment(path: str, kinds: Dict[str, str], columns: Dict[str, Sequence],
+                  meta: Optional[Dict[str, Any]] = None) -> int:
+    """
+    Функция записи колоночного сегмента: каждый столбец сжимается отдельным блоком,
+    заголовок хранит число строк, смещения блоков и метаданные. Существующий файл не перезаписывается
+
+    :param path: Путь к файлу сегмента
+    :param kinds: Словарь имя столбца - тип (int, float, dict)
+    :param columns: Словарь имя столбца - значения (одинаковой длины)
+    :param meta: Метаданные сегмента (JSON)
+    :return: Размер файла (байт)
+    """
+    blocks, header_columns, offset = [], {}, 0
+    rows = len(next(iter(columns.values()), ()))
+    for name, kind in kinds.items():
+        block = zlib.compress(_encode(kind, columns[name]), SEGMENT_COMPRESSION_LEVEL)
+        header_columns[name] = {'kind': kind, 'offset': offset, 'length': len(block)}
+        blocks.append(block)
+        offset += len(block)
+    header = json.dumps({'rows': rows, 'columns': header_columns, 'meta': meta or {}}).encode()
+    with open(path, "xb") as f:
+        f.write(SEGMENT_MAGIC + struct.pack("<I", len(header)) + header)
+        for block in blocks:
+            f.write(block)
+        f.flush()
+        os.fsync(f.fileno())
+        return f.tell()
+
+
+def _read_header(f) -> Dict[str, Any]:
+    if f.read(len(SEGMENT_MAGIC)) != SEGMENT_MAGIC:
+        raise ValueError(f"{f.name} is not a segment file")
+    (length,) = struct.unpack("<I", f.read(4))
+    header = json.loads(f.read(length))
+    header['data_offset'] = len(SEGMENT_MAGIC) + 4 + length
+    return header
+
+
+def read_header(path: str) -> Dict[str, Any]:
+    """
+    Функция чтения заголовка сегмента без чтения столбцов
+
+    :param path: Путь к файлу сегмента
+    :return: Словарь заголовка: rows, columns, meta
+    """
+    with open(path, "rb") as f:
+        return _read_header(f)
+
+
+def read_columns(path: str, names: Sequence[str]) -> Dict[str, List]:
+    """
+    Функция чтения отдельных столбцов сегмента (остальные блоки не читаются и не распаковываются)
+
+    :param path: Путь к файлу сегмента
+    :param names: Имена столбцов
+    :return: Словарь имя столбца - список значений
+    """
+    with open(path, "rb") as f:
+        header = _read_header(f)
+        columns = {}
+        for name in names:
+            column = header['columns'][name]
+            f.seek(header['data_offset'] + column['offset'])
+            columns[name] = _decode(column['kind'], zlib.decompress(f.read(column['length'])))
+    return columns